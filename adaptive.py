@@ -0,0 +1,283 @@
+"""Computerized-adaptive testing (CAT) on a Rasch model.
+
+Item difficulties live in an ``item_params`` table next to the attempt log.
+They are refreshed offline in batch by ``calibrate()`` from running
+``fixed_responses`` counts, so a refresh costs O(questions) no matter how
+many attempts have been logged::
+
+    python adaptive.py calibrate --db data/attempts.sqlite3
+
+Only fixed-form attempts are counted: an adaptive attempt gives each
+question to candidates whose ability is close to its difficulty, which
+pulls the proportion correct towards 0.5 and every difficulty towards 0.
+
+Difficulty is on the logit scale relative to the average candidate so far
+(b = 0: half of them answer correctly).  Questions with too few responses use
+b = 0 until they are calibrated.
+
+During an adaptive attempt the ability estimate is the posterior mean (EAP)
+under a standard normal prior, evaluated on a fixed grid; its posterior SD is
+the standard error.  The next question is drawn at random from the few most
+informative ones left (some exposure control), and the attempt stops once the
+standard error reaches the target or the item cap is hit.  All randomness is
+derived from the attempt seed, so the same seed and answers give the same
+sequence of questions.
+"""
+import argparse
+import random
+import time
+from collections import namedtuple
+from collections.abc import Mapping
+
+import numpy as np
+
+from scoring import score_attempts
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fixed_responses (
+    quiz_title  TEXT    NOT NULL,
+    question    INTEGER NOT NULL,
+    n           INTEGER NOT NULL,
+    n_correct   INTEGER NOT NULL,
+    PRIMARY KEY (quiz_title, question)
+);
+CREATE TABLE IF NOT EXISTS item_params (
+    quiz_title  TEXT    NOT NULL,
+    question    INTEGER NOT NULL,
+    difficulty  REAL    NOT NULL,
+    responses   INTEGER NOT NULL,
+    updated_at  REAL    NOT NULL,
+    PRIMARY KEY (quiz_title, question)
+);
+"""
+
+MIN_RESPONSES = 20          # below this a question keeps the prior difficulty
+ADAPTIVE_MIN_QUESTIONS = 15 # smaller quizzes are not offered in adaptive mode
+TOP_K = 4                   # pick among this many most informative questions
+GRID = np.linspace(-4.0, 4.0, 161)
+LOG_PRIOR = -GRID ** 2 / 2
+
+Settings = namedtuple("Settings", ["min_items", "max_items", "target_se"])
+DEFAULTS = Settings(min_items=5, max_items=30, target_se=0.4)
+_KINDS = {"min_items": int, "max_items": int, "target_se": float}
+
+
+def _setting(cfg, key):
+    # A missing, non-numeric or non-positive value falls back to the default.
+    try:
+        value = _KINDS[key](cfg.get(key, getattr(DEFAULTS, key)))
+    except (TypeError, ValueError):
+        return getattr(DEFAULTS, key)
+    return value if value > 0 else getattr(DEFAULTS, key)
+
+
+def settings(quiz):
+    """Stopping rule from the quiz's optional ``"adaptive"`` block.
+
+    Anything but an object is ignored, as are bad values in it (validation
+    reports both).
+    """
+    cfg = quiz.get("adaptive")
+    if not isinstance(cfg, Mapping):
+        cfg = {}
+    n = len(quiz.get("questions", []))
+    max_items = min(_setting(cfg, "max_items"), n)
+    return Settings(min(_setting(cfg, "min_items"), max_items), max_items, _setting(cfg, "target_se"))
+
+
+def settings_problems(quiz):
+    """Messages about the ``"adaptive"`` block, for validation."""
+    cfg = quiz.get("adaptive")
+    if cfg is None:
+        return []
+    if not isinstance(cfg, Mapping):
+        return ["'adaptive' is ignored; expected {\"min_items\": N, \"max_items\": N, \"target_se\": x}"]
+    problems = []
+    for key, kind in _KINDS.items():
+        if key not in cfg:
+            continue
+        try:
+            ok = kind(cfg[key]) > 0
+        except (TypeError, ValueError):
+            ok = False
+        if not ok:
+            problems.append(f"adaptive {key} {cfg[key]!r} is not a positive number; "
+                            f"using {getattr(DEFAULTS, key)}")
+    if _setting(cfg, "min_items") > _setting(cfg, "max_items"):
+        problems.append("adaptive min_items exceeds max_items; max_items is used for both")
+    return problems
+
+
+def available(quiz):
+    """Offered for quizzes with an ``"adaptive"`` block, or large enough ones."""
+    return (isinstance(quiz.get("adaptive"), Mapping)
+            or len(quiz.get("questions", [])) >= ADAPTIVE_MIN_QUESTIONS)
+
+
+# ───────────────────────────────────────────────
+# Item parameters (batch)
+# ───────────────────────────────────────────────
+def install(log):
+    conn = log.connect()
+    conn.executescript(SCHEMA)
+    conn.close()
+    log.add_hook(apply_batch)
+
+
+def apply_batch(conn, rows):
+    """Fold the responses of fixed-form attempts into ``fixed_responses``."""
+    params = [(row["quiz_title"], orig_q, int(correct))
+              for row in rows if row.get("responses") is not None and not row.get("adaptive")
+              for orig_q, _, correct, _ in row["responses"]]
+    _count(conn, params)
+
+
+def _count(conn, params):
+    conn.executemany(
+        "INSERT INTO fixed_responses VALUES (?, ?, 1, ?) ON CONFLICT (quiz_title, question) "
+        "DO UPDATE SET n = n + 1, n_correct = n_correct + excluded.n_correct", params)
+
+
+def rebuild(log, quiz_title, quiz, chunk_size=5000):
+    """Recount one quiz's fixed-form responses from the raw attempt log.
+
+    Counts are taken without a write lock; a short transaction swaps them in
+    and adds the attempts logged in the meantime (as analytics.rebuild does).
+    """
+    log.flush()
+    last_id = log.last_id()
+    counts = {}
+    for orig_q, correct in _responses(quiz, log.iter_chunks(quiz_title=quiz_title, chunk_size=chunk_size,
+                                                            up_to_id=last_id)):
+        n, n1 = counts.get(orig_q, (0, 0))
+        counts[orig_q] = (n + 1, n1 + correct)
+    conn = log.connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM fixed_responses WHERE quiz_title = ?", (quiz_title,))
+            conn.executemany("INSERT INTO fixed_responses VALUES (?, ?, ?, ?)",
+                             [(quiz_title, q, n, n1) for q, (n, n1) in counts.items()])
+            chunks = log.iter_chunks(quiz_title=quiz_title, after_id=last_id, conn=conn)
+            _count(conn, [(quiz_title, q, c) for q, c in _responses(quiz, chunks)])
+    finally:
+        conn.close()
+
+
+def _responses(quiz, chunks):
+    """``(orig_q, correct)`` for every question of the fixed-form attempts in ``chunks``."""
+    for chunk in chunks:
+        chunk = [a for a in chunk if not a["adaptive"]]
+        if not chunk:
+            continue
+        scores = score_attempts(quiz, chunk)
+        for attempt, per_q in zip(chunk, scores.per_question):
+            for orig_q in attempt["question_order"]:
+                if 0 <= orig_q < len(per_q):
+                    yield orig_q, int(per_q[orig_q])
+
+
+def calibrate(conn, quiz_title=None, min_responses=MIN_RESPONSES):
+    """Refresh Rasch difficulties from ``fixed_responses``; returns rows written."""
+    sql = "SELECT quiz_title, question, n, n_correct FROM fixed_responses WHERE n >= ?"
+    params = [min_responses]
+    if quiz_title is not None:
+        sql += " AND quiz_title = ?"
+        params.append(quiz_title)
+    now = time.time()
+    rows = [(title, q, float(np.log((n - n1 + 0.5) / (n1 + 0.5))), n, now)
+            for title, q, n, n1 in conn.execute(sql, params)]
+    with conn:
+        conn.executemany(
+            "INSERT INTO item_params VALUES (?, ?, ?, ?, ?) ON CONFLICT (quiz_title, question) "
+            "DO UPDATE SET difficulty = excluded.difficulty, responses = excluded.responses, "
+            "updated_at = excluded.updated_at", rows)
+    return len(rows)
+
+
+def difficulties(conn, quiz_title, n_questions):
+    """``(b, calibrated)`` arrays indexed by original question."""
+    b = np.zeros(n_questions)
+    calibrated = np.zeros(n_questions, dtype=bool)
+    for q, d in conn.execute("SELECT question, difficulty FROM item_params WHERE quiz_title = ?",
+                             (quiz_title,)):
+        if q < n_questions:
+            b[q], calibrated[q] = d, True
+    return b, calibrated
+
+
+# ───────────────────────────────────────────────
+# Ability estimation and item selection
+# ───────────────────────────────────────────────
+def estimate(b, correct):
+    """EAP ability and its standard error from administered items."""
+    b = np.asarray(b, dtype=float)
+    u = np.asarray(correct, dtype=bool)
+    # log P(correct) = -log(1 + e^-(θ-b)), log P(wrong) = -log(1 + e^(θ-b))
+    z = GRID[:, None] - b[None, :]
+    loglik = -np.logaddexp(0, np.where(u, -z, z)).sum(axis=1)
+    post = LOG_PRIOR + loglik
+    post = np.exp(post - post.max())
+    post /= post.sum()
+    theta = float(post @ GRID)
+    return theta, float(np.sqrt(post @ (GRID - theta) ** 2))
+
+
+def select_next(b, asked, theta, rng, skip=(), top_k=TOP_K):
+    """Original index of the next question, or None when none are left."""
+    b = np.asarray(b, dtype=float)
+    eligible = np.ones(len(b), dtype=bool)
+    eligible[list(asked)] = False
+    if skip:
+        eligible[list(skip)] = False
+    candidates = np.flatnonzero(eligible)
+    if not len(candidates):
+        return None
+    # Rasch information p(1-p) peaks where b == θ.
+    distance = np.abs(b[candidates] - theta)
+    k = min(top_k, len(candidates))
+    best = candidates[np.argpartition(distance, k - 1)[:k]]
+    return int(rng.choice(sorted(best.tolist())))
+
+
+def should_stop(n_asked, se, n_left, rule):
+    if n_left == 0 or n_asked >= rule.max_items:
+        return True
+    return n_asked >= rule.min_items and se <= rule.target_se
+
+
+def step_rng(seed, step):
+    return random.Random(f"{seed}:{step}")
+
+
+def shuffle_options(q, seed, orig_q):
+    """Option order for one question, derived from the attempt seed."""
+    opts = q.get("options", [])
+    order = list(range(len(opts)))
+    random.Random(f"{seed}:opts:{orig_q}").shuffle(order)
+    correct = q.get("correct")
+    position = order.index(opts.index(correct)) if correct in opts else None
+    return order, position
+
+
+# ───────────────────────────────────────────────
+# CLI
+# ───────────────────────────────────────────────
+def main(argv=None):
+    from attempts import connect
+
+    parser = argparse.ArgumentParser(description="Refresh adaptive-testing item parameters.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    c = sub.add_parser("calibrate", help="re-estimate difficulties from the response aggregates")
+    c.add_argument("--db", default="data/attempts.sqlite3")
+    c.add_argument("--quiz", help="only this quiz")
+    c.add_argument("--min-responses", type=int, default=MIN_RESPONSES)
+    args = parser.parse_args(argv)
+
+    conn = connect(args.db)
+    conn.executescript(SCHEMA)
+    n = calibrate(conn, args.quiz, args.min_responses)
+    print(f"Calibrated {n} question(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Per-question item statistics kept as running aggregates.
+
+Each submitted attempt is folded into two tables next to the attempt log,
+inside the same transaction as the attempt insert:
+
+* ``quiz_stats`` - attempt count and score moments per quiz
+* ``question_stats`` - per (quiz, original question index): responses,
+  correct count, option pick counts, a time-to-answer histogram and the
+  sums needed for the point-biserial correlation
+
+Reading the dashboard is therefore O(questions) no matter how many attempts
+have been logged.  ``rebuild()`` recomputes everything for one quiz from the
+raw attempts, e.g. after its answer key was corrected.
+"""
+import bisect
+import json
+import math
+import sqlite3
+
+import numpy as np
+
+from scoring import score_attempts
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quiz_stats (
+    quiz_title   TEXT PRIMARY KEY,
+    n            INTEGER NOT NULL,
+    sum_score    REAL    NOT NULL,
+    sum_score_sq REAL    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS question_stats (
+    quiz_title        TEXT    NOT NULL,
+    question          INTEGER NOT NULL,
+    n                 INTEGER NOT NULL,
+    n_correct         INTEGER NOT NULL,
+    n_skipped         INTEGER NOT NULL,
+    sum_score         REAL    NOT NULL,
+    sum_score_sq      REAL    NOT NULL,
+    sum_score_correct REAL    NOT NULL,
+    option_counts     TEXT    NOT NULL,
+    time_hist         TEXT    NOT NULL,
+    PRIMARY KEY (quiz_title, question)
+);
+"""
+
+# Upper bounds (seconds) of the time-to-answer histogram buckets; the last
+# bucket is open-ended.
+TIME_BUCKETS = [2, 5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300, 600]
+
+
+# ───────────────────────────────────────────────
+# Attempt -> item responses
+# ───────────────────────────────────────────────
+def item_responses(attempt, per_question):
+    """List of ``(orig_q, orig_option or None, correct, seconds or None)``.
+
+    ``per_question`` is this attempt's row from ``score_attempts``.  Time to
+    answer is the gap between consecutive answer events, which is the best
+    we can do without per-question focus events.
+    """
+    order = attempt["question_order"]
+    shuffles = {int(k): v for k, v in attempt["option_shuffles"].items()}
+    answers = {int(k): v for k, v in attempt["user_answers"].items()}
+    times = {int(k): v for k, v in (attempt.get("answer_times") or {}).items()}
+
+    gaps, prev = {}, 0.0
+    for orig_q, t in sorted(times.items(), key=lambda kv: kv[1]):
+        gaps[orig_q] = max(0.0, t - prev)
+        prev = t
+
+    out = []
+    for orig_q in order:
+        if not 0 <= orig_q < len(per_question):   # removed from the quiz since
+            continue
+        u_idx = answers.get(orig_q)
+        picked = (shuffles[orig_q][u_idx] if u_idx is not None and u_idx < len(shuffles.get(orig_q, ()))
+                  else None)
+        out.append((orig_q, picked, bool(per_question[orig_q]), gaps.get(orig_q)))
+    return out
+
+
+# ───────────────────────────────────────────────
+# Incremental update (runs on the attempt-log writer thread)
+# ───────────────────────────────────────────────
+def install(log):
+    conn = log.connect()
+    conn.executescript(SCHEMA)
+    conn.close()
+    log.add_hook(apply_batch)
+
+
+def apply_batch(conn, rows):
+    for row in rows:
+        if row.get("responses") is not None:
+            apply(conn, row["quiz_title"], row["correct"], row["total"], row["responses"])
+
+
+def apply(conn, quiz_title, correct, total, responses):
+    score = correct / total if total else 0.0
+    conn.execute(
+        "INSERT INTO quiz_stats VALUES (?, 1, ?, ?) ON CONFLICT (quiz_title) DO UPDATE SET "
+        "n = n + 1, sum_score = sum_score + excluded.sum_score, "
+        "sum_score_sq = sum_score_sq + excluded.sum_score_sq",
+        (quiz_title, score, score * score),
+    )
+    existing = {
+        q: (opts, hist) for q, opts, hist in conn.execute(
+            "SELECT question, option_counts, time_hist FROM question_stats WHERE quiz_title = ?",
+            (quiz_title,))
+    }
+    params = []
+    for orig_q, picked, is_correct, seconds in responses:
+        opts, hist = existing.get(orig_q, ("{}", "[]"))
+        opts, hist = json.loads(opts), json.loads(hist) or [0] * (len(TIME_BUCKETS) + 1)
+        if picked is not None:
+            opts[str(picked)] = opts.get(str(picked), 0) + 1
+        if seconds is not None:
+            hist[bisect.bisect_left(TIME_BUCKETS, seconds)] += 1
+        params.append((
+            quiz_title, orig_q, int(is_correct), int(picked is None), score, score * score,
+            score if is_correct else 0.0, json.dumps(opts), json.dumps(hist),
+        ))
+    conn.executemany(
+        "INSERT INTO question_stats VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (quiz_title, question) DO UPDATE SET "
+        "n = n + 1, n_correct = n_correct + excluded.n_correct, "
+        "n_skipped = n_skipped + excluded.n_skipped, "
+        "sum_score = sum_score + excluded.sum_score, "
+        "sum_score_sq = sum_score_sq + excluded.sum_score_sq, "
+        "sum_score_correct = sum_score_correct + excluded.sum_score_correct, "
+        "option_counts = excluded.option_counts, time_hist = excluded.time_hist",
+        params,
+    )
+
+
+def rebuild(log, quiz_title, quiz, chunk_size=5000):
+    """Recompute one quiz's aggregates from the raw attempt log.
+
+    The log is scanned without a write lock into an in-memory copy of the
+    tables; a short transaction then swaps the result in and folds in the
+    attempts logged during the scan, so the attempt-log writer is never held
+    up for long.
+
+    Returns the number of attempts that asked questions no longer in the
+    quiz; those questions are left out of the recomputed figures.
+    """
+    log.flush()
+    last_id = log.last_id()
+    scratch = sqlite3.connect(":memory:")
+    scratch.executescript(SCHEMA)
+    affected = _fold(scratch, quiz_title, quiz,
+                     log.iter_chunks(quiz_title=quiz_title, chunk_size=chunk_size, up_to_id=last_id))
+    conn = log.connect()
+    try:
+        with conn:
+            conn.execute("DELETE FROM quiz_stats WHERE quiz_title = ?", (quiz_title,))
+            conn.execute("DELETE FROM question_stats WHERE quiz_title = ?", (quiz_title,))
+            conn.executemany("INSERT INTO quiz_stats VALUES (?, ?, ?, ?)",
+                             scratch.execute("SELECT * FROM quiz_stats"))
+            conn.executemany("INSERT INTO question_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             scratch.execute("SELECT * FROM question_stats"))
+            affected += _fold(conn, quiz_title, quiz,
+                              log.iter_chunks(quiz_title=quiz_title, after_id=last_id, conn=conn))
+    finally:
+        conn.close()
+        scratch.close()
+    return affected
+
+
+def _fold(conn, quiz_title, quiz, chunks):
+    affected = 0
+    for chunk in chunks:
+        scores = score_attempts(quiz, chunk)
+        affected += int((scores.dropped > 0).sum())
+        for attempt, per_q, c, t in zip(chunk, scores.per_question, scores.correct, scores.total):
+            apply(conn, quiz_title, int(c), int(t), item_responses(attempt, per_q))
+    return affected
+
+
+# ───────────────────────────────────────────────
+# Reading
+# ───────────────────────────────────────────────
+def quiz_summary(conn, quiz_title):
+    row = conn.execute("SELECT n, sum_score, sum_score_sq FROM quiz_stats WHERE quiz_title = ?",
+                       (quiz_title,)).fetchone()
+    if row is None:
+        return None
+    n, s, ss = row
+    mean = s / n
+    return {"attempts": n, "mean_score": mean, "sd_score": math.sqrt(max(0.0, ss / n - mean * mean))}
+
+
+def question_report(conn, quiz_title):
+    """Per-question stats keyed by original question index."""
+    report = {}
+    rows = conn.execute(
+        "SELECT question, n, n_correct, n_skipped, sum_score, sum_score_sq, sum_score_correct, "
+        "option_counts, time_hist FROM question_stats WHERE quiz_title = ? ORDER BY question",
+        (quiz_title,))
+    for q, n, n1, skipped, s, ss, s1, opts, hist in rows:
+        report[q] = {
+            "responses": n,
+            "p_value": n1 / n if n else None,
+            "skipped": skipped,
+            "option_counts": {int(k): v for k, v in json.loads(opts).items()},
+            "median_seconds": histogram_median(json.loads(hist)),
+            "discrimination": point_biserial(n, n1, s, ss, s1),
+        }
+    return report
+
+
+def point_biserial(n, n1, s, ss, s1):
+    n0 = n - n1
+    if n < 2 or n1 == 0 or n0 == 0:
+        return None
+    sd = math.sqrt(max(0.0, ss / n - (s / n) ** 2))
+    if sd == 0:
+        return None
+    m1, m0 = s1 / n1, (s - s1) / n0
+    return (m1 - m0) / sd * math.sqrt(n1 / n * n0 / n)
+
+
+def histogram_median(hist):
+    total = sum(hist)
+    if not total:
+        return None
+    cum = np.cumsum(hist)
+    b = int(np.searchsorted(cum, total / 2))
+    lo = TIME_BUCKETS[b - 1] if b > 0 else 0
+    hi = TIME_BUCKETS[b] if b < len(TIME_BUCKETS) else lo * 2
+    before = cum[b - 1] if b > 0 else 0
+    return lo + (hi - lo) * (total / 2 - before) / hist[b]
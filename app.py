@@ -1,18 +1,33 @@
 import streamlit as st
 import json
+import os
+import secrets
+import time
 from pathlib import Path
 from datetime import datetime
-import time
-import random
+
+from storage import open_store
+from quizbank import plain_quiz
+from paper import new_seed, pagination_spec, paper_for_seed, pool_spec
+from scoring import score_attempts
+from attempts import AttemptLog
+from checkpoints import CheckpointStore, quiz_fingerprint
+import analytics
+import adaptive
+import metrics
+# bulk_import (upload parser) and export are admin-only and imported where used.
 
 # ───────────────────────────────────────────────
 # Paths & Session State
 # ───────────────────────────────────────────────
 QUIZZES_DIR = Path("quizzes")
 QUIZZES_DIR.mkdir(exist_ok=True)
+DATA_DIR = Path("data")
+ATTEMPTS_DB = DATA_DIR / "attempts.sqlite3"
+CATALOG_SNAPSHOT = DATA_DIR / "catalog.pickle"
+CHECKPOINTS_DB = DATA_DIR / "checkpoints.sqlite3"
 
 defaults = {
-    'quizzes': {},
     'selected_quiz': None,
     'user_answers': {},
     'show_answers': False,
@@ -24,16 +39,38 @@ defaults = {
     'selected_departments': [],
     'selected_subcategories': [],
     'admin_logged_in': False,
-    'shuffled_questions': None,
+    'question_order': None,
+    'paper_seed': None,
+    'adaptive': False,
+    'ability': None,
     'option_shuffles': {},
+    'correct_positions': {},
+    'answer_times': {},
+    'page_size': None,
+    'quiz_page': 0,
+    'attempt_token': None,
+    'last_checkpoint': None,
     # ── New keys for editing ───────────────────────
     'edit_quiz_title': None,
     'edit_quiz_data': None,
 }
 
-for k, v in defaults.items():
-    if k not in st.session_state:
-        st.session_state[k] = v
+# Everything that belongs to a single attempt at the selected quiz.
+ATTEMPT_STATE_KEYS = ['user_answers', 'show_answers', 'score', 'quiz_start_time',
+                      'time_limit_minutes', 'timer_expired', 'reveal_correct_answers',
+                      'question_order', 'paper_seed', 'adaptive', 'ability',
+                      'option_shuffles', 'correct_positions',
+                      'answer_times', 'page_size', 'quiz_page']
+
+def reset_attempt_state():
+    end_autosave()
+    for k in ATTEMPT_STATE_KEYS:
+        if k in st.session_state:
+            v = st.session_state[k]
+            if isinstance(v, dict):
+                v.clear()
+            else:
+                st.session_state[k] = None
 
 # ───────────────────────────────────────────────
 # Admin helpers
@@ -44,67 +81,112 @@ def is_admin():
     return st.session_state.get("admin_logged_in", False)
 
 def delete_quiz(title):
-    safe_title = "".join(c if c.isalnum() or c in " -_" else "_" for c in title)
-    path = QUIZZES_DIR / f"{safe_title}.json"
-    if path.exists():
-        path.unlink()
-        st.session_state.quizzes.pop(title, None)
+    if get_catalog().delete(title):
         st.success(f"Quiz **{title}** deleted.")
         if st.session_state.selected_quiz == title:
             st.session_state.selected_quiz = None
         st.rerun()
+    elif get_catalog().is_packed(title):
+        st.error("This quiz is part of a packed quiz bank (.qbank) and cannot be deleted here.")
     else:
         st.error("Quiz file not found.")
 
 # ───────────────────────────────────────────────
 # Load / Save
 # ───────────────────────────────────────────────
+@st.cache_resource
+def get_metrics():
+    # Span histograms shared by every session; QUIZ_METRICS_FILE enables a
+    # periodic Prometheus text dump (e.g. for node_exporter's textfile collector).
+    m = metrics.Metrics()
+    if os.environ.get("QUIZ_METRICS_FILE"):
+        m.start_dumping(os.environ["QUIZ_METRICS_FILE"])
+    return m
+
+def start_profiler():
+    # cProfile for exactly one rerun, requested from the admin metrics page.
+    if not st.session_state.pop("profile_next_rerun", False):
+        return None
+    try:
+        return metrics.Profiler()
+    except ValueError:  # another session is profiling right now
+        return None
+
+@st.cache_resource
+def get_catalog():
+    # One quiz store per server process; every session reads from it.
+    # QUIZ_STORAGE picks the backend (default: JSON files in QUIZZES_DIR, or
+    # e.g. sqlite:data/quizzes.sqlite3).  Changes made elsewhere (other
+    # replicas, manual edits) arrive through the store's watcher thread;
+    # QUIZ_WATCH=poll forces polling, e.g. for a shared network volume.  The
+    # directory backend starts from its snapshot and re-parses only files that
+    # changed since it was written.
+    catalog = open_store(os.environ.get("QUIZ_STORAGE"), default_dir=QUIZZES_DIR,
+                         snapshot=CATALOG_SNAPSHOT)
+    catalog.start_watching(poll=os.environ.get("QUIZ_WATCH") == "poll", metrics=get_metrics())
+    catalog.refresh()
+    return catalog
+
 def load_quizzes():
-    st.session_state.quizzes.clear()
-    for file in QUIZZES_DIR.glob("*.json"):
-        try:
-            with open(file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                title = data.get("quiz_title", file.stem)
-                st.session_state.quizzes[title] = data
-        except Exception as e:
-            st.warning(f"Could not load {file.name}: {e}")
-
-load_quizzes()
-
-def save_quiz(title, data):
-    safe_title = "".join(c if c.isalnum() or c in " -_" else "_" for c in title)
-    path = QUIZZES_DIR / f"{safe_title}.json"
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    load_quizzes()
+    # Returns the shared read-only mapping; never copy it into session_state.
+    # No directory scan here: the watcher keeps the catalog current (its
+    # updates are timed as the "catalog_update" span).
+    catalog = get_catalog()
+    current = catalog.quizzes
+    for name, err in catalog.load_errors().items():
+        st.warning(f"Could not load {name}: {err}")
+    return current
+
+@st.cache_resource
+def get_attempt_log():
+    log = AttemptLog(ATTEMPTS_DB)
+    analytics.install(log)
+    adaptive.install(log)
+    return log
+
+def save_quiz(title, data, old_title=None):
+    # Atomic write + in-place catalog update; pass old_title to rename.
+    # Returns the validation report computed as part of the save.
+    global quizzes
+    with get_metrics().span("save_quiz"):
+        get_catalog().save(title, data, old_title=old_title)
+    quizzes = get_catalog().quizzes
+    return get_catalog().validation(title)
+
+def show_validation_report(report):
+    # Full report for admins right after upload/save; the quiz is kept either
+    # way and questions with errors are skipped when it is taken.
+    if not report.problems:
+        return
+    if report.errors:
+        st.error(f"{len(report.invalid_questions)} question(s) have errors and will be skipped "
+                 "when this quiz is taken:\n\n" + "\n".join(f"- {line}" for line in report.lines()))
+    else:
+        st.warning("Saved with warnings:\n\n" + "\n".join(f"- {line}" for line in report.lines()))
 
 # ───────────────────────────────────────────────
 # Category & Subcategory helpers
 # ───────────────────────────────────────────────
+# Both are answered from the catalog's precomputed index, not by scanning quizzes.
 def get_all_departments():
-    depts = set()
-    for quiz in st.session_state.quizzes.values():
-        dept = quiz.get("department") or quiz.get("category")
-        if dept:
-            depts.add(dept)
-    return sorted(depts)
+    return get_catalog().departments()
 
 def get_subcategories_for_depts(selected_depts):
-    subs = set()
-    for quiz in st.session_state.quizzes.values():
-        dept = quiz.get("department") or quiz.get("category")
-        sub = quiz.get("subcategory") or quiz.get("topic")
-        if dept in selected_depts and sub:
-            subs.add(sub)
-    return sorted(subs)
+    return get_catalog().subcategories(selected_depts)
+
+def quiz_label(title, dept, sub):
+    if sub:
+        return f"{title} ({sub})"
+    if dept != "Uncategorized":
+        return f"{title} ({dept})"
+    return title
 
 # ───────────────────────────────────────────────
 # Add new quiz (admin only)
 # ───────────────────────────────────────────────
 def submit_quiz_section():
     st.header("Add New Quiz (JSON)")
-    tab1, tab2 = st.tabs(["Paste JSON", "Upload file"])
+    tab1, tab2, tab3 = st.tabs(["Paste JSON", "Upload file", "Bulk import"])
     all_depts = get_all_departments() or ["Uncategorized"]
     all_depts = sorted(set(all_depts + ["Uncategorized"]))
 
@@ -128,20 +210,22 @@ def submit_quiz_section():
                 return
             try:
                 data = json.loads(quiz_json)
-                title = quiz_title.strip() or data.get("quiz_title") or f"Quiz_{len(st.session_state.quizzes)+1}"
+                title = quiz_title.strip() or data.get("quiz_title") or f"Quiz_{len(quizzes)+1}"
                 if final_dept and final_dept != "Uncategorized":
                     data["department"] = final_dept
                 if subcategory:
                     data["subcategory"] = subcategory
-                if title in st.session_state.quizzes:
+                if title in quizzes:
                     if st.checkbox("Overwrite existing quiz?", key="ow_confirm"):
-                        save_quiz(title, data)
+                        report = save_quiz(title, data)
                         st.success(f"Quiz **{title}** updated!")
+                        show_validation_report(report)
                     else:
                         st.info("Keeping existing version.")
                 else:
-                    save_quiz(title, data)
+                    report = save_quiz(title, data)
                     st.success(f"Quiz **{title}** saved!")
+                    show_validation_report(report)
             except json.JSONDecodeError:
                 st.error("Invalid JSON format.")
 
@@ -153,18 +237,74 @@ def submit_quiz_section():
                 title = data.get("quiz_title", uploaded.name.replace(".json", ""))
                 if not data.get("department"):
                     data["department"] = "Uncategorized"
-                if title in st.session_state.quizzes:
+                if title in quizzes:
                     if st.checkbox("Overwrite existing?", key="ow_file"):
-                        save_quiz(title, data)
+                        report = save_quiz(title, data)
                         st.success(f"Quiz **{title}** updated!")
+                        show_validation_report(report)
                     else:
                         st.info("Skipped — quiz already exists.")
                 else:
-                    save_quiz(title, data)
+                    report = save_quiz(title, data)
                     st.success(f"Quiz **{title}** added!")
+                    show_validation_report(report)
             except Exception as e:
                 st.error(f"Error: {e}")
 
+    with tab3:
+        bulk = st.file_uploader("Upload .zip or .jsonl", type=["zip", "jsonl"], key="bulk_upload")
+        server_dir = st.text_input("…or a path on the server (directory, .zip or .jsonl)", key="bulk_dir").strip()
+        bulk_dept = st.selectbox("Department for quizzes without one", options=all_depts,
+                                 index=all_depts.index("Uncategorized"), key="bulk_dept")
+        bulk_overwrite = st.checkbox("Overwrite existing quizzes", key="bulk_overwrite")
+        if (bulk or server_dir) and st.button("Import", type="primary", key="submit_bulk"):
+            bulk_import_quizzes(bulk or server_dir, bulk_dept, bulk_overwrite)
+
+def bulk_import_quizzes(source, department, overwrite):
+    # Parse in a process pool with live progress, then commit in one batch.
+    import bulk_import
+    global quizzes
+    try:
+        items = list(bulk_import.iter_items(source))
+    except Exception as e:
+        st.error(f"Could not read import source: {e}")
+        return
+    if not items:
+        st.warning("No quiz files found.")
+        return
+
+    progress = st.progress(0.0, text=f"Parsing {len(items)} quizzes…")
+    accepted, failed, reports, sources = [], [], {}, {}
+    for n, result in enumerate(bulk_import.parse_all(items), 1):
+        if result.error:
+            failed.append(result)
+        else:
+            accepted.append(bulk_import.prepare(result, department))
+            reports[result.title] = result.report
+            sources[result.title] = result.source
+        if n % 50 == 0 or n == len(items):
+            progress.progress(n / len(items), text=f"Parsed {n}/{len(items)}")
+
+    catalog = get_catalog()
+    saved, skipped, rejected = catalog.save_many(accepted, overwrite=overwrite, reports=reports)
+    failed += [bulk_import.ImportResult(sources[title], title, None, message) for title, message in rejected]
+    quizzes = catalog.quizzes
+    progress.empty()
+    st.success(f"Imported **{len(saved)}** quizzes"
+               + (f", skipped {len(skipped)} existing" if skipped else "")
+               + (f", {len(failed)} invalid" if failed else "") + ".")
+    if failed:
+        with st.expander(f"{len(failed)} invalid file(s)"):
+            st.dataframe([{"Source": r.source, "Error": r.error} for r in failed], hide_index=True)
+    problems = [
+        {"Quiz": t, "Question": "" if p.question is None else p.question + 1,
+         "Level": p.level, "Problem": p.message}
+        for t in saved for p in catalog.validation(t).problems
+    ]
+    if problems:
+        with st.expander(f"{len({row['Quiz'] for row in problems})} imported quiz(zes) with validation problems"):
+            st.dataframe(problems, hide_index=True)
+
 # ───────────────────────────────────────────────
 # Edit quiz form (admin only)
 # ───────────────────────────────────────────────
@@ -222,20 +362,20 @@ def edit_quiz_form():
                 else:
                     new_data.pop("subcategory", None)
 
-                # Save (possibly with new title)
-                save_quiz(edited_title.strip() or title, new_data)
-
-                # Clean up old file if title changed
-                if edited_title.strip() != title:
-                    old_safe = "".join(c if c.isalnum() or c in " -_" else "_" for c in title)
-                    old_path = QUIZZES_DIR / f"{old_safe}.json"
-                    if old_path.exists() and old_path != QUIZZES_DIR / f"{''.join(c if c.isalnum() or c in ' -_' else '_' for c in edited_title)}.json":
-                        old_path.unlink()
+                # Save (possibly with new title, replacing the old entry)
+                new_title = edited_title.strip() or title
+                report = save_quiz(new_title, new_data, old_title=title)
 
-                st.success(f"Quiz **{edited_title or title}** updated successfully!")
-                st.session_state.edit_quiz_title = None
-                st.session_state.edit_quiz_data = None
-                st.rerun()
+                st.success(f"Quiz **{new_title}** updated successfully!")
+                if report.problems:
+                    # Keep the editor open so the problems can be fixed right away.
+                    st.session_state.edit_quiz_title = new_title
+                    st.session_state.edit_quiz_data = new_data
+                    show_validation_report(report)
+                else:
+                    st.session_state.edit_quiz_title = None
+                    st.session_state.edit_quiz_data = None
+                    st.rerun()
 
             except json.JSONDecodeError:
                 st.error("Invalid JSON format — please fix the syntax.")
@@ -249,41 +389,313 @@ def edit_quiz_form():
             st.rerun()
 
 # ───────────────────────────────────────────────
-# Take quiz section (unchanged)
+# Timer
 # ───────────────────────────────────────────────
+# The countdown ticks in the browser; the server only checks the deadline when
+# a rerun happens anyway (answer change, submit) plus once when it falls due.
+COUNTDOWN_HTML = """
+<div style="font-family: 'Source Sans Pro', sans-serif; font-size: 14px; color: rgba(49, 51, 63, 0.6);">
+  ⏳ <b>Time remaining: <span id="countdown">{mm:02d}:{ss:02d}</span></b>
+</div>
+<script>
+  const end = Date.now() + {remaining} * 1000;
+  const el = document.getElementById("countdown");
+  function tick() {{
+    const left = Math.max(0, Math.round((end - Date.now()) / 1000));
+    const m = String(Math.floor(left / 60)).padStart(2, "0");
+    const s = String(left % 60).padStart(2, "0");
+    el.textContent = left > 0 ? m + ":" + s : "00:00 — submitting…";
+    if (left > 0) setTimeout(tick, 250);
+  }}
+  tick();
+</script>
+"""
+
+def remaining_seconds():
+    if st.session_state.quiz_start_time is None or not st.session_state.get('time_limit_minutes'):
+        return None
+    elapsed = datetime.now() - st.session_state.quiz_start_time
+    return max(0, int(st.session_state.time_limit_minutes * 60 - elapsed.total_seconds()))
+
+def render_countdown(remaining_sec):
+    mins, secs = divmod(remaining_sec, 60)
+    html = COUNTDOWN_HTML.format(mm=mins, ss=secs, remaining=remaining_sec)
+    if hasattr(st, "iframe"):
+        st.iframe(html, height=32)
+    else:  # older Streamlit without st.iframe
+        import streamlit.components.v1 as components
+        components.html(html, height=32)
+
+def watch_deadline(remaining_sec):
+    # Wakes up once when the deadline is due instead of rerunning every second.
+    @st.fragment(run_every=max(remaining_sec, 1))
+    def _deadline_fragment():
+        remaining = remaining_seconds()
+        if remaining is not None and remaining <= 0 and not st.session_state.show_answers:
+            st.rerun(scope="app")
+    _deadline_fragment()
+
+# ───────────────────────────────────────────────
+# Pagination
+# ───────────────────────────────────────────────
+# Quizzes may declare a layout:
+#   "pagination": {"mode": "all" | "paged" | "single", "per_page": 10}
+# Without one, anything longer than LARGE_QUIZ_QUESTIONS is paged.
+LARGE_QUIZ_QUESTIONS = 30
+DEFAULT_QUESTIONS_PER_PAGE = 10
+
+def default_page_size(quiz):
+    # 0 means every question on one page.
+    mode, per_page = pagination_spec(quiz)
+    if mode is None:
+        mode = "paged" if len(quiz.get("questions", [])) > LARGE_QUIZ_QUESTIONS else "all"
+    if mode == "single":
+        return 1
+    if mode == "paged":
+        return per_page or DEFAULT_QUESTIONS_PER_PAGE
+    return 0
+
+def layout_options(quiz):
+    per_page = pagination_spec(quiz)[1] or DEFAULT_QUESTIONS_PER_PAGE
+    return {
+        "All questions on one page": 0,
+        f"{per_page} questions per page": per_page,
+        "One question at a time": 1,
+    }
+
+def render_page_nav(page, n_pages, page_size, answered, total):
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    with prev_col:
+        if st.button("← Previous", key="page_prev", disabled=page == 0):
+            st.session_state.quiz_page = page - 1
+            st.rerun()
+    with info_col:
+        unit = "Question" if page_size == 1 else "Page"
+        st.caption(f"{unit} {page + 1} of {n_pages} • answered {answered}/{total}")
+    with next_col:
+        if st.button("Next →", key="page_next", disabled=page >= n_pages - 1):
+            st.session_state.quiz_page = page + 1
+            st.rerun()
+
+# ───────────────────────────────────────────────
+# Adaptive mode
+# ───────────────────────────────────────────────
+FIXED_MODE = "Fixed set of questions"
+ADAPTIVE_MODE = "Adaptive"
+
+def item_difficulties(quiz):
+    return adaptive.difficulties(get_attempt_log().reader(), st.session_state.selected_quiz,
+                                 len(quiz.get("questions", [])))[0]
+
+def add_adaptive_question(quiz, orig_q):
+    ss = st.session_state
+    order, position = adaptive.shuffle_options(quiz["questions"][orig_q], ss.paper_seed, orig_q)
+    ss.question_order.append(orig_q)
+    ss.option_shuffles[orig_q] = order
+    if position is not None:
+        ss.correct_positions[orig_q] = position
+
+def start_adaptive(quiz, invalid_questions):
+    # Replaces the fixed paper: questions are added one by one as answers come in.
+    ss = st.session_state
+    ss.adaptive = True
+    ss.page_size = 1
+    ss.question_order, ss.option_shuffles, ss.correct_positions = [], {}, {}
+    ss.ability = (0.0, 1.0)
+    first = adaptive.select_next(item_difficulties(quiz), [], 0.0,
+                                 adaptive.step_rng(ss.paper_seed, 0), invalid_questions)
+    add_adaptive_question(quiz, first)
+
+def advance_adaptive(quiz, invalid_questions):
+    # Re-estimate ability from the answers so far; True when the attempt should stop.
+    ss = st.session_state
+    b = item_difficulties(quiz)
+    asked = ss.question_order
+    correct = [ss.user_answers.get(q) is not None and ss.user_answers.get(q) == ss.correct_positions.get(q)
+               for q in asked]
+    ss.ability = adaptive.estimate(b[asked], correct)
+    n_left = len(b) - len(asked) - len(invalid_questions.difference(asked))
+    if adaptive.should_stop(len(asked), ss.ability[1], n_left, adaptive.settings(quiz)):
+        return True
+    nxt = adaptive.select_next(b, asked, ss.ability[0], adaptive.step_rng(ss.paper_seed, len(asked)),
+                               invalid_questions)
+    if nxt is None:
+        return True
+    add_adaptive_question(quiz, nxt)
+    return False
+
+def adaptive_controls(quiz, invalid_questions):
+    ss = st.session_state
+    current = ss.question_order[-1]
+    st.caption(f"Question {len(ss.question_order)} of at most {adaptive.settings(quiz).max_items}")
+    if st.button("Next question", type="primary", disabled=current not in ss.user_answers):
+        if advance_adaptive(quiz, invalid_questions):
+            finish_attempt(quiz, ss.question_order)
+        st.rerun()
+
+# ───────────────────────────────────────────────
+# Autosave / resume
+# ───────────────────────────────────────────────
+# An attempt in progress is checkpointed under a random token that is also in
+# the URL (?attempt=...), so reloading the page or reconnecting to a restarted
+# server resumes it.  Only the seed, answer indices and timing are stored; the
+# paper is rebuilt from the seed and the deadline keeps running meanwhile.
+@st.cache_resource
+def get_checkpoints():
+    return CheckpointStore(CHECKPOINTS_DB)
+
+def begin_autosave():
+    ss = st.session_state
+    ss.attempt_token = secrets.token_urlsafe(12)
+    ss.last_checkpoint = None
+    st.query_params["attempt"] = ss.attempt_token
+
+def autosave_attempt(quiz):
+    # Called on every rerun of an attempt; only changed state is handed on, and
+    # the store writes it on a debounce.
+    ss = st.session_state
+    if not ss.attempt_token:
+        return
+    state = {
+        "seed": ss.paper_seed,
+        "answers": {str(q): a for q, a in ss.user_answers.items()},
+        "times": {str(q): round(t, 1) for q, t in ss.answer_times.items()},
+        "started": ss.quiz_start_time.timestamp(),
+        "limit": ss.time_limit_minutes,
+        "page_size": ss.page_size,
+        "page": ss.quiz_page,
+    }
+    if ss.adaptive:
+        state["asked"] = list(ss.question_order)
+        state["ability"] = ss.ability
+    if ss.last_checkpoint is None:
+        state["fingerprint"] = quiz_fingerprint(quiz)
+    else:
+        state["fingerprint"] = ss.last_checkpoint["fingerprint"]
+    if state != ss.last_checkpoint:
+        get_checkpoints().save(ss.attempt_token, ss.selected_quiz, state)
+        ss.last_checkpoint = state
+
+def end_autosave():
+    ss = st.session_state
+    if ss.get("attempt_token"):
+        get_checkpoints().discard(ss.attempt_token)
+        st.query_params.pop("attempt", None)
+    ss.attempt_token = None
+    ss.last_checkpoint = None
+
+def resume_attempt():
+    # A new session opened with ?attempt=<token> picks that attempt up again.
+    ss = st.session_state
+    token = st.query_params.get("attempt")
+    if not token or ss.attempt_token is not None:
+        return
+    found = get_checkpoints().load(token)
+    if found is None:
+        st.query_params.pop("attempt", None)
+        return
+    title, state = found
+    quiz = quizzes.get(title)
+    if quiz is None or quiz_fingerprint(quiz) != state["fingerprint"]:
+        get_checkpoints().discard(token)
+        st.query_params.pop("attempt", None)
+        st.warning("Your unfinished attempt could not be resumed because the quiz has changed since.")
+        return
+
+    ss.selected_quiz = title
+    ss.paper_seed = state["seed"]
+    ss.user_answers = {int(q): a for q, a in state["answers"].items()}
+    ss.answer_times = {int(q): t for q, t in state["times"].items()}
+    ss.quiz_start_time = datetime.fromtimestamp(state["started"])
+    ss.time_limit_minutes = state["limit"]
+    ss.page_size = state["page_size"]
+    ss.quiz_page = state["page"]
+    if "asked" in state:
+        # Replaying the asked questions rebuilds their option shuffles.
+        ss.adaptive = True
+        ss.question_order, ss.option_shuffles, ss.correct_positions = [], {}, {}
+        for orig_q in state["asked"]:
+            add_adaptive_question(quiz, orig_q)
+        ss.ability = tuple(state["ability"])
+    else:
+        invalid_questions = get_catalog().validation(title).invalid_questions
+        ss.question_order, ss.option_shuffles, ss.correct_positions = paper_for_seed(
+            quiz, ss.paper_seed, skip=invalid_questions)
+    ss.attempt_token = token
+    ss.last_checkpoint = state
+
+# ───────────────────────────────────────────────
+# Take quiz section
+# ───────────────────────────────────────────────
+def finish_attempt(quiz, question_order):
+    # Score the attempt, end it and hand it to the background attempt log.
+    ss = st.session_state
+    attempt = {
+        "question_order": question_order,
+        "option_shuffles": ss.option_shuffles,
+        "user_answers": ss.user_answers,
+        "answer_times": ss.answer_times,
+    }
+    with get_metrics().span("scoring"):
+        scores = score_attempts(quiz, [attempt])
+    correct, total = int(scores.correct[0]), int(scores.total[0])
+    ss.score = (correct, total)
+    if ss.adaptive:
+        ss.page_size = 0  # review everything that was asked on one page
+    ss.show_answers = True
+    get_attempt_log().record(
+        quiz_title=ss.selected_quiz,
+        question_order=question_order,
+        option_shuffles=ss.option_shuffles,
+        user_answers=ss.user_answers,
+        seed=ss.paper_seed,
+        correct=correct,
+        total=total,
+        started_at=ss.quiz_start_time.timestamp() if ss.quiz_start_time else None,
+        time_limit_minutes=ss.time_limit_minutes,
+        timer_expired=ss.timer_expired,
+        answer_times=ss.answer_times,
+        responses=analytics.item_responses(attempt, scores.per_question[0]),
+        adaptive=ss.adaptive,
+    )
+    end_autosave()
+
 def take_quiz_section():
-    quiz = st.session_state.quizzes[st.session_state.selected_quiz]
+    quiz = quizzes[st.session_state.selected_quiz]
     title = quiz.get('quiz_title', st.session_state.selected_quiz)
     dept = quiz.get('department', quiz.get('category', 'Uncategorized'))
     subcat = quiz.get('subcategory', '')
     original_questions = quiz.get("questions", [])
+    # Validated once at load/save time; the render loop only needs the result.
+    invalid_questions = get_catalog().validation(st.session_state.selected_quiz).invalid_questions
 
     st.header(f"Quiz: {title}")
     st.caption(f"Department: **{dept}**" + (f" • Topic: **{subcat}**" if subcat else ""))
 
     if st.session_state.quiz_start_time is None and not st.session_state.show_answers:
-        st.session_state.shuffled_questions = None
+        st.session_state.question_order = None
         st.session_state.option_shuffles = {}
+        st.session_state.correct_positions = {}
 
-    if st.session_state.shuffled_questions is None and original_questions:
-        shuffled_idx = list(range(len(original_questions)))
-        random.shuffle(shuffled_idx)
-        st.session_state.shuffled_questions = [original_questions[i] for i in shuffled_idx]
-
-        st.session_state.option_shuffles = {}
-        for orig_i, q in enumerate(original_questions):
-            opts = q.get("options", [])
-            if not opts: continue
-            opt_idx = list(range(len(opts)))
-            random.shuffle(opt_idx)
-            st.session_state.option_shuffles[orig_i] = opt_idx
+    if st.session_state.question_order is None and original_questions:
+        # The seed alone reproduces this paper, including which questions a
+        # pooled quiz drew; broken questions are never drawn into a pool.
+        seed = new_seed()
+        order, option_shuffles, correct_positions = paper_for_seed(quiz, seed, skip=invalid_questions)
+        st.session_state.paper_seed = seed
+        st.session_state.question_order = order
+        st.session_state.option_shuffles = option_shuffles
+        st.session_state.correct_positions = correct_positions
 
-    shuffled_questions = st.session_state.shuffled_questions or original_questions
+    question_order = st.session_state.question_order or list(range(len(original_questions)))
 
     timer_placeholder = st.empty()
 
     if st.session_state.quiz_start_time is None and not st.session_state.show_answers:
         st.info("Optional: choose a time limit for this attempt")
+        pool_size, _ = pool_spec(quiz)
+        if pool_size is not None and pool_size < len(original_questions):
+            st.caption(f"Each attempt draws {len(question_order)} of {len(original_questions)} questions.")
         time_options = [
             "No timer",
             "5 minutes", "10 minutes", "15 minutes", "20 minutes",
@@ -295,7 +707,28 @@ def take_quiz_section():
             index=0,
             key="time_limit_select"
         )
+        mode = FIXED_MODE
+        if adaptive.available(quiz):
+            mode = st.selectbox("Mode", options=[FIXED_MODE, ADAPTIVE_MODE], key="mode_select")
+        if mode == FIXED_MODE:
+            layouts = layout_options(quiz)
+            default_size = default_page_size(quiz)
+            layout = st.selectbox(
+                "Layout",
+                options=list(layouts),
+                index=list(layouts.values()).index(default_size) if default_size in layouts.values() else 1,
+                key="layout_select"
+            )
+        else:
+            rule = adaptive.settings(quiz)
+            st.caption(f"One question at a time, chosen to match your level; the quiz ends once your "
+                       f"score is estimated precisely enough ({rule.min_items}–{rule.max_items} questions).")
         if st.button("Start Quiz", type="primary"):
+            if mode == ADAPTIVE_MODE:
+                start_adaptive(quiz, invalid_questions)
+            else:
+                st.session_state.page_size = layouts[layout]
+            st.session_state.quiz_page = 0
             if selected_time != "No timer":
                 try:
                     minutes = int(selected_time.split()[0])
@@ -307,51 +740,65 @@ def take_quiz_section():
             else:
                 st.session_state.time_limit_minutes = None
                 st.session_state.quiz_start_time = datetime.now()
+            begin_autosave()
             st.rerun()
 
-    timer_running = False
     if st.session_state.quiz_start_time is not None and not st.session_state.show_answers:
-        elapsed = datetime.now() - st.session_state.quiz_start_time
-        remaining_sec = 999_999_999
-        if st.session_state.get('time_limit_minutes'):
-            remaining_sec = max(0, int(st.session_state.time_limit_minutes * 60 - elapsed.total_seconds()))
-        if remaining_sec <= 0 and st.session_state.get('time_limit_minutes'):
+        remaining_sec = remaining_seconds()
+        if remaining_sec is not None and remaining_sec <= 0:
             st.session_state.timer_expired = True
-            st.session_state.show_answers = True
+            finish_attempt(quiz, question_order)
             timer_placeholder.error("⏰ Time's up! Quiz auto-submitted.")
             st.rerun()
+        elif remaining_sec is not None:
+            with timer_placeholder:
+                render_countdown(remaining_sec)
+            watch_deadline(remaining_sec)
         else:
-            if st.session_state.get('time_limit_minutes'):
-                mins, secs = divmod(remaining_sec, 60)
-                timer_placeholder.caption(f"⏳ **Time remaining: {mins:02d}:{secs:02d}**")
-            else:
-                timer_placeholder.caption("⏳ No time limit")
-            timer_running = True
-
-    for i, q in enumerate(shuffled_questions):
-        st.subheader(f"Q{i+1}. {q.get('question', '—')}")
-        orig_idx = original_questions.index(q)
-        opts_orig = q.get("options", [])
-        correct = q.get("correct")
-
-        if not opts_orig or correct not in opts_orig:
+            timer_placeholder.caption("⏳ No time limit")
+
+    page_size = st.session_state.page_size
+    if page_size is None:
+        page_size = default_page_size(quiz)
+    if st.session_state.adaptive and not (st.session_state.show_answers or st.session_state.timer_expired):
+        # Only the current question; earlier answers fed the choice of this one.
+        n_pages, page, first = 1, 0, len(question_order) - 1
+        visible = question_order[first:]
+    else:
+        n_pages = -(-len(question_order) // page_size) if page_size else 1
+        page = min(st.session_state.quiz_page or 0, max(n_pages - 1, 0))
+        first = page * page_size
+        visible = question_order[first:first + page_size] if page_size else question_order
+
+    # Only the visible slice is rendered; answers are keyed by original index
+    # so they survive page changes.
+    for i, orig_idx in enumerate(visible, start=first):
+        if orig_idx in invalid_questions:
             st.error(f"Q{i+1}: Invalid question data")
             continue
+        q = original_questions[orig_idx]
+        st.subheader(f"Q{i+1}. {q.get('question', '—')}")
+        opts_orig = q["options"]
+        correct = q["correct"]
 
         shuffle_map = st.session_state.option_shuffles.get(orig_idx, list(range(len(opts_orig))))
         opts_shuffled = [opts_orig[j] for j in shuffle_map]
 
-        key = f"ans_{i}"
+        key = f"ans_{orig_idx}"
 
         if not st.session_state.show_answers and not st.session_state.timer_expired:
             choice = st.radio("Your answer:", opts_shuffled,
-                              index=st.session_state.user_answers.get(i, None),
+                              index=st.session_state.user_answers.get(orig_idx, None),
                               key=key, horizontal=False)
             if choice is not None:
-                st.session_state.user_answers[i] = opts_shuffled.index(choice)
+                answer = opts_shuffled.index(choice)
+                if answer != st.session_state.user_answers.get(orig_idx) and st.session_state.quiz_start_time:
+                    elapsed = datetime.now() - st.session_state.quiz_start_time
+                    st.session_state.answer_times[orig_idx] = elapsed.total_seconds()
+                st.session_state.user_answers[orig_idx] = answer
         else:
-            user_idx = st.session_state.user_answers.get(i, None)
-            correct_shuf_idx = shuffle_map.index(opts_orig.index(correct))
+            user_idx = st.session_state.user_answers.get(orig_idx, None)
+            correct_shuf_idx = st.session_state.correct_positions.get(orig_idx)
 
             st.radio("Your selection:", opts_shuffled,
                      index=user_idx if user_idx is not None else 0,
@@ -372,27 +819,29 @@ def take_quiz_section():
 
         st.markdown("---")
 
+    if st.session_state.quiz_start_time is not None and not st.session_state.show_answers:
+        autosave_attempt(quiz)
+
+    if n_pages > 1:
+        render_page_nav(page, n_pages, page_size, len(st.session_state.user_answers), len(question_order))
+
     quiz_ended = st.session_state.show_answers or st.session_state.timer_expired
 
     if not quiz_ended:
-        if st.button("Submit Quiz", type="primary"):
-            correct_count = 0
-            for i, q in enumerate(shuffled_questions):
-                orig_i = original_questions.index(q)
-                u_idx = st.session_state.user_answers.get(i)
-                if u_idx is None: continue
-                map_ = st.session_state.option_shuffles.get(orig_i, [])
-                orig_choice_idx = map_[u_idx]
-                if q["options"][orig_choice_idx] == q["correct"]:
-                    correct_count += 1
-            st.session_state.score = (correct_count, len(shuffled_questions))
-            st.session_state.show_answers = True
+        if st.session_state.adaptive:
+            adaptive_controls(quiz, invalid_questions)
+        elif st.button("Submit Quiz", type="primary"):
+            finish_attempt(quiz, question_order)
             st.rerun()
     else:
         if st.session_state.score:
             c, t = st.session_state.score
             pct = c / t * 100 if t > 0 else 0
             st.success(f"**Score: {c}/{t}** ({pct:.0f}%)")
+        if st.session_state.adaptive and st.session_state.ability:
+            theta, se = st.session_state.ability
+            st.info(f"Estimated ability: **{theta:+.2f}** (± {se:.2f}) on a scale where 0 is the "
+                    f"average candidate, from {len(question_order)} questions.")
 
         if not st.session_state.reveal_correct_answers:
             if st.button("Show correct answers & explanations"):
@@ -405,151 +854,319 @@ def take_quiz_section():
 
     if quiz_ended:
         if st.button("Restart this quiz"):
-            for k in ['user_answers','show_answers','score','quiz_start_time',
-                      'time_limit_minutes','timer_expired','reveal_correct_answers',
-                      'shuffled_questions','option_shuffles']:
-                if k in st.session_state:
-                    v = st.session_state[k]
-                    if isinstance(v, dict):
-                        v.clear()
-                    else:
-                        st.session_state[k] = None
+            reset_attempt_state()
             st.rerun()
 
-    if timer_running:
-        time.sleep(1)
+# ───────────────────────────────────────────────
+# Analytics dashboard (admin only)
+# ───────────────────────────────────────────────
+def analytics_section():
+    st.header("Question analytics")
+    titles = sorted(quizzes)
+    if not titles:
+        st.info("No quizzes yet.")
+        return
+    current = st.session_state.selected_quiz
+    title = st.selectbox("Quiz", titles, index=titles.index(current) if current in titles else 0,
+                         key="analytics_quiz")
+    quiz = quizzes[title]
+
+    if note := st.session_state.pop("rebuild_note", None):
+        st.warning(note)
+    conn = get_attempt_log().reader()
+    summary = analytics.quiz_summary(conn, title)
+    if summary is None:
+        st.info("No attempts recorded for this quiz yet.")
+        return
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Attempts", summary["attempts"])
+    c2.metric("Mean score", f"{summary['mean_score'] * 100:.0f}%")
+    c3.metric("Score SD", f"{summary['sd_score'] * 100:.0f}%")
+
+    rows = []
+    questions = quiz.get("questions", [])
+    difficulty, calibrated = adaptive.difficulties(conn, title, len(questions))
+    for orig_q, stats in analytics.question_report(conn, title).items():
+        q = questions[orig_q] if orig_q < len(questions) else {}
+        opts = q.get("options", [])
+        answered = sum(stats["option_counts"].values())
+        picks = " · ".join(
+            f"{'✓ ' if opts[j] == q.get('correct') else ''}{opts[j][:30]}: {n / answered:.0%}"
+            for j, n in sorted(stats["option_counts"].items()) if j < len(opts)
+        ) if answered else ""
+        rows.append({
+            "#": orig_q + 1,
+            "Question": q.get("question", "—")[:80],
+            "Responses": stats["responses"],
+            "p-value": stats["p_value"],
+            "Discrimination": stats["discrimination"],
+            "Difficulty (logit)": round(float(difficulty[orig_q]), 2)
+                                  if orig_q < len(questions) and calibrated[orig_q] else None,
+            "Median time (s)": stats["median_seconds"],
+            "Skipped": stats["skipped"],
+            "Option picks": picks,
+        })
+    st.dataframe(rows, hide_index=True, use_container_width=True)
+    st.caption("p-value = fraction correct; discrimination = point-biserial correlation "
+               "with the attempt score; time to answer is estimated from answer order; "
+               "difficulty is the Rasch estimate used by adaptive mode (refreshed in batch).")
+
+    col_rebuild, col_calibrate = st.columns(2)
+    if col_rebuild.button("Recompute from attempt log", help="Use after correcting the answer key"):
+        affected = analytics.rebuild(get_attempt_log(), title, quiz)
+        adaptive.rebuild(get_attempt_log(), title, quiz)
+        if affected:
+            st.session_state.rebuild_note = (f"{affected} attempt(s) included questions that have since "
+                                             "been removed; those questions were left out.")
+        st.rerun()
+    if col_calibrate.button("Refresh item difficulties",
+                            help=f"Questions with at least {adaptive.MIN_RESPONSES} responses"):
+        conn = get_attempt_log().connect()
+        adaptive.calibrate(conn, title)
+        conn.close()
         st.rerun()
 
 # ───────────────────────────────────────────────
-# Main Layout
+# Metrics (admin only)
 # ───────────────────────────────────────────────
-st.title("NextGen Dev")
-
-with st.sidebar:
-    if not is_admin():
-        with st.expander("Admin Zone"):
-            pwd = st.text_input("Admin password", type="password")
-            if st.button("Login as Admin"):
-                if pwd.strip() == ADMIN_PASSWORD:
-                    st.session_state.admin_logged_in = True
-                    st.rerun()
-                else:
-                    st.error("Wrong password")
+METRICS_FILE = DATA_DIR / "metrics.prom"
+
+def metrics_section():
+    st.header("Performance metrics")
+    m = get_metrics()
+    st.caption(f"Span timings from all sessions since "
+               f"{datetime.fromtimestamp(m.started):%Y-%m-%d %H:%M:%S}; percentiles are bucket estimates.")
+    rows = m.snapshot()
+    if rows:
+        st.dataframe(rows, hide_index=True, use_container_width=True)
     else:
-        st.success("Admin mode active")
-        if st.button("Logout"):
-            st.session_state.admin_logged_in = False
-            st.rerun()
+        st.info("No spans recorded yet.")
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.download_button("Prometheus text", m.prometheus_text(), file_name="quiz_app.prom",
+                       mime="text/plain")
+    if c2.button("Write metrics file"):
+        st.success(f"Wrote {m.dump(METRICS_FILE)}")
+    if c3.button("Profile next rerun", help="cProfile one full rerun of this session"):
+        st.session_state.profile_next_rerun = True
+        st.rerun()
+    if c4.button("Reset"):
+        m.reset()
+        st.rerun()
 
-    st.divider()
+    if st.session_state.get("last_profile"):
+        with st.expander("Last profiled rerun", expanded=True):
+            st.code(st.session_state.last_profile, language=None)
 
-    st.header("Filter Quizzes")
+# ───────────────────────────────────────────────
+# Export (admin only)
+# ───────────────────────────────────────────────
+# Files are generated only when a download button is clicked.  Streamlit
+# holds the finished file in server memory until the session ends, so the
+# app only offers exports up to export.UI_MAX_ROWS rows and points to the
+# CLI (which streams to disk) for anything bigger.
+def export_section():
+    import export
+    st.header("Export")
+    depts = st.session_state.selected_departments
+    subcats = st.session_state.selected_subcategories
+    catalog = get_catalog()
+    meta = export.select_titles(catalog, depts, subcats)
+    if depts:
+        st.caption(f"{len(meta)} quiz{'zes' if len(meta) != 1 else ''} in the sidebar selection: "
+                   + ", ".join(subcats or depts))
+    else:
+        st.caption(f"No department selected in the sidebar, so all {len(meta)} quizzes are exported "
+                   "(attempts at deleted quizzes included).")
+
+    fmt = st.radio("Format", export.available_formats(), format_func=str.upper, horizontal=True,
+                   key="export_format")
+    mime, suffix = export.FORMATS[fmt]
+    stamp = f"{datetime.now():%Y%m%d-%H%M}"
+    log = get_attempt_log()
+    n_attempts = export.attempt_count(log, meta, everything=not depts)
+    n_questions = export.question_count(catalog.quizzes, meta)
+    c1, c2 = st.columns(2)
+    if n_attempts <= export.UI_MAX_ROWS:
+        c1.download_button(
+            f"Download attempts ({n_attempts:,})",
+            lambda: b"".join(export.export_attempts(log, meta, fmt, everything=not depts)),
+            file_name=f"attempts-{stamp}{suffix}", mime=mime, on_click="ignore")
+    else:
+        c1.info(f"{n_attempts:,} attempts is too many to download here. Narrow the sidebar "
+                f"selection or run `python export.py attempts -o attempts{suffix}` on the server.")
+    if n_questions <= export.UI_MAX_ROWS:
+        c2.download_button(
+            f"Download question bank ({n_questions:,} questions)",
+            lambda: b"".join(export.export_questions(catalog.quizzes, meta, fmt)),
+            file_name=f"questions-{stamp}{suffix}", mime=mime, on_click="ignore")
+    else:
+        c2.info(f"{n_questions:,} questions is too many to download here. Narrow the sidebar "
+                f"selection or run `python export.py questions -o questions{suffix}` on the server.")
 
-    depts = get_all_departments()
+# ───────────────────────────────────────────────
+# Sidebar quiz list
+# ───────────────────────────────────────────────
+def render_quiz_list(items):
+    for label, real_title in items:
+        cols = st.columns([4, 1, 1])  # Title | Edit | Delete
+        with cols[0]:
+            active = real_title == st.session_state.selected_quiz
+            if st.button(label, key=f"q_{real_title}",
+                         type="primary" if active else "secondary",
+                         use_container_width=True):
+                if not active:
+                    st.session_state.selected_quiz = real_title
+                    reset_attempt_state()
+                    st.rerun()
 
-    selected_depts = st.multiselect(
-        "Department",
-        options=depts,
-        default=[],
-        placeholder="Select department(s)",
-        key="dept_multi"
-    )
+        with cols[1]:
+            if is_admin():
+                if st.button("✏️", key=f"e_{real_title}", help="Edit quiz"):
+                    st.session_state.edit_quiz_title = real_title
+                    st.session_state.edit_quiz_data = plain_quiz(quizzes[real_title])
+                    st.rerun()
 
-    selected_subcats = []
-    if selected_depts:
-        possible_subs = get_subcategories_for_depts(selected_depts)
-        if possible_subs:
-            selected_subcats = st.multiselect(
-                "Topic / Sub-category",
-                options=possible_subs,
-                default=[],
-                placeholder="All topics (optional)",
-                key="subcat_multi"
-            )
+        with cols[2]:
+            if is_admin():
+                if st.button("🗑", key=f"d_{real_title}", help="Delete quiz"):
+                    delete_quiz(real_title)
+                    st.rerun()
+
+# ───────────────────────────────────────────────
+# Main Layout
+# ───────────────────────────────────────────────
+def sidebar_section():
+    with st.sidebar, get_metrics().span("sidebar"):
+        if not is_admin():
+            with st.expander("Admin Zone"):
+                pwd = st.text_input("Admin password", type="password")
+                if st.button("Login as Admin"):
+                    if pwd.strip() == ADMIN_PASSWORD:
+                        st.session_state.admin_logged_in = True
+                        st.rerun()
+                    else:
+                        st.error("Wrong password")
         else:
-            st.caption("No sub-categories defined for selected department(s)")
+            st.success("Admin mode active")
+            st.radio("Admin view", ["Quizzes", "Analytics", "Metrics", "Export"], key="admin_view", horizontal=True)
+            if st.button("Logout"):
+                st.session_state.admin_logged_in = False
+                st.rerun()
 
-    st.session_state.selected_departments = selected_depts
-    st.session_state.selected_subcategories = selected_subcats
+        st.divider()
 
-    st.header("Available Quizzes")
+        st.header("Filter Quizzes")
 
-    if not selected_depts:
-        st.info("Select at least one department to see quizzes.")
-    else:
-        filtered = {}
-        for title, quiz in st.session_state.quizzes.items():
-            dept = quiz.get("department") or quiz.get("category", "Uncategorized")
-            sub = quiz.get("subcategory", "")
-
-            dept_ok = dept in selected_depts
-            sub_ok = (not selected_subcats) or (sub and sub in selected_subcats)
-
-            if dept_ok and sub_ok:
-                label = title
-                if sub:
-                    label += f" ({sub})"
-                elif dept != "Uncategorized":
-                    label += f" ({dept})"
-                filtered[label] = title
-
-        if not filtered:
-            msg = "No quizzes match the selected "
-            if selected_subcats:
-                msg += f"topics: {', '.join(selected_subcats)}"
+        depts = get_all_departments()
+
+        selected_depts = st.multiselect(
+            "Department",
+            options=depts,
+            default=[],
+            placeholder="Select department(s)",
+            key="dept_multi"
+        )
+
+        selected_subcats = []
+        if selected_depts:
+            possible_subs = get_subcategories_for_depts(selected_depts)
+            if possible_subs:
+                selected_subcats = st.multiselect(
+                    "Topic / Sub-category",
+                    options=possible_subs,
+                    default=[],
+                    placeholder="All topics (optional)",
+                    key="subcat_multi"
+                )
+            else:
+                st.caption("No sub-categories defined for selected department(s)")
+
+        st.session_state.selected_departments = selected_depts
+        st.session_state.selected_subcategories = selected_subcats
+
+        st.header("Available Quizzes")
+
+        search_query = st.text_input("Search quizzes", placeholder="Title, question or explanation…",
+                                     key="quiz_search").strip()
+
+        if search_query:
+            with get_metrics().span("sidebar.filter"):
+                matches = get_catalog().search(search_query, selected_depts, selected_subcats)
+            if not matches:
+                st.info(f"No quizzes match “{search_query}”.")
             else:
-                msg += f"department{'s' if len(selected_depts)>1 else ''}"
-            st.info(msg + ".")
+                st.caption(f"{len(matches)} match{'es' if len(matches)!=1 else ''}")
+                render_quiz_list([(quiz_label(*m), m[0]) for m in matches])
+        elif not selected_depts:
+            st.info("Select at least one department to see quizzes.")
         else:
-            st.caption(f"Found {len(filtered)} quiz{'zes' if len(filtered)!=1 else ''}")
-            for label, real_title in sorted(filtered.items()):
-                cols = st.columns([4, 1, 1])  # Title | Edit | Delete
-                with cols[0]:
-                    active = real_title == st.session_state.selected_quiz
-                    if st.button(label, key=f"q_{real_title}",
-                                 type="primary" if active else "secondary",
-                                 use_container_width=True):
-                        if not active:
-                            st.session_state.selected_quiz = real_title
-                            for k in ['user_answers','show_answers','score','quiz_start_time',
-                                      'time_limit_minutes','timer_expired','reveal_correct_answers',
-                                      'shuffled_questions','option_shuffles']:
-                                if k in st.session_state:
-                                    v = st.session_state[k]
-                                    if isinstance(v, dict):
-                                        v.clear()
-                                    else:
-                                        st.session_state[k] = None
-                            st.rerun()
-
-                with cols[1]:
-                    if is_admin():
-                        if st.button("✏️", key=f"e_{real_title}", help="Edit quiz"):
-                            st.session_state.edit_quiz_title = real_title
-                            st.session_state.edit_quiz_data = st.session_state.quizzes[real_title].copy()
-                            st.rerun()
-
-                with cols[2]:
-                    if is_admin():
-                        if st.button("🗑", key=f"d_{real_title}", help="Delete quiz"):
-                            delete_quiz(real_title)
-                            st.rerun()
-
-    st.divider()
-
-    if is_admin():
-        submit_quiz_section()
+            with get_metrics().span("sidebar.filter"):
+                filtered = {quiz_label(*m): m[0] for m in get_catalog().filter(selected_depts, selected_subcats)}
+
+            if not filtered:
+                msg = "No quizzes match the selected "
+                if selected_subcats:
+                    msg += f"topics: {', '.join(selected_subcats)}"
+                else:
+                    msg += f"department{'s' if len(selected_depts)>1 else ''}"
+                st.info(msg + ".")
+            else:
+                st.caption(f"Found {len(filtered)} quiz{'zes' if len(filtered)!=1 else ''}")
+                render_quiz_list(sorted(filtered.items()))
+
+        st.divider()
+
+        if is_admin():
+            submit_quiz_section()
+        else:
+            st.caption("Quiz creation restricted to admin.")
+
+def main_section():
+    if is_admin() and st.session_state.get("admin_view") == "Analytics":
+        analytics_section()
+    elif is_admin() and st.session_state.get("admin_view") == "Metrics":
+        metrics_section()
+    elif is_admin() and st.session_state.get("admin_view") == "Export":
+        export_section()
+    elif st.session_state.selected_quiz in quizzes:
+        with get_metrics().span("take_quiz_section"):
+            take_quiz_section()
+    elif not st.session_state.selected_departments:
+        st.info("Select at least one department from the sidebar to view available quizzes.")
     else:
-        st.caption("Quiz creation restricted to admin.")
-
-# ── Main content ────────────────────────────────────────
-if not st.session_state.selected_departments:
-    st.info("Select at least one department from the sidebar to view available quizzes.")
-elif st.session_state.selected_quiz:
-    take_quiz_section()
-else:
-    st.info("Choose a quiz from the list in the sidebar.")
-
-# ── Edit form (shown in main area when active) ───────────────
-if is_admin() and st.session_state.get('edit_quiz_title'):
-    edit_quiz_form()
+        st.info("Choose a quiz from the list in the sidebar.")
+
+    # Edit form (shown in main area when active)
+    if is_admin() and st.session_state.get('edit_quiz_title'):
+        edit_quiz_form()
+
+# ───────────────────────────────────────────────
+# Rerun
+# ───────────────────────────────────────────────
+# Streamlit runs this script as __main__.  Worker processes started with
+# "spawn" (bulk import) re-import it as __mp_main__ and must only get the
+# definitions above, not open the catalog or start background threads.
+if __name__ == "__main__":
+    for k, v in defaults.items():
+        if k not in st.session_state:
+            st.session_state[k] = v
+
+    rerun_started = time.perf_counter()
+    profiler = start_profiler()
+    quizzes = load_quizzes()
+
+    st.title("NextGen Dev")
+
+    try:
+        resume_attempt()
+        sidebar_section()
+        main_section()
+    finally:
+        # Also runs when st.rerun() cuts the script short.
+        get_metrics().observe("rerun", time.perf_counter() - rerun_started)
+        if profiler is not None:
+            st.session_state.last_profile = profiler.stop()
+
+    if profiler is not None:
+        st.rerun()  # the profile only exists now; show it
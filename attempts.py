@@ -0,0 +1,287 @@
+"""Persistent log of completed quiz attempts.
+
+Attempts are appended to an SQLite database in WAL mode.  ``record()`` only
+enqueues; a single background writer thread drains the queue and inserts in
+batches, so a submit never waits on disk.  Readers use their own per-thread
+connections and never block the writer.
+
+A batch that hits a transient error (``database is locked`` once the busy
+timeout runs out, a full disk) is retried with backoff for up to
+``RETRY_FOR`` seconds; only rows that can never be written are dropped.
+"""
+import atexit
+import itertools
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    id                 INTEGER PRIMARY KEY,
+    quiz_title         TEXT    NOT NULL,
+    started_at         REAL,
+    submitted_at       REAL    NOT NULL,
+    duration_sec       REAL,
+    time_limit_minutes INTEGER,
+    timer_expired      INTEGER NOT NULL DEFAULT 0,
+    correct            INTEGER NOT NULL,
+    total              INTEGER NOT NULL,
+    question_order     TEXT    NOT NULL,
+    option_shuffles    TEXT    NOT NULL,
+    user_answers       TEXT    NOT NULL,
+    answer_times       TEXT,
+    seed               INTEGER,
+    adaptive           INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_quiz_time ON attempts (quiz_title, submitted_at);
+CREATE INDEX IF NOT EXISTS idx_attempts_time ON attempts (submitted_at);
+"""
+
+COLUMNS = ("quiz_title", "started_at", "submitted_at", "duration_sec", "time_limit_minutes",
+           "timer_expired", "correct", "total", "question_order", "option_shuffles", "user_answers",
+           "answer_times", "seed", "adaptive")
+JSON_COLUMNS = ("question_order", "option_shuffles", "user_answers", "answer_times")
+# Columns added after the first release: name -> SQL type
+MIGRATIONS = {"answer_times": "TEXT", "seed": "INTEGER", "adaptive": "INTEGER NOT NULL DEFAULT 0"}
+
+RETRY_FOR = 300.0     # seconds a batch is retried on OperationalError before it is dropped
+RETRY_DELAYS = (0.1, 0.5, 1.0, 2.0, 5.0)   # backoff between retries; the last one repeats
+
+_STOP = object()
+log = logging.getLogger(__name__)
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+class AttemptLog:
+    def __init__(self, path, batch_size=500, flush_interval=0.5):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        conn = self.connect()
+        conn.executescript(SCHEMA)
+        have = {row["name"] for row in conn.execute("PRAGMA table_info(attempts)")}
+        for column, sql_type in MIGRATIONS.items():
+            if column not in have:
+                conn.execute(f"ALTER TABLE attempts ADD COLUMN {column} {sql_type}")
+        conn.close()
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._hooks = []
+        self._writer = threading.Thread(target=self._run, name="attempt-log-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # ───────────────────────────────────────────────
+    # Writing
+    # ───────────────────────────────────────────────
+    def connect(self):
+        return connect(self.path)
+
+    def add_hook(self, fn):
+        """Run ``fn(conn, rows)`` inside each batch's insert transaction."""
+        self._hooks.append(fn)
+
+    def record(self, quiz_title, question_order, option_shuffles, user_answers, correct, total,
+               started_at=None, submitted_at=None, time_limit_minutes=None, timer_expired=False,
+               answer_times=None, responses=None, seed=None, adaptive=False):
+        submitted_at = submitted_at or time.time()
+        row = {
+            "quiz_title": quiz_title,
+            "started_at": started_at,
+            "submitted_at": submitted_at,
+            "duration_sec": submitted_at - started_at if started_at else None,
+            "time_limit_minutes": time_limit_minutes,
+            "timer_expired": int(bool(timer_expired)),
+            "correct": correct,
+            "total": total,
+            "question_order": list(question_order),
+            "option_shuffles": {int(k): list(v) for k, v in option_shuffles.items()},
+            "user_answers": {int(k): v for k, v in user_answers.items()},
+            "answer_times": {int(k): round(v, 1) for k, v in (answer_times or {}).items()},
+            # Regenerates the paper via paper.paper_for_seed while the quiz is unchanged.
+            "seed": seed,
+            # Adaptive attempts are left out of item calibration (see adaptive.py).
+            "adaptive": int(bool(adaptive)),
+            # Not stored in the attempts table; consumed by hooks (analytics).
+            "responses": responses,
+        }
+        self._queue.put(row)
+        return row
+
+    def flush(self):
+        """Block until everything recorded so far has been written."""
+        self._queue.join()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    def _run(self):
+        conn = self.connect()
+        sql = f"INSERT INTO attempts ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            rows = [r for r in batch if r is not _STOP]
+            stop = len(rows) != len(batch)
+            try:
+                if rows:
+                    self._write(conn, sql, rows)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        conn.close()
+
+    def _write(self, conn, sql, rows):
+        encoded = []
+        for r in rows:
+            try:
+                encoded.append((r, _encode(r)))
+            except (TypeError, ValueError):
+                log.exception("Dropped an attempt at %r that cannot be stored", r.get("quiz_title"))
+        rows = [r for r, _ in encoded]
+        if not rows:
+            return
+        give_up = time.monotonic() + RETRY_FOR
+        for retry in itertools.count():
+            try:
+                with conn:
+                    conn.executemany(sql, [values for _, values in encoded])
+                    for hook in self._hooks:
+                        self._run_hook(conn, hook, rows)
+                return
+            except sqlite3.OperationalError as e:
+                # A locked or busy database or a full disk: worth waiting for.
+                if time.monotonic() >= give_up:
+                    log.exception("Dropped %d attempt(s) after retrying for %.0f s", len(rows), RETRY_FOR)
+                    return
+                delay = RETRY_DELAYS[min(retry, len(RETRY_DELAYS) - 1)]
+                log.warning("Writing %d attempt(s) failed (%s); retrying in %.1f s", len(rows), e, delay)
+                time.sleep(delay)
+            except sqlite3.Error:
+                log.exception("Dropped %d attempt(s) that could not be written", len(rows))
+                return
+
+    def _run_hook(self, conn, hook, rows):
+        # A failing hook must not cost us the attempts themselves.
+        conn.execute("SAVEPOINT hook")
+        try:
+            hook(conn, rows)
+        except Exception:
+            conn.execute("ROLLBACK TO hook")
+            log.exception("Attempt-log hook %r failed", hook)
+        conn.execute("RELEASE hook")
+
+    # ───────────────────────────────────────────────
+    # Reading
+    # ───────────────────────────────────────────────
+    def reader(self):
+        """Per-thread connection for read queries."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self.connect()
+        return conn
+
+    def query(self, quiz_title=None, since=None, until=None, limit=None, newest_first=True):
+        where, params = [], []
+        if quiz_title is not None:
+            where.append("quiz_title = ?")
+            params.append(quiz_title)
+        if since is not None:
+            where.append("submitted_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("submitted_at < ?")
+            params.append(until)
+        sql = "SELECT * FROM attempts"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY submitted_at {'DESC' if newest_first else 'ASC'}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [_decode(row) for row in self.reader().execute(sql, params)]
+
+    def iter_chunks(self, quiz_title=None, chunk_size=5000, titles=None, decode=True,
+                    after_id=None, up_to_id=None, conn=None):
+        """Yield lists of decoded attempts, oldest first, without loading them all.
+
+        ``titles`` restricts the scan to a set of quizzes (joined through a
+        temp table, so it may be large); with ``decode=False`` rows are plain
+        dicts whose JSON columns are left as text.  ``after_id`` / ``up_to_id``
+        bound the attempt ids (see ``last_id()``).  ``conn`` reads through an
+        open connection, e.g. inside a write transaction, instead of a new one.
+        """
+        own = conn is None
+        if own:
+            conn = self.connect()
+        sql = "SELECT attempts.* FROM attempts"
+        where, params = [], []
+        if titles is not None:
+            conn.execute("CREATE TEMP TABLE selected_titles (title TEXT PRIMARY KEY)")
+            conn.executemany("INSERT OR IGNORE INTO selected_titles VALUES (?)", ((t,) for t in titles))
+            sql += " JOIN selected_titles ON title = quiz_title"
+        if quiz_title is not None:
+            where.append("quiz_title = ?")
+            params.append(quiz_title)
+        if after_id is not None:
+            where.append("id > ?")
+            params.append(after_id)
+        if up_to_id is not None:
+            where.append("id <= ?")
+            params.append(up_to_id)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        cursor = conn.execute(sql + " ORDER BY submitted_at", params)
+        try:
+            while rows := cursor.fetchmany(chunk_size):
+                yield [_decode(row) if decode else dict(row) for row in rows]
+        finally:
+            cursor.close()
+            if own:
+                conn.close()
+
+    def last_id(self):
+        """Id of the newest attempt written so far (0 if there are none)."""
+        return self.reader().execute("SELECT MAX(id) FROM attempts").fetchone()[0] or 0
+
+    def summary(self):
+        """Attempt count and mean score fraction per quiz."""
+        sql = ("SELECT quiz_title, COUNT(*) AS attempts, "
+               "AVG(CAST(correct AS REAL) / NULLIF(total, 0)) AS mean_score, "
+               "MAX(submitted_at) AS last_submitted "
+               "FROM attempts GROUP BY quiz_title ORDER BY quiz_title")
+        return [dict(row) for row in self.reader().execute(sql)]
+
+
+def _encode(row):
+    return tuple(json.dumps(row[c], separators=(",", ":")) if c in JSON_COLUMNS else row[c]
+                 for c in COLUMNS)
+
+
+def _decode(row):
+    data = dict(row)
+    for c in JSON_COLUMNS:
+        if data[c] is not None:
+            data[c] = json.loads(data[c])
+    return data
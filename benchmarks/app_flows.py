@@ -0,0 +1,204 @@
+"""Headless end-to-end benchmark of app.py with ``streamlit.testing.v1.AppTest``.
+
+Drives the main flow - select a department, open a quiz, start a timed
+attempt, answer, submit, reveal - against synthetic corpora and reports, per
+step, the script run time, Python allocations (tracemalloc peak) and RSS.
+Each corpus size runs in a fresh interpreter so caches and RSS start cold.
+
+``--sessions N`` additionally keeps N sessions open in one process, sharing
+the process-wide catalog as real sessions do, interleaves their reruns and
+reports rerun latency percentiles, throughput and RSS growth.
+
+    python -m benchmarks.app_flows --sizes 10 1000 10000
+    python -m benchmarks.app_flows --sizes 1000 --sessions 16 --json bench.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.corpus import rss_mb, write_corpus
+
+APP = Path(__file__).resolve().parent.parent / "app.py"
+STEPS = ["load", "select department", "open quiz", "start timed quiz", "answer", "submit", "reveal"]
+
+
+# ───────────────────────────────────────────────
+# One session
+# ───────────────────────────────────────────────
+def run_flow(timings=None, timeout=120):
+    """Run the whole flow once; returns ``{step: seconds}`` for its reruns."""
+    timings = {} if timings is None else timings
+    for step, seconds in flow_steps(timeout):
+        timings[step] = seconds
+    return timings
+
+
+def flow_steps(timeout=120):
+    """Generator form of the flow: yields ``(step, seconds)`` after each rerun,
+    so several sessions can be interleaved."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(APP), default_timeout=timeout)
+
+    def button(label):
+        return next(b for b in at.button if b.label == label)
+
+    def start():
+        at.selectbox(key="time_limit_select").set_value("10 minutes")
+        button("Start Quiz").click()
+
+    actions = [
+        ("load", None),
+        ("select department", lambda: at.multiselect(key="dept_multi").select(
+            at.multiselect(key="dept_multi").options[0])),
+        ("open quiz", lambda: next(b for b in at.sidebar.button if b.key and b.key.startswith("q_")).click()),
+        ("start timed quiz", start),
+        ("answer", lambda: [r.set_value(r.options[0]) for r in at.radio]),
+        ("submit", lambda: button("Submit Quiz").click()),
+        ("reveal", lambda: button("Show correct answers & explanations").click()),
+    ]
+    for name, action in actions:
+        if action is not None:
+            action()
+        t0 = time.perf_counter()
+        at.run()
+        seconds = time.perf_counter() - t0
+        if at.exception:
+            raise RuntimeError(f"{name}: {at.exception[0].value}")
+        yield name, seconds
+
+
+def measure(iterations):
+    """Cold first run, warm median per step, and allocation peaks from one traced run."""
+    base = rss_mb()
+    cold = run_flow()
+    rss_cold = rss_mb() - base
+    warm = [run_flow() for _ in range(iterations)]
+
+    allocs = {}
+    tracemalloc.start()
+    _traced_flow(allocs)
+    tracemalloc.stop()
+
+    return {
+        "cold_s": cold,
+        "warm_s": {s: statistics.median(w[s] for w in warm) for s in STEPS} if warm else {},
+        "alloc_peak_kb": allocs,
+        "rss_after_cold_mb": round(rss_cold, 1),
+        "rss_total_mb": round(rss_mb(), 1),
+    }
+
+
+def _traced_flow(allocs):
+    # Same flow; per rerun, the tracemalloc peak above what was live before it.
+    start = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    for step, _ in flow_steps():
+        current, peak = tracemalloc.get_traced_memory()
+        allocs[step] = round((peak - start) / 1024, 1)
+        start = current
+        tracemalloc.reset_peak()
+
+
+# ───────────────────────────────────────────────
+# Concurrent sessions
+# ───────────────────────────────────────────────
+def run_concurrent(n_sessions, iterations):
+    """``n_sessions`` live sessions whose reruns are interleaved round-robin.
+
+    AppTest drives the script runner on the calling thread's behalf and is not
+    safe to use from several threads at once, so concurrency is simulated by
+    keeping all sessions open and alternating their reruns; they share the
+    process-wide catalog and attempt log exactly like browser sessions do.
+    """
+    run_flow()   # warm the shared catalog first, as a running server would be
+    latencies = []
+    base = rss_mb()
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        sessions = [flow_steps() for _ in range(n_sessions)]
+        while sessions:
+            for flow in list(sessions):
+                step = next(flow, None)
+                if step is None:
+                    sessions.remove(flow)
+                else:
+                    latencies.append(step[1])
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+    return {
+        "sessions": n_sessions,
+        "reruns": len(latencies),
+        "reruns_per_s": round(len(latencies) / elapsed, 1),
+        "p50_s": pct(0.50), "p95_s": pct(0.95), "max_s": latencies[-1],
+        "rss_delta_mb": round(rss_mb() - base, 1),
+    }
+
+
+# ───────────────────────────────────────────────
+# Driver
+# ───────────────────────────────────────────────
+def run_size(n_quizzes, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        write_corpus(Path(tmp) / "quizzes", n_quizzes, args.questions)
+        cmd = [sys.executable, "-m", "benchmarks.app_flows", "--run", tmp,
+               "--iterations", str(args.iterations), "--sessions", str(args.sessions)]
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(APP.parent),
+                                                                         os.environ.get("PYTHONPATH")]))}
+        out = subprocess.run(cmd, capture_output=True, text=True, check=True, env=env).stdout
+        return json.loads(out.strip().splitlines()[-1])
+
+
+def report(n_quizzes, r):
+    print(f"\n{n_quizzes} quizzes   RSS after first session +{r['rss_after_cold_mb']:.1f} MB "
+          f"(total {r['rss_total_mb']:.1f} MB)")
+    print(f"  {'step':<20}{'cold ms':>10}{'warm ms':>10}{'alloc peak KB':>16}")
+    for s in STEPS:
+        warm = r["warm_s"].get(s)
+        print(f"  {s:<20}{r['cold_s'][s] * 1000:>10.1f}"
+              f"{(warm * 1000 if warm is not None else float('nan')):>10.1f}"
+              f"{r['alloc_peak_kb'].get(s, float('nan')):>16.1f}")
+    c = r.get("concurrent")
+    if c:
+        print(f"  {c['sessions']} concurrent sessions: {c['reruns']} reruns, {c['reruns_per_s']}/s, "
+              f"p50 {c['p50_s'] * 1000:.1f} ms, p95 {c['p95_s'] * 1000:.1f} ms, "
+              f"max {c['max_s'] * 1000:.1f} ms, RSS {c['rss_delta_mb']:+.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=3, help="warm runs per size")
+    parser.add_argument("--sessions", type=int, default=0, help="also run N concurrent sessions")
+    parser.add_argument("--json", help="write raw results here (for CI comparisons)")
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        os.chdir(args.run)   # app.py resolves quizzes/ and data/ relative to the cwd
+        result = measure(args.iterations)
+        if args.sessions:
+            result["concurrent"] = run_concurrent(args.sessions, max(1, args.iterations))
+        print(json.dumps(result))
+        return
+
+    results = {}
+    for n in args.sizes:
+        results[n] = run_size(n, args)
+        report(n, results[n])
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Synthetic quiz corpora for the benchmarks in this directory."""
+import json
+import os
+import random
+from pathlib import Path
+
+DEPARTMENTS = ["Python Programming", "Mathematics", "Networking", "Databases", "Security"]
+SUBCATEGORIES = ["Basics", "Intermediate", "Advanced", "Exam Prep", ""]
+WORDS = ("variable loop function class module packet router subnet index "
+         "query join schema cipher hash token matrix vector proof lemma").split()
+
+
+def make_question(rng, n, n_options=4):
+    opts = [f"Option {k} " + " ".join(rng.choices(WORDS, k=3)) for k in range(n_options)]
+    return {
+        "question": f"Question {n}: " + " ".join(rng.choices(WORDS, k=12)) + "?",
+        "options": opts,
+        "correct": rng.choice(opts),
+        "explanation": " ".join(rng.choices(WORDS, k=25)),
+    }
+
+
+def make_quiz(title, n_questions, seed=0):
+    rng = random.Random(seed)
+    quiz = {
+        "quiz_title": title,
+        "department": rng.choice(DEPARTMENTS),
+        "questions": [make_question(rng, n) for n in range(n_questions)],
+    }
+    sub = rng.choice(SUBCATEGORIES)
+    if sub:
+        quiz["subcategory"] = sub
+    return quiz
+
+
+def write_corpus(directory, n_quizzes, n_questions=20, seed=0):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(n_quizzes):
+        quiz = make_quiz(f"Synthetic Quiz {i:05d}", n_questions, seed=seed + i)
+        with open(directory / f"Synthetic Quiz {i:05d}.json", "w", encoding="utf-8") as f:
+            json.dump(quiz, f, indent=2, ensure_ascii=False)
+    return directory
+
+
+def rss_mb():
+    # Current resident set size (Linux); falls back to peak RSS elsewhere.
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
@@ -0,0 +1,69 @@
+"""Render + score lookups for very long quizzes.
+
+"before" replays the old loop, which located every shuffled question with
+``original_questions.index(q)``; "after" walks the precomputed permutation
+from ``paper.build_paper``.
+
+    python -m benchmarks.question_index --sizes 1000 10000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.corpus import make_quiz
+from paper import build_paper
+from scoring import score_attempt
+
+
+def before(questions, answers):
+    shuffled = list(questions)
+    random.shuffle(shuffled)
+    option_shuffles = {}
+    for orig_i, q in enumerate(questions):
+        opt_idx = list(range(len(q["options"])))
+        random.shuffle(opt_idx)
+        option_shuffles[orig_i] = opt_idx
+    # render pass
+    for q in shuffled:
+        orig_idx = questions.index(q)
+        shuffle_map = option_shuffles[orig_idx]
+        shuffle_map.index(q["options"].index(q["correct"]))
+    # scoring pass
+    correct_count = 0
+    for i, q in enumerate(shuffled):
+        orig_i = questions.index(q)
+        u_idx = answers.get(i)
+        if u_idx is None:
+            continue
+        if q["options"][option_shuffles[orig_i][u_idx]] == q["correct"]:
+            correct_count += 1
+    return correct_count
+
+
+def after(questions, answers):
+    order, option_shuffles, correct_positions = build_paper(questions)
+    for orig_idx in order:
+        option_shuffles[orig_idx]
+        correct_positions.get(orig_idx)
+    attempt = {"question_order": order, "option_shuffles": option_shuffles, "user_answers": answers}
+    return score_attempt({"questions": questions}, attempt)[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        questions = make_quiz("bench", n)["questions"]
+        answers = {i: random.randrange(4) for i in range(n)}
+        row = [f"{n:>6} questions"]
+        for fn in (before, after):
+            t0 = time.perf_counter()
+            fn(questions, answers)
+            row.append(f"{fn.__name__} {time.perf_counter() - t0:8.3f}s")
+        print("  ".join(row))
+
+
+if __name__ == "__main__":
+    main()
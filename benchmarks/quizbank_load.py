@@ -0,0 +1,65 @@
+"""Cold start and RSS: JSON directory vs packed ``.qbank``.
+
+Each mode runs in a fresh interpreter, builds a ``QuizCatalog`` over its
+directory and renders one question of one quiz, which is what the first
+rerun of a new server process does.
+
+    python -m benchmarks.quizbank_load --quizzes 2000 --questions 50
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpus import make_quiz, rss_mb, write_corpus
+
+
+def run_mode(directory):
+    base = rss_mb()
+    t0 = time.perf_counter()
+    from catalog import QuizCatalog
+
+    catalog = QuizCatalog(directory)
+    quizzes = catalog.refresh()
+    quiz = quizzes[sorted(quizzes)[len(quizzes) // 2]]
+    quiz["questions"][0].get("question")
+    return {"seconds": time.perf_counter() - t0, "rss_delta_mb": rss_mb() - base,
+            "quizzes": len(quizzes)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quizzes", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_mode(args.run)))
+        return
+
+    from quizbank import pack
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_dir = write_corpus(Path(tmp) / "json", args.quizzes, args.questions)
+        bank_dir = Path(tmp) / "bank"
+        bank_dir.mkdir()
+        pack((make_quiz(f"Synthetic Quiz {i:05d}", args.questions, seed=i) for i in range(args.quizzes)),
+             bank_dir / "bank.qbank")
+        json_size = sum(f.stat().st_size for f in json_dir.iterdir()) / 2**20
+        bank_size = (bank_dir / "bank.qbank").stat().st_size / 2**20
+
+        print(f"{args.quizzes} quizzes x {args.questions} questions")
+        for label, directory, size in (("json", json_dir, json_size), ("qbank", bank_dir, bank_size)):
+            out = subprocess.run([sys.executable, "-m", "benchmarks.quizbank_load", "--run", str(directory)],
+                                 capture_output=True, text=True, check=True).stdout
+            r = json.loads(out)
+            print(f"  {label:<6} on disk {size:7.1f} MB   cold start {r['seconds']:6.2f}s   "
+                  f"RSS +{r['rss_delta_mb']:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
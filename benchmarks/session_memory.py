@@ -0,0 +1,84 @@
+"""Memory cost of N concurrent sessions against a large quiz directory.
+
+Compares the old layout, where every session parsed its own copy of the
+corpus into ``st.session_state.quizzes``, with the shared ``QuizCatalog``
+where sessions only hold per-attempt state.  Each mode runs in a fresh
+interpreter so the RSS numbers do not contaminate each other.
+
+    python -m benchmarks.session_memory --sessions 50 --quizzes 500
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.corpus import rss_mb, write_corpus
+
+
+def per_session_copy(directory):
+    quizzes = {}
+    for file in Path(directory).glob("*.json"):
+        with open(file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+            quizzes[data.get("quiz_title", file.stem)] = data
+    return quizzes
+
+
+def attempt_state(title):
+    return {
+        "selected_quiz": title,
+        "user_answers": {0: 1, 1: 3},
+        "shuffled_questions": None,
+        "option_shuffles": {},
+    }
+
+
+def run_mode(mode, directory, n_sessions):
+    from catalog import QuizCatalog
+
+    base = rss_mb()
+    sessions = []
+    if mode == "before":
+        for _ in range(n_sessions):
+            state = attempt_state(None)
+            state["quizzes"] = per_session_copy(directory)
+            sessions.append(state)
+    else:
+        catalog = QuizCatalog(directory)
+        catalog.refresh()
+        for _ in range(n_sessions):
+            catalog.refresh()
+            sessions.append(attempt_state(None))
+    return {"mode": mode, "sessions": len(sessions), "rss_delta_mb": round(rss_mb() - base, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--quizzes", type=int, default=500)
+    parser.add_argument("--questions", type=int, default=30)
+    parser.add_argument("--mode", choices=["before", "after"], help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.dir, args.sessions)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_corpus(tmp, args.quizzes, args.questions)
+        print(f"{args.sessions} sessions, {args.quizzes} quizzes x {args.questions} questions")
+        for mode in ("before", "after"):
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.session_memory", "--mode", mode,
+                 "--dir", tmp, "--sessions", str(args.sessions)],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(out)
+            print(f"  {mode:<6}  RSS +{result['rss_delta_mb']:>8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
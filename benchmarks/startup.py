@@ -0,0 +1,101 @@
+"""Time to first render of app.py in a freshly started server process.
+
+Each run is a new interpreter rendering the first page of a new session with
+``streamlit.testing.v1.AppTest``, so module imports and the catalog load are
+paid again every time.  Per corpus size it measures
+
+* cold   - no catalog snapshot yet: every quiz file is parsed;
+* warm   - a restart with the snapshot written by the cold run;
+* stale  - a restart after one quiz file changed on disk.
+
+``wall`` includes interpreter start-up and importing Streamlit (and, for the
+cold start, waiting for the snapshot to be written); ``render`` is the first
+``AppTest.run()`` alone (app modules + catalog + first page).
+
+    python -m benchmarks.startup --sizes 10 1000 10000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.corpus import write_corpus
+
+APP = Path(__file__).resolve().parent.parent / "app.py"
+SNAPSHOT = Path("data") / "catalog.pickle"
+
+
+def first_render():
+    t0 = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    t1 = time.perf_counter()
+    at = AppTest.from_file(str(APP), default_timeout=300).run()
+    t2 = time.perf_counter()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    app_modules = sorted(m for m in ("bulk_import", "export", "adaptive", "analytics")
+                         if m in sys.modules)
+    return {"import_streamlit": t1 - t0, "render": t2 - t1, "app_modules": app_modules}
+
+
+def run_once(workdir):
+    cmd = [sys.executable, "-m", "benchmarks.startup", "--run", str(workdir)]
+    env = {**os.environ, "PYTHONPATH": str(APP.parent), "QUIZ_WATCH": "poll"}
+    t0 = time.perf_counter()
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True, env=env).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+    result["wall"] = time.perf_counter() - t0
+    return result
+
+
+def run_size(n_quizzes, n_questions):
+    with tempfile.TemporaryDirectory() as tmp:
+        write_corpus(Path(tmp) / "quizzes", n_quizzes, n_questions)
+        results = {"cold": run_once(tmp)}
+        results["warm"] = run_once(tmp)
+        changed = next((Path(tmp) / "quizzes").glob("*.json"))
+        changed.write_text(changed.read_text(encoding="utf-8").replace("Question 0", "Question zero"),
+                           encoding="utf-8")
+        results["stale"] = run_once(tmp)
+        results["snapshot_mb"] = ((Path(tmp) / SNAPSHOT).stat().st_size / 2**20
+                                  if (Path(tmp) / SNAPSHOT).exists() else None)
+    return results
+
+
+def report(n_quizzes, results):
+    print(f"\n{n_quizzes} quizzes" + (f" (snapshot {results['snapshot_mb']:.1f} MB)"
+                                     if results["snapshot_mb"] is not None else " (no snapshot)"))
+    print(f"  {'start':<6} {'wall':>8} {'render':>8}  modules imported")
+    for kind in ("cold", "warm", "stale"):
+        r = results[kind]
+        print(f"  {kind:<6} {r['wall']:>7.2f}s {r['render']:>7.2f}s  {', '.join(r['app_modules']) or '-'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--run", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        os.chdir(args.run)   # app.py resolves quizzes/ and data/ relative to the cwd
+        result = first_render()
+        # The snapshot is written in the background; let a cold start finish it.
+        deadline = time.monotonic() + 60
+        while not SNAPSHOT.exists() and time.monotonic() < deadline and "catalog" in sys.modules \
+                and hasattr(sys.modules["catalog"], "SNAPSHOT_VERSION"):
+            time.sleep(0.1)
+        print(json.dumps(result))
+        return
+
+    for n in args.sizes:
+        report(n, run_size(n, args.questions))
+
+
+if __name__ == "__main__":
+    main()
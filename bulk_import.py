@@ -0,0 +1,162 @@
+"""Bulk import of many quizzes from a zip archive, a JSONL file or a directory.
+
+Sources are read in the calling process and handed to a process pool as raw
+bytes; workers parse and validate each quiz and results stream back in
+order, so callers can report progress while the pool is still busy.  Nothing
+is written until the quiz store's ``save_many()`` commits the accepted
+quizzes in a single batch, seeded with the workers' validation reports.
+
+    python bulk_import.py path/to/bank.zip --quizzes-dir quizzes
+    python bulk_import.py path/to/bank.zip --storage sqlite:data/quizzes.sqlite3
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import zipfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from validation import validate_quiz
+
+# report: the quiz's ValidationReport (None when it could not be parsed)
+ImportResult = namedtuple("ImportResult", ["source", "title", "quiz", "error", "report"],
+                          defaults=(None,))
+
+# Below this many items a pool costs more than it saves.
+POOL_THRESHOLD = 64
+
+
+# ───────────────────────────────────────────────
+# Sources
+# ───────────────────────────────────────────────
+def iter_items(source, name=None):
+    """Yield ``(label, raw_bytes)`` for every quiz in ``source``.
+
+    ``source`` is a path (directory, .zip, .jsonl, .json) or a binary file
+    object, in which case ``name`` decides how it is read.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = Path(source)
+        if path.is_dir():
+            for file in sorted(path.rglob("*.json")):
+                yield str(file.relative_to(path)), file.read_bytes()
+            return
+        name = name or path.name
+        with open(path, "rb") as f:
+            yield from iter_items(f, name)
+        return
+
+    name = name or getattr(source, "name", "upload")
+    if name.lower().endswith(".zip"):
+        with zipfile.ZipFile(source) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                    continue
+                if info.filename.lower().endswith(".json"):
+                    yield info.filename, zf.read(info)
+                elif info.filename.lower().endswith(".jsonl"):
+                    with zf.open(info) as inner:
+                        yield from _iter_lines(inner, info.filename)
+    elif name.lower().endswith(".jsonl"):
+        yield from _iter_lines(source, name)
+    else:
+        yield name, source.read()
+
+
+def _iter_lines(f, name):
+    for lineno, line in enumerate(f, 1):
+        if line.strip():
+            yield f"{name}:{lineno}", line
+
+
+# ───────────────────────────────────────────────
+# Parsing (runs in worker processes)
+# ───────────────────────────────────────────────
+def parse_item(item):
+    label, raw = item
+    try:
+        data = json.loads(raw)
+    except (ValueError, UnicodeDecodeError) as e:
+        return ImportResult(label, None, None, f"invalid JSON: {e}")
+    if not isinstance(data, dict):
+        return ImportResult(label, None, None, "top-level value must be an object")
+    if not isinstance(data.get("questions"), list):
+        return ImportResult(label, None, None, "missing 'questions' list")
+    title = data.get("quiz_title")
+    if not title:
+        if not label.lower().endswith(".json"):  # JSONL lines have no file name to fall back on
+            return ImportResult(label, None, None, "missing 'quiz_title'")
+        title = Path(label).stem
+    return ImportResult(label, str(title), data, None, validate_quiz(data))
+
+
+def parse_all(items, workers=None, chunksize=16):
+    """Yield an ``ImportResult`` per item, in order, as soon as it is ready."""
+    items = list(items)
+    if workers == 0 or len(items) < POOL_THRESHOLD:
+        yield from map(parse_item, items)
+        return
+    # Spawn rather than fork: the caller may be a threaded server (Streamlit),
+    # and a forked child can deadlock on a lock another thread held at fork time.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        yield from pool.map(parse_item, items, chunksize=chunksize)
+
+
+def prepare(result, department=None, subcategory=None):
+    """Apply upload-time defaults the same way the single-file path does."""
+    data = result.quiz
+    if department and not (data.get("department") or data.get("category")):
+        data["department"] = department
+    if subcategory and not (data.get("subcategory") or data.get("topic")):
+        data["subcategory"] = subcategory
+    return result.title, data
+
+
+# ───────────────────────────────────────────────
+# CLI
+# ───────────────────────────────────────────────
+def main(argv=None):
+    from storage import open_store
+
+    parser = argparse.ArgumentParser(description="Bulk-import quizzes into the quiz store.")
+    parser.add_argument("sources", nargs="+", help="directories, .zip, .jsonl or .json files")
+    parser.add_argument("--quizzes-dir", default="quizzes")
+    parser.add_argument("--storage", help="e.g. sqlite:data/quizzes.sqlite3 (default: --quizzes-dir)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--overwrite", action="store_true")
+    parser.add_argument("--department")
+    parser.add_argument("--subcategory")
+    args = parser.parse_args(argv)
+
+    items = [item for src in args.sources for item in iter_items(src)]
+    accepted, failed, reports, sources = [], [], {}, {}
+    for n, result in enumerate(parse_all(items, workers=args.workers), 1):
+        if result.error:
+            failed.append(result)
+        else:
+            accepted.append(prepare(result, args.department, args.subcategory))
+            reports[result.title] = result.report
+            sources[result.title] = result.source
+        if n % 500 == 0 or n == len(items):
+            print(f"\rparsed {n}/{len(items)}", end="", flush=True)
+    print()
+
+    catalog = open_store(args.storage, default_dir=args.quizzes_dir)
+    catalog.refresh()
+    saved, skipped, rejected = catalog.save_many(accepted, overwrite=args.overwrite, reports=reports)
+    failed += [ImportResult(sources[title], title, None, message) for title, message in rejected]
+    print(f"saved {len(saved)}, skipped {len(skipped)} existing, {len(failed)} invalid")
+    for result in failed[:20]:
+        print(f"  {result.source}: {result.error}")
+    flagged = [(t, catalog.validation(t)) for t in saved]
+    flagged = [(t, r) for t, r in flagged if r.problems]
+    if flagged:
+        print(f"{len(flagged)} imported quizzes have validation problems")
+        for title, report in flagged[:20]:
+            print(f"  {title}: " + "; ".join(report.lines()[:3]))
+
+
+if __name__ == "__main__":
+    main()
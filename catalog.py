@@ -0,0 +1,631 @@
+"""Process-wide quiz catalog shared by every Streamlit session.
+
+This is the directory backend of ``storage.QuizStore``.
+
+The catalog keeps one parsed copy of each quiz file and remembers the
+(mtime, size) signature it was parsed from.  ``refresh()`` only stats the
+directory and ``apply(names)`` only the named files (see watcher.py); a file
+is re-parsed when its signature changes or when it has been explicitly
+invalidated.  Saves, deletes and renames made through the
+catalog write atomically and update just the affected entry in memory.
+
+Besides ``*.json`` files the directory may hold packed ``*.qbank`` banks (see
+quizbank.py).  Banks are read-only; a JSON file with the same title overrides
+the packed version.
+
+``catalog.quizzes`` is a read-only mapping that is swapped, never mutated, when
+a refresh picks up changes, so sessions can iterate it without holding a lock.
+
+Alongside the quizzes the catalog maintains a ``QuizIndex`` (department ->
+subcategory -> titles, plus a token index for search) that is updated per
+quiz as files are loaded or dropped, never rebuilt wholesale.
+
+Every JSON quiz is validated once when it is loaded or saved (see
+validation.py); reports are cached by file content hash, so re-reading or
+re-saving identical content costs nothing.  Packed quizzes are validated on
+first use.
+
+With a ``snapshot`` path the parsed state (quizzes, index, file signatures,
+validation reports) is pickled a couple of seconds after it changes and
+restored when the next process starts, so a restart does not parse every
+file again.  The first ``refresh()`` after a restore still stats every file
+and re-parses only those whose signature no longer matches.  The snapshot is
+a pickle: keep it somewhere only the app can write.
+"""
+import bisect
+import gc
+import json
+import logging
+import os
+import pickle
+import re
+import threading
+from collections.abc import Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from types import MappingProxyType
+
+from fsutil import atomic_open, fsync_dir
+from quizbank import LazyQuiz, QuizBank, quiz_department, quiz_subcategory
+from storage import QuizStore
+from validation import ValidationCache, content_hash
+
+
+BANK_SUFFIX = ".qbank"
+SOURCE_SUFFIXES = (".json", BANK_SUFFIX)
+SNAPSHOT_VERSION = 1   # bump when the pickled structures or validation rules change
+SNAPSHOT_BATCH = 500   # quizzes per pickle call; other threads run in between
+SNAPSHOT_DELAY = 2.0   # seconds after a change before the snapshot is rewritten
+
+log = logging.getLogger(__name__)
+
+
+def is_bank(name):
+    return name.endswith(BANK_SUFFIX)
+
+
+def safe_filename(title):
+    return "".join(c if c.isalnum() or c in " -_" else "_" for c in title).strip() or "quiz"
+
+
+def unique_filename(title, taken, suffix=".json"):
+    """``safe_filename(title) + suffix``, numbered " (2)", " (3)"... past names in ``taken``.
+
+    Sanitising maps distinct titles ("C++ basics", "C__ basics") to the same
+    stem; ``taken`` is compared case-insensitively for case-folding file systems.
+    """
+    stem = safe_filename(title)
+    taken = {n.casefold() for n in taken}
+    name, n = f"{stem}{suffix}", 1
+    while name.casefold() in taken:
+        n += 1
+        name = f"{stem} ({n}){suffix}"
+    return name
+
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    # Every word, one-character ones included ("C", "R"), like the FTS5 index.
+    return set(TOKEN_RE.findall(str(text).lower()))
+
+
+# ───────────────────────────────────────────────
+# Index
+# ───────────────────────────────────────────────
+TITLE_WEIGHT = 5   # a hit in the title outranks hits in question text
+
+
+class QuizIndex:
+    """Department/subcategory tree and token index over titles, questions
+    and explanations.  Not thread-safe on its own; QuizCatalog guards it."""
+
+    def __init__(self):
+        self.meta = {}       # title -> (department, subcategory)
+        self.tree = {}       # department -> subcategory -> set(titles)
+        self.postings = {}   # token -> {title: weight}
+        self._terms = {}     # title -> tokens, for removal
+        self._vocab = None   # sorted tokens, rebuilt lazily for prefix search
+
+    def add(self, title, quiz, full_text=True):
+        # Malformed questions are skipped here; the validator reports them.
+        dept, sub = quiz_department(quiz), quiz_subcategory(quiz)
+        weights = dict.fromkeys(tokenize(title), TITLE_WEIGHT)
+        questions = quiz.get("questions") if full_text else None
+        for q in questions if isinstance(questions, (list, tuple)) else ():
+            if not isinstance(q, Mapping):
+                continue
+            for t in tokenize(q.get("question") or "") | tokenize(q.get("explanation") or ""):
+                weights[t] = weights.get(t, 0) + 1
+
+        self.remove(title)
+        self.meta[title] = (dept, sub)
+        self.tree.setdefault(dept, {}).setdefault(sub, set()).add(title)
+        for t, w in weights.items():
+            if t not in self.postings:
+                self._vocab = None
+            self.postings.setdefault(t, {})[title] = w
+        self._terms[title] = list(weights)
+
+    def copy(self):
+        """Independent copy, e.g. to pickle without holding the catalog lock."""
+        new = QuizIndex()
+        new.meta = dict(self.meta)
+        new.tree = {d: {s: set(titles) for s, titles in subs.items()} for d, subs in self.tree.items()}
+        new.postings = {t: dict(posting) for t, posting in self.postings.items()}
+        new._terms = dict(self._terms)   # term lists are replaced, never mutated
+        return new
+
+    def remove(self, title):
+        if title not in self.meta:
+            return
+        dept, sub = self.meta.pop(title)
+        subs = self.tree[dept]
+        subs[sub].discard(title)
+        if not subs[sub]:
+            del subs[sub]
+            if not subs:
+                del self.tree[dept]
+        for t in self._terms.pop(title):
+            posting = self.postings[t]
+            posting.pop(title, None)
+            if not posting:
+                del self.postings[t]
+                self._vocab = None
+
+    def departments(self):
+        return sorted(self.tree)
+
+    def subcategories(self, departments):
+        subs = set()
+        for dept in departments:
+            subs.update(s for s in self.tree.get(dept, ()) if s)
+        return sorted(subs)
+
+    def filter(self, departments, subcategories=()):
+        """``[(title, department, subcategory)]`` for the sidebar selection."""
+        out = []
+        for dept in departments:
+            for sub, titles in self.tree.get(dept, {}).items():
+                if not subcategories or (sub and sub in subcategories):
+                    out.extend((t, dept, sub) for t in titles)
+        return out
+
+    def search(self, query, limit=50):
+        """Titles matching every query token (the last one as a prefix)."""
+        tokens = TOKEN_RE.findall(query.lower())
+        if not tokens:
+            return []
+        *full, last = tokens
+        scores = None
+        for t in full:
+            scores = _intersect(scores, self.postings.get(t, {}))
+        if self._vocab is None:
+            self._vocab = sorted(self.postings)
+        prefix_hits = {}
+        i = bisect.bisect_left(self._vocab, last)
+        while i < len(self._vocab) and self._vocab[i].startswith(last):
+            for title, w in self.postings[self._vocab[i]].items():
+                prefix_hits[title] = max(prefix_hits.get(title, 0), w)
+            i += 1
+        scores = _intersect(scores, prefix_hits)
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        return [title for title, _ in ranked[:limit]]
+
+
+def check_indexable(title, quiz):
+    """Raise ``ValueError`` if ``quiz`` could not be stored under ``title``."""
+    if not isinstance(title, str) or not title:
+        raise ValueError("quiz_title must be a non-empty string")
+    if not isinstance(quiz, Mapping):
+        raise ValueError("quiz must be a JSON object")
+    QuizIndex().add(title, quiz)
+
+
+def _intersect(scores, posting):
+    if scores is None:
+        return dict(posting)
+    return {t: s + posting[t] for t, s in scores.items() if t in posting}
+
+
+class QuizCatalog(QuizStore):
+    """Directory backend: one JSON file per quiz plus packed banks."""
+
+    def __init__(self, directory, snapshot=None):
+        self.directory = Path(directory)
+        self.snapshot = None if snapshot is None else Path(snapshot)
+        self.quizzes = MappingProxyType({})   # title -> parsed quiz
+        self.errors = {}    # file name -> load error message
+        self._files = {}    # file name -> (mtime_ns, size, titles)
+        self._owners = {}   # title -> names of the files defining it
+        self._lock = threading.RLock()
+        self._next = None   # copy-on-write working dict during a refresh
+        self._index = QuizIndex()
+        self._reports = {}  # title -> ValidationReport of the visible version
+        self._validated = ValidationCache()
+        self._snapshot_timer = None
+        if self.snapshot is not None:
+            self._restore()
+
+    # ───────────────────────────────────────────────
+    # Refresh / invalidation
+    # ───────────────────────────────────────────────
+    def refresh(self):
+        with self._lock:
+            seen = {}
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(SOURCE_SUFFIXES) and entry.is_file():
+                        stat = entry.stat()
+                        seen[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+            for name in [n for n in self._files if n not in seen]:
+                self._drop(name)
+            for name in [n for n in self.errors if n not in seen]:
+                del self.errors[name]
+
+            for name, sig in seen.items():
+                self._check(name, sig)
+
+            self._publish()
+        return self.quizzes
+
+    def apply(self, names):
+        """Re-check just ``names`` (file system events) instead of scanning the directory."""
+        with self._lock:
+            for name in names:
+                if not name.endswith(SOURCE_SUFFIXES) or name.startswith("."):
+                    continue
+                try:
+                    stat = (self.directory / name).stat()
+                except FileNotFoundError:
+                    self._drop(name)
+                    self.errors.pop(name, None)
+                    continue
+                self._check(name, (stat.st_mtime_ns, stat.st_size))
+            self._reload_pending()
+            self._publish()
+        return self.quizzes
+
+    def start_watching(self, poll=False, metrics=None):
+        """Follow directory changes from a watcher thread (see watcher.py)."""
+        from watcher import CatalogWatcher
+        return CatalogWatcher(self, use_events=not poll, metrics=metrics).start()
+
+    def write_snapshot(self):
+        """Pickle the parsed catalog to ``self.snapshot`` (atomically).
+
+        Only copying the mutable structures holds the lock, and the quizzes
+        are pickled in batches straight into the temp file, so readers get
+        the lock and the GIL back while the (much slower) pickling runs and
+        the snapshot is never held in memory as a whole.
+        """
+        with self._lock:
+            state = {
+                "version": SNAPSHOT_VERSION, "directory": str(self.directory.resolve()),
+                "files": dict(self._files), "errors": dict(self.errors),
+                "owners": {t: set(names) for t, names in self._owners.items()},
+                "index": self._index.copy(), "reports": dict(self._reports),
+                "validated": self._validated.copy(),
+            }
+            published = self.quizzes   # replaced on change, never mutated
+        # Packed quizzes are views into a memory map; banks are reopened instead.
+        items = [(t, q) for t, q in published.items() if not isinstance(q, LazyQuiz)]
+        starts = range(0, len(items), SNAPSHOT_BATCH)
+        state["batches"] = len(starts)
+        self.snapshot.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_open(self.snapshot) as f, gc_paused():
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            for i in starts:
+                pickle.dump(dict(items[i:i + SNAPSHOT_BATCH]), f, protocol=pickle.HIGHEST_PROTOCOL)
+        return self.snapshot
+
+    def invalidate(self, name=None):
+        """Forget the cached signature of one file (or all of them)."""
+        with self._lock:
+            if name is None:
+                self._files = {n: (None, None, ts) for n, (_, _, ts) in self._files.items()}
+                self.errors.clear()
+            else:
+                if name in self._files:
+                    self._files[name] = (None, None, self._files[name][2])
+                self.errors.pop(name, None)
+
+    # ───────────────────────────────────────────────
+    # Writes
+    # ───────────────────────────────────────────────
+    def path_for(self, title):
+        """JSON file holding ``title``: the one it was loaded from, else a new one.
+
+        A new name never reuses a file that belongs to another title, failed
+        to load, or exists on disk but has not been picked up yet.
+        """
+        with self._lock:
+            owned = self._json_owners(title)
+            if owned:
+                return self.directory / owned[0]
+            taken = set(self._files) | set(self.errors)
+            while True:
+                name = unique_filename(title, taken)
+                if not (self.directory / name).exists():
+                    return self.directory / name
+                taken.add(name)
+
+    def is_packed(self, title):
+        with self._lock:
+            return any(is_bank(n) for n in self._owners.get(title, ()))
+
+    def save(self, title, data, old_title=None):
+        """Write one quiz and update only its catalog/index entries.
+
+        With ``old_title`` (a rename) the old file and entries are removed in
+        the same step, so readers never see both or neither.  The stored
+        ``quiz_title`` is set to ``title`` so a later re-parse agrees.  A quiz
+        that lives in a packed bank is overridden by the new JSON file.
+        """
+        data = {"quiz_title": title, **{k: v for k, v in data.items() if k != "quiz_title"}}
+        with self._lock:
+            path = self.path_for(title)
+            digest = content_hash(atomic_write_json(path, data))
+            stat = path.stat()
+
+            if old_title is not None and old_title != title:
+                for name in self._json_owners(old_title):
+                    if name != path.name:
+                        (self.directory / name).unlink(missing_ok=True)
+                        self._drop(name)
+            self._drop(path.name, reclaim=False)
+            self.errors.pop(path.name, None)
+            self._register(path.name, (stat.st_mtime_ns, stat.st_size), [(title, data)], digest)
+            self._reload_pending()
+            self._publish()
+        return path
+
+    def save_many(self, entries, overwrite=False, reports=None):
+        """Commit ``[(title, data)]`` as one batch: one lock, one published mapping.
+
+        Returns ``(saved_titles, skipped_titles, failed)``; existing titles
+        are skipped unless ``overwrite``, and ``failed`` lists ``(title,
+        message)`` for quizzes that could not be stored or indexed - no file
+        is left behind for those.  Files are written atomically but not
+        fsynced one by one; the directory is synced once at the end.
+        """
+        saved, skipped, failed = [], [], []
+        with self._lock:
+            try:
+                for title, data in entries:
+                    if not overwrite and title in self._owners:
+                        skipped.append(title)
+                        continue
+                    try:
+                        data = {"quiz_title": title, **{k: v for k, v in data.items() if k != "quiz_title"}}
+                        check_indexable(title, data)
+                        path = self.path_for(title)
+                        # Encoding fails before the file is created.
+                        digest = content_hash(atomic_write_json(path, data, fsync=False))
+                    except (TypeError, ValueError, AttributeError) as e:
+                        failed.append((title, str(e)))
+                        continue
+                    if reports and reports.get(title) is not None:
+                        self._validated.put(digest, reports[title])
+                    stat = path.stat()
+                    self._drop(path.name, reclaim=False)
+                    self.errors.pop(path.name, None)
+                    if not self._register(path.name, (stat.st_mtime_ns, stat.st_size), [(title, data)], digest):
+                        failed.append((title, self.errors.pop(path.name)[1]))
+                        path.unlink(missing_ok=True)
+                        continue
+                    saved.append(title)
+            finally:
+                fsync_dir(self.directory)
+                self._publish()
+        return saved, skipped, failed
+
+    def delete(self, title):
+        """Remove every JSON file defining ``title``; returns False if none did.
+
+        Packed banks are read-only; if one also defines ``title`` its version
+        becomes visible again.
+        """
+        with self._lock:
+            names = self._json_owners(title)
+            for name in names:
+                (self.directory / name).unlink(missing_ok=True)
+                self._drop(name)
+            self._reload_pending()
+            self._publish()
+        return bool(names)
+
+    def load_errors(self):
+        with self._lock:
+            return {name: msg for name, (_, msg) in self.errors.items()}
+
+    def validation(self, title):
+        """``ValidationReport`` for the visible version of ``title``."""
+        with self._lock:
+            report = self._reports.get(title)
+            if report is None and title in self.quizzes:
+                # Packed quiz: validate on first use, keyed by the bank's signature.
+                bank = next(n for n in sorted(self._owners[title]) if is_bank(n))
+                mtime, size, _ = self._files[bank]
+                key = f"{bank}:{mtime}:{size}:{title}"
+                report = self._reports[title] = self._validated.get(key, self.quizzes[title])
+            return report
+
+    # ───────────────────────────────────────────────
+    # Index queries
+    # ───────────────────────────────────────────────
+    def departments(self):
+        with self._lock:
+            return self._index.departments()
+
+    def subcategories(self, departments):
+        with self._lock:
+            return self._index.subcategories(departments)
+
+    def filter(self, departments, subcategories=()):
+        with self._lock:
+            return self._index.filter(departments, subcategories)
+
+    def search(self, query, departments=(), subcategories=(), limit=50):
+        with self._lock:
+            titles = self._index.search(query, limit=None if departments else limit)
+            if departments:
+                titles = [t for t in titles if self._index.meta[t][0] in departments
+                          and (not subcategories or self._index.meta[t][1] in subcategories)]
+            return [(t, *self._index.meta[t]) for t in titles[:limit]]
+
+    # ───────────────────────────────────────────────
+    # Internals
+    # ───────────────────────────────────────────────
+    def _check(self, name, sig):
+        # Parse only files whose signature changed since they were last seen.
+        cached = self._files.get(name)
+        if cached is not None and cached[:2] == sig:
+            return
+        if cached is None and self.errors.get(name, (None,))[0] == sig:
+            return
+        self._load(name, sig)
+
+    def _load(self, name, sig):
+        path = self.directory / name
+        try:
+            if is_bank(name):
+                bank = QuizBank(path)
+                entries = [(quiz.title, quiz) for quiz in bank]
+                digest = None
+            else:
+                raw = path.read_bytes()
+                data = json.loads(raw)
+                if not isinstance(data, Mapping):
+                    raise ValueError("quiz must be a JSON object")
+                entries = [(data.get("quiz_title", path.stem), data)]
+                digest = content_hash(raw)
+            if not all(isinstance(title, str) for title, _ in entries):
+                raise ValueError("quiz_title must be a string")
+        except Exception as e:
+            self._drop(name)
+            self.errors[name] = (sig, str(e))
+            return
+        self._drop(name, reclaim=False)
+        self.errors.pop(name, None)
+        self._register(name, sig, entries, digest)
+
+    def _register(self, name, sig, entries, digest=None):
+        """Add one file's quizzes; a quiz that cannot be indexed becomes a load error."""
+        try:
+            self._add_entries(name, sig, entries, digest)
+        except Exception as e:
+            log.warning("Could not index %s", name, exc_info=True)
+            self._drop(name)
+            self.errors[name] = (sig, f"could not index quiz: {e}")
+            return False
+        return True
+
+    def _add_entries(self, name, sig, entries, digest):
+        bank = is_bank(name)
+        self._files[name] = (sig[0], sig[1], tuple(t for t, _ in entries))
+        for title, quiz in entries:
+            owners = self._owners.setdefault(title, set())
+            owners.add(name)
+            # JSON files take precedence over packed banks.
+            if bank and any(not is_bank(n) for n in owners):
+                continue
+            self._writable()[title] = quiz
+            # Packed quizzes are indexed by title only so loading stays lazy.
+            self._index.add(title, quiz, full_text=not bank)
+            if bank:
+                self._reports.pop(title, None)
+            else:
+                self._reports[title] = self._validated.get(digest, quiz)
+
+    def _drop(self, name, reclaim=True):
+        cached = self._files.pop(name, None)
+        if cached is None:
+            return
+        for title in cached[2]:
+            owners = self._owners.get(title, set())
+            owners.discard(name)
+            if not owners:
+                self._owners.pop(title, None)
+                self._writable().pop(title, None)
+                self._index.remove(title)
+                self._reports.pop(title, None)
+            elif reclaim:
+                # Several files shared a title; let the survivors take it back.
+                for n in owners:
+                    self._files[n] = (None, None, self._files[n][2])
+
+    def _reload_pending(self):
+        for name, (mtime, _, _) in list(self._files.items()):
+            if mtime is None:
+                try:
+                    stat = (self.directory / name).stat()
+                except FileNotFoundError:
+                    self._drop(name)
+                    continue
+                self._load(name, (stat.st_mtime_ns, stat.st_size))
+
+    def _json_owners(self, title):
+        return sorted(n for n in self._owners.get(title, ()) if not is_bank(n))
+
+    def _publish(self):
+        if self._next is not None:
+            self.quizzes = MappingProxyType(self._next)
+            self._next = None
+            self._schedule_snapshot()
+
+    def _restore(self):
+        try:
+            with open(self.snapshot, "rb") as f, gc_paused():
+                state = pickle.load(f)
+                if state.get("version") == SNAPSHOT_VERSION:
+                    state["quizzes"] = {}
+                    for _ in range(state["batches"]):
+                        state["quizzes"].update(pickle.load(f))
+        except FileNotFoundError:
+            return False
+        except Exception:
+            log.warning("Ignoring unreadable catalog snapshot %s", self.snapshot, exc_info=True)
+            return False
+        if (state.get("version") != SNAPSHOT_VERSION
+                or state.get("directory") != str(self.directory.resolve())):
+            return False
+        self._files, self.errors, self._owners = state["files"], state["errors"], state["owners"]
+        self._index, self._reports, self._validated = state["index"], state["reports"], state["validated"]
+        self.quizzes = MappingProxyType(state["quizzes"])
+        # Forget the banks' signatures so the next refresh reopens them.
+        for name, (_, _, titles) in self._files.items():
+            if is_bank(name):
+                self._files[name] = (None, None, titles)
+        return True
+
+    def _schedule_snapshot(self):
+        # Coalesces bursts of changes into one write from a timer thread.
+        if self.snapshot is None or self._snapshot_timer is not None:
+            return
+        self._snapshot_timer = threading.Timer(SNAPSHOT_DELAY, self._snapshot_due)
+        self._snapshot_timer.daemon = True
+        self._snapshot_timer.start()
+
+    def _snapshot_due(self):
+        with self._lock:
+            self._snapshot_timer = None
+        try:
+            self.write_snapshot()
+        except Exception:
+            log.exception("Writing the catalog snapshot failed")
+
+    def _writable(self):
+        if self._next is None:
+            self._next = dict(self.quizzes)
+        return self._next
+
+
+def atomic_write_json(path, data, fsync=True):
+    """Write via a temp file + rename so readers never see a partial file.
+
+    Returns the encoded bytes that were written.
+    """
+    raw = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+    return atomic_write_bytes(path, raw, fsync)
+
+
+def atomic_write_bytes(path, raw, fsync=True):
+    with atomic_open(path, fsync=fsync) as f:
+        f.write(raw)
+    return raw
+
+
+@contextmanager
+def gc_paused():
+    # (Un)pickling ~10^6 small objects otherwise triggers collection after
+    # collection; this more than halves snapshot load time.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
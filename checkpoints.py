@@ -0,0 +1,144 @@
+"""Checkpoints of in-progress attempts, for resuming after a reconnect.
+
+A checkpoint is keyed by a random attempt token and holds only what cannot
+be derived again: the paper seed (which regenerates question order, pool
+draw and option shuffles, see paper.py), the answers as option indices, the
+start time and time limit, the page and - for adaptive attempts, whose
+questions depend on the answers - the asked order.  A typical checkpoint is
+a few hundred bytes of JSON.
+
+``save()`` only records the latest state per token in memory; a background
+thread writes whatever changed at most once per ``interval`` in a single
+transaction, so thousands of attempts in progress cost one small write a
+second rather than one per rerun.  Checkpoints are deleted when the attempt
+ends and expire after ``max_age`` seconds otherwise.
+"""
+import atexit
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+
+from attempts import connect
+from paper import pool_spec
+from quizbank import plain_quiz
+from validation import content_hash
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    token       TEXT PRIMARY KEY,
+    quiz_title  TEXT NOT NULL,
+    state       TEXT NOT NULL,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_checkpoints_time ON checkpoints (updated_at);
+"""
+
+MAX_AGE = 2 * 24 * 3600
+_DELETE = None   # pending marker: the attempt ended
+log = logging.getLogger(__name__)
+
+
+def quiz_fingerprint(quiz):
+    """Hash of everything the paper is built from (the questions and the pool
+    settings), so a checkpoint is not resumed against an edited quiz."""
+    shape = {"questions": plain_quiz(quiz).get("questions", []), "pool": pool_spec(quiz)}
+    return content_hash(json.dumps(shape, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+
+
+class CheckpointStore:
+    def __init__(self, path, interval=1.0, max_age=MAX_AGE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.interval = interval
+        conn = connect(self.path)
+        conn.executescript(SCHEMA)
+        with conn:
+            conn.execute("DELETE FROM checkpoints WHERE updated_at < ?", (time.time() - max_age,))
+        conn.close()
+        self._pending = {}   # token -> (quiz_title, encoded state, time) or _DELETE
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()   # batches are written in the order they were taken
+        self._stopped = False
+        self._local = threading.local()
+        self._writer = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def save(self, token, quiz_title, state):
+        encoded = json.dumps(state, separators=(",", ":"))
+        with self._cond:
+            self._pending[token] = (quiz_title, encoded, time.time())
+            self._cond.notify()
+
+    def discard(self, token):
+        with self._cond:
+            self._pending[token] = _DELETE
+            self._cond.notify()
+
+    def load(self, token):
+        """``(quiz_title, state)`` last saved under ``token``, or None."""
+        with self._cond:
+            if token in self._pending:
+                entry = self._pending[token]
+                return None if entry is _DELETE else (entry[0], json.loads(entry[1]))
+        row = self._conn().execute("SELECT quiz_title, state FROM checkpoints WHERE token = ?",
+                                   (token,)).fetchone()
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    def flush(self):
+        """Write everything pending now."""
+        with self._write_lock:
+            with self._cond:
+                pending, self._pending = self._pending, {}
+            self._write(self._conn(), pending)
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._writer.join()
+
+    # ───────────────────────────────────────────────
+    # Writer thread
+    # ───────────────────────────────────────────────
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = connect(self.path)
+        return conn
+
+    def _run(self):
+        conn = self._conn()
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                # Debounce: let further changes to the same attempts pile up.
+                deadline = time.monotonic() + self.interval
+                while not self._stopped and (left := deadline - time.monotonic()) > 0:
+                    self._cond.wait(left)
+                stopped = self._stopped
+            with self._write_lock:
+                with self._cond:
+                    pending, self._pending = self._pending, {}
+                self._write(conn, pending)
+            if stopped:
+                conn.close()
+                return
+
+    def _write(self, conn, pending):
+        if not pending:
+            return
+        upserts = [(token, *entry) for token, entry in pending.items() if entry is not _DELETE]
+        deletes = [(token,) for token, entry in pending.items() if entry is _DELETE]
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO checkpoints VALUES (?, ?, ?, ?) ON CONFLICT (token) DO UPDATE SET "
+                    "quiz_title = excluded.quiz_title, state = excluded.state, "
+                    "updated_at = excluded.updated_at", upserts)
+                conn.executemany("DELETE FROM checkpoints WHERE token = ?", deletes)
+        except Exception:
+            log.exception("Dropped %d attempt checkpoint(s)", len(pending))
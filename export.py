@@ -0,0 +1,250 @@
+"""Streaming CSV/Parquet export of attempts and question banks.
+
+Exports are generators of encoded byte chunks.  Rows are produced a chunk at
+a time (``AttemptLog.iter_chunks`` for attempts, a batch of quizzes at a time
+for questions) and each chunk is encoded and handed on before the next is
+read, so only one chunk of rows is ever held in memory::
+
+    python export.py attempts --format parquet -o attempts.parquet
+    python export.py questions --department Physics -o physics.csv
+
+Parquet needs pyarrow (optional; CSV always works).  Each chunk becomes one
+Parquet row group.
+
+The app cannot stream a download: ``st.download_button`` takes the finished
+file and keeps it in server memory.  Exports from the app are therefore
+capped at ``UI_MAX_ROWS`` rows; bigger ones go through this CLI, which
+streams to disk.
+
+Both exports take the set of quiz titles to include; ``select_titles()``
+derives it from a department/subcategory selection the same way the sidebar
+list does.  Attempt timestamps are Unix seconds; the per-question columns of
+an attempt (question order, shuffles, answers, answer times) are exported as
+the JSON stored in the attempt log.
+"""
+import argparse
+import csv
+import importlib.util
+import io
+import json
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+from fsutil import atomic_open
+
+# Optional dependency, imported on first Parquet export (it takes ~0.1 s).
+PARQUET = importlib.util.find_spec("pyarrow") is not None
+
+CHUNK_SIZE = 5000         # attempts per chunk
+QUIZZES_PER_CHUNK = 200   # quizzes per question chunk
+UI_MAX_ROWS = 50_000      # largest export the app builds in memory (~35 MB of CSV attempts)
+
+ATTEMPT_FIELDS = (
+    ("id", "int64"), ("quiz_title", "string"), ("department", "string"),
+    ("subcategory", "string"), ("started_at", "float64"), ("submitted_at", "float64"),
+    ("duration_sec", "float64"), ("time_limit_minutes", "int64"), ("timer_expired", "bool_"),
+    ("correct", "int64"), ("total", "int64"), ("score", "float64"), ("seed", "int64"),
+    ("question_order", "string"), ("option_shuffles", "string"), ("user_answers", "string"),
+    ("answer_times", "string"), ("adaptive", "bool_"),
+)
+QUESTION_FIELDS = (
+    ("quiz_title", "string"), ("department", "string"), ("subcategory", "string"),
+    ("number", "int64"), ("question", "string"), ("options", "list<string>"),
+    ("correct", "string"), ("explanation", "string"), ("question_subcategory", "string"),
+)
+FORMATS = {"csv": ("text/csv", ".csv"), "parquet": ("application/vnd.apache.parquet", ".parquet")}
+
+
+def available_formats():
+    return [f for f in FORMATS if f != "parquet" or PARQUET]
+
+
+def select_titles(store, departments=(), subcategories=()):
+    """``{title: (department, subcategory)}`` for a sidebar selection (all quizzes if empty)."""
+    return {t: (d, s) for t, d, s in store.filter(departments or store.departments(), subcategories)}
+
+
+# ───────────────────────────────────────────────
+# Row sources
+# ───────────────────────────────────────────────
+def attempt_chunks(log, meta, everything=False, chunk_size=CHUNK_SIZE):
+    """Lists of attempt rows for the quizzes in ``meta``.
+
+    With ``everything`` attempts at quizzes that no longer exist are included
+    too (without department/subcategory).
+    """
+    titles = None if everything else list(meta)
+    for chunk in log.iter_chunks(chunk_size=chunk_size, titles=titles, decode=False):
+        for row in chunk:
+            dept, sub = meta.get(row["quiz_title"], (None, None))
+            row["department"], row["subcategory"] = dept, sub
+            row["timer_expired"] = bool(row["timer_expired"])
+            row["adaptive"] = bool(row["adaptive"])
+            row["score"] = row["correct"] / row["total"] if row["total"] else None
+        yield chunk
+
+
+def question_chunks(quizzes, meta, quizzes_per_chunk=QUIZZES_PER_CHUNK):
+    """Lists of question rows, one per question, a batch of quizzes at a time."""
+    titles = sorted(meta)
+    for start in range(0, len(titles), quizzes_per_chunk):
+        rows = []
+        for title in titles[start:start + quizzes_per_chunk]:
+            quiz = quizzes.get(title)
+            if quiz is None:   # deleted since the selection was taken
+                continue
+            dept, sub = meta[title]
+            for n, q in enumerate(quiz.get("questions", []), 1):
+                if not isinstance(q, Mapping):
+                    continue
+                rows.append({
+                    "quiz_title": title, "department": dept, "subcategory": sub, "number": n,
+                    "question": _text(q.get("question")),
+                    "options": [str(o) for o in q.get("options", [])],
+                    "correct": _text(q.get("correct")),
+                    "explanation": _text(q.get("explanation")),
+                    "question_subcategory": _text(q.get("subcategory") or q.get("topic")),
+                })
+        yield rows
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+# ───────────────────────────────────────────────
+# Writers
+# ───────────────────────────────────────────────
+def write_csv(fields, chunks):
+    """Yield UTF-8 CSV bytes: the header, then one piece per row chunk."""
+    columns = [name for name, _ in fields]
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    yield buf.getvalue().encode("utf-8")
+    for rows in chunks:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows([_csv_value(row.get(c)) for c in columns] for row in rows)
+        yield buf.getvalue().encode("utf-8")
+
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def write_parquet(fields, chunks):
+    """Yield Parquet file bytes; each row chunk is written as one row group."""
+    if not PARQUET:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(name, pa.list_(pa.string()) if t == "list<string>" else getattr(pa, t)())
+                        for name, t in fields])
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for rows in chunks:
+            if rows:
+                writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                yield sink.take()
+    yield sink.take()
+
+
+class _ChunkSink:
+    """Write-only file object that hands back what was written since the last take()."""
+
+    def __init__(self):
+        self._parts = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet}
+
+
+def export_attempts(log, meta, fmt="csv", everything=False):
+    return WRITERS[fmt](ATTEMPT_FIELDS, attempt_chunks(log, meta, everything))
+
+
+def export_questions(quizzes, meta, fmt="csv"):
+    return WRITERS[fmt](QUESTION_FIELDS, question_chunks(quizzes, meta))
+
+
+def attempt_count(log, meta, everything=False):
+    """Rows ``export_attempts()`` would produce, from the per-quiz summary."""
+    return sum(row["attempts"] for row in log.summary() if everything or row["quiz_title"] in meta)
+
+
+def question_count(quizzes, meta):
+    """Rows ``export_questions()`` would produce (an upper bound for malformed quizzes)."""
+    total = 0
+    for title in meta:
+        questions = quizzes[title].get("questions") if title in quizzes else None
+        if isinstance(questions, Sequence) and not isinstance(questions, str):
+            total += len(questions)
+    return total
+
+
+def write_file(chunks, path):
+    """Stream an export to ``path`` via a temp file + rename."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_open(path) as f:
+        for chunk in chunks:
+            f.write(chunk)
+    return path
+
+
+# ───────────────────────────────────────────────
+# CLI
+# ───────────────────────────────────────────────
+def main(argv=None):
+    from storage import open_store
+
+    parser = argparse.ArgumentParser(description="Export attempts or question banks as CSV/Parquet.")
+    parser.add_argument("what", choices=["attempts", "questions"])
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--format", choices=list(FORMATS), help="default: from the output suffix")
+    parser.add_argument("--department", action="append", default=[])
+    parser.add_argument("--subcategory", action="append", default=[])
+    parser.add_argument("--db", default="data/attempts.sqlite3")
+    parser.add_argument("--storage", help="quiz store URL (default: dir:quizzes)")
+    args = parser.parse_args(argv)
+    fmt = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+
+    store = open_store(args.storage)
+    store.refresh()
+    meta = select_titles(store, args.department, args.subcategory)
+    if args.what == "questions":
+        chunks = export_questions(store.quizzes, meta, fmt)
+    else:
+        from attempts import AttemptLog
+        everything = not (args.department or args.subcategory)
+        chunks = export_attempts(AttemptLog(args.db), meta, fmt, everything)
+    path = write_file(chunks, args.output)
+    print(f"Wrote {path} ({path.stat().st_size / 2**20:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
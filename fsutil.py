@@ -0,0 +1,45 @@
+"""Crash-safe file writes shared by the catalog, banks, exports and metrics.
+
+``atomic_open`` streams into a temp file next to the target and renames it
+over the target only once the ``with`` block succeeds, so readers see the
+old file or the new one, never a partial write::
+
+    with atomic_open(path) as f:
+        for chunk in chunks:
+            f.write(chunk)
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+
+@contextmanager
+def atomic_open(path, mode="wb", fsync=False, encoding=None):
+    """Yield a file for writing that replaces ``path`` on success.
+
+    ``mode`` is ``"wb"`` or ``"w"``; with ``fsync`` the data is flushed to
+    disk before the rename.  On any error the temp file is removed and
+    ``path`` is left untouched.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def fsync_dir(directory):
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,145 @@
+"""In-process timing spans aggregated into shared histograms.
+
+One ``Metrics`` object lives per server process and is shared by every
+session.  ``span(name)`` costs two ``perf_counter()`` calls and a short
+locked bucket update, so it stays enabled in production::
+
+    with metrics.span("scoring"):
+        ...
+
+Histograms use fixed Prometheus-style buckets; ``prometheus_text()`` renders
+them in the text exposition format and ``dump()`` writes that atomically to a
+file (e.g. for node_exporter's textfile collector).  ``Profiler`` wraps
+cProfile for capturing a single rerun.
+"""
+import bisect
+import cProfile
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from fsutil import atomic_open
+
+# Upper bounds in seconds; the last bucket is +Inf.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC = "quiz_app_span_seconds"
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Estimate from the buckets (linear within a bucket, capped at the max seen)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for b, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lo = BUCKETS[b - 1] if b > 0 else 0.0
+                hi = BUCKETS[b] if b < len(BUCKETS) else self.max
+                return min(lo + (hi - lo) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+class Metrics:
+    def __init__(self):
+        self._hists = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            hist = self._hists.get(name)
+            if hist is None:
+                hist = self._hists[name] = Histogram()
+            hist.observe(seconds)
+
+    @contextmanager
+    def span(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def reset(self):
+        with self._lock:
+            self._hists.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        """One row per span (count, total, mean, p50/p95/p99, max), by total time."""
+        ms = lambda s: None if s is None else round(s * 1000, 2)
+        with self._lock:
+            rows = []
+            for name, h in self._hists.items():
+                rows.append({
+                    "span": name, "count": h.count, "total_s": round(h.sum, 3),
+                    "mean_ms": ms(h.sum / h.count), "p50_ms": ms(h.quantile(0.5)),
+                    "p95_ms": ms(h.quantile(0.95)), "p99_ms": ms(h.quantile(0.99)),
+                    "max_ms": ms(h.max),
+                })
+        return sorted(rows, key=lambda r: -r["total_s"])
+
+    def prometheus_text(self):
+        lines = [f"# HELP {METRIC} Time spent in instrumented app sections.",
+                 f"# TYPE {METRIC} histogram"]
+        with self._lock:
+            for name in sorted(self._hists):
+                h, cum = self._hists[name], 0
+                for le, n in zip(BUCKETS + ("+Inf",), h.counts):
+                    cum += n
+                    lines.append(f'{METRIC}_bucket{{span="{name}",le="{le}"}} {cum}')
+                lines.append(f'{METRIC}_sum{{span="{name}"}} {h.sum:.6f}')
+                lines.append(f'{METRIC}_count{{span="{name}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """Write ``prometheus_text()`` to ``path`` atomically."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_open(path, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        return path
+
+    def start_dumping(self, path, interval=15.0):
+        """Rewrite the metrics file every ``interval`` seconds from a daemon thread."""
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.dump(path)
+                except OSError:
+                    pass
+        threading.Thread(target=run, name="metrics-dump", daemon=True).start()
+
+
+class Profiler:
+    """cProfile around one rerun; ``stop()`` returns the top functions as text."""
+
+    def __init__(self):
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(self, limit=40, sort="cumulative"):
+        self._profile.disable()
+        out = io.StringIO()
+        pstats.Stats(self._profile, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
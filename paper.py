@@ -0,0 +1,124 @@
+"""Per-attempt "paper": question order and option shuffles.
+
+A paper is stored as plain index arrays so nothing on the hot path has to
+look questions up by value:
+
+* ``order`` - original question indices in display order
+* ``option_shuffles`` - original question index -> shuffled option order
+* ``correct_positions`` - original question index -> position of the correct
+  option after shuffling (missing when the question has no valid answer)
+
+A quiz may declare a question pool, in which case each attempt draws only
+``size`` of its questions, optionally with per-subcategory quotas::
+
+    "pool": {"size": 20, "quotas": {"Loops": 5, "Data types": 5}}
+
+Quota slots are filled first (from questions whose ``subcategory`` / ``topic``
+matches); the rest of the paper is drawn from everything left.  Papers built
+with ``paper_for_seed`` depend only on the quiz and the seed, so storing the
+seed is enough to regenerate an attempt's exact paper.
+"""
+import random
+from collections.abc import Mapping, Sequence
+
+
+def pool_spec(quiz):
+    """``(size, quotas)`` from the quiz's ``pool`` block; size None means all questions.
+
+    A malformed block is treated as no pool (validation reports it).
+    """
+    pool = quiz.get("pool") or {}
+    try:
+        size = pool.get("size")
+        quotas = {str(k): int(v) for k, v in (pool.get("quotas") or {}).items() if int(v) > 0}
+        if size is None and quotas:
+            size = sum(quotas.values())
+        return (max(int(size), 1) if size is not None else None), quotas
+    except (TypeError, ValueError, AttributeError):
+        return None, {}
+
+
+PAGINATION_MODES = ("all", "paged", "single")
+
+
+def pagination_spec(quiz):
+    """``(mode, per_page)`` from the quiz's ``pagination`` block; None where unset.
+
+    A malformed block or value is treated as unset (validation reports it).
+    """
+    opts = quiz.get("pagination")
+    if not isinstance(opts, dict):
+        return None, None
+    mode = opts.get("mode") if opts.get("mode") in PAGINATION_MODES else None
+    try:
+        per_page = int(opts["per_page"]) if opts.get("per_page") is not None else None
+    except (TypeError, ValueError):
+        per_page = None
+    return mode, (per_page if per_page is not None and per_page > 0 else None)
+
+
+def question_subcategory(q):
+    return q.get("subcategory") or q.get("topic") or ""
+
+
+def draw(questions, size=None, quotas=None, rng=random, skip=()):
+    """Original indices of the questions on this paper, in display order.
+
+    Without ``size`` every question is used.  When sampling, indices in
+    ``skip`` (e.g. questions that failed validation) are never drawn.
+    """
+    n = len(questions)
+    if size is None or size >= n and not skip:
+        order = list(range(n))
+        rng.shuffle(order)
+        return order
+
+    candidates = [i for i in range(n) if i not in skip]
+    size = min(size, len(candidates))
+    chosen = []
+    if quotas:
+        by_sub = {}
+        for i in candidates:
+            sub = question_subcategory(questions[i])
+            if sub in quotas:
+                by_sub.setdefault(sub, []).append(i)
+        for sub in sorted(quotas):
+            group = by_sub.get(sub, [])
+            chosen += rng.sample(group, min(quotas[sub], len(group), size - len(chosen)))
+        taken = set(chosen)
+        candidates = [i for i in candidates if i not in taken]
+    chosen += rng.sample(candidates, size - len(chosen))
+    rng.shuffle(chosen)
+    return chosen
+
+
+def build_paper(questions, rng=random, size=None, quotas=None, skip=()):
+    order = draw(questions, size, quotas, rng, skip)
+
+    # Shuffle maps only for the questions actually on the paper.
+    option_shuffles = {}
+    correct_positions = {}
+    for orig_i in order:
+        q = questions[orig_i]
+        # Malformed questions stay on the paper (shown as invalid) but get no shuffle.
+        opts = q.get("options", []) if isinstance(q, Mapping) else None
+        if not opts or not isinstance(opts, Sequence):
+            continue
+        opt_idx = list(range(len(opts)))
+        rng.shuffle(opt_idx)
+        option_shuffles[orig_i] = opt_idx
+        correct = q.get("correct")
+        if correct in opts:
+            correct_positions[orig_i] = opt_idx.index(opts.index(correct))
+    return order, option_shuffles, correct_positions
+
+
+def new_seed():
+    # 63 bits so it fits an SQLite INTEGER.
+    return random.SystemRandom().getrandbits(63)
+
+
+def paper_for_seed(quiz, seed, skip=()):
+    """Rebuild the paper of an attempt from its seed (same quiz content, same paper)."""
+    size, quotas = pool_spec(quiz)
+    return build_paper(quiz.get("questions", []), random.Random(seed), size, quotas, skip)
@@ -0,0 +1,370 @@
+"""Packed, memory-mapped quiz bank (``*.qbank``).
+
+One file holds many quizzes.  All text lives once in an interned UTF-8
+string table; quizzes, questions and options are fixed-width little-endian
+records that point into it::
+
+    header
+    quiz records      title, department, subcategory, meta, first_question, n_questions
+    question records  text, explanation, correct, extra, first_option, n_options, correct_index, flags
+    option ids        u32 string id per option
+    string offsets    u64 x (n_strings + 1)
+    string data       UTF-8
+
+``QuizBank`` maps the file and hands out ``LazyQuiz`` / ``LazyQuestion``
+objects that behave like the JSON dicts but decode a field only when it is
+first read, so rendering one question touches only that question's strings.
+The department and subcategory a quiz is listed under are stored in its
+record, so indexing a bank never decodes any JSON.  Quiz- and question-level
+keys beyond the core ones are kept as JSON in the ``meta`` / ``extra``
+strings, and questions whose options or answer are not
+strings (``[1, 2, 3]`` / ``2``) store them JSON-encoded behind the ``TYPED``
+flag, so pack -> unpack round-trips the JSON schema, types included.
+
+    python quizbank.py pack quizzes/ -o quizzes/bank.qbank
+    python quizbank.py unpack quizzes/bank.qbank -o exported/
+    python quizbank.py info quizzes/bank.qbank
+"""
+import argparse
+import json
+import mmap
+import struct
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+import numpy as np
+
+from fsutil import atomic_open
+
+MAGIC = b"QZBK"
+VERSION = 3
+NONE = 0xFFFFFFFF
+HEADER = struct.Struct("<4sHHIIII5Q")
+
+QUIZ_DTYPE = np.dtype([
+    ("title", "<u4"), ("department", "<u4"), ("subcategory", "<u4"), ("meta", "<u4"),
+    ("first_question", "<u4"), ("n_questions", "<u4"),
+])
+QUESTION_DTYPE = np.dtype([
+    ("text", "<u4"), ("explanation", "<u4"), ("correct", "<u4"), ("extra", "<u4"),
+    ("first_option", "<u4"), ("n_options", "<u2"), ("correct_index", "<i2"), ("flags", "<u2"),
+])
+TYPED = 0x1   # options / correct are JSON-encoded scalars rather than plain strings
+CORE_QUESTION_KEYS = ("question", "options", "correct", "explanation")
+
+
+class BankFormatError(ValueError):
+    pass
+
+
+def quiz_department(quiz):
+    if isinstance(quiz, LazyQuiz):
+        return quiz.department
+    return _text(quiz.get("department")) or _text(quiz.get("category")) or "Uncategorized"
+
+
+def quiz_subcategory(quiz):
+    if isinstance(quiz, LazyQuiz):
+        return quiz.subcategory
+    return _text(quiz.get("subcategory")) or _text(quiz.get("topic")) or ""
+
+
+def _text(value):
+    # Non-string values are ignored so the index only ever holds sortable,
+    # hashable names.
+    return value if isinstance(value, str) else None
+
+
+# ───────────────────────────────────────────────
+# Writing
+# ───────────────────────────────────────────────
+def pack(quizzes, path):
+    """Write an iterable of quiz dicts to ``path`` (atomically)."""
+    strings, ids = [], {}
+
+    def sid(value):
+        if value is None:
+            return NONE
+        value = str(value)
+        if value not in ids:
+            ids[value] = len(strings)
+            strings.append(value)
+        return ids[value]
+
+    def extras(d, skip):
+        rest = {k: v for k, v in d.items() if k not in skip}
+        return sid(json.dumps(rest, ensure_ascii=False)) if rest else NONE
+
+    quiz_rows, question_rows, option_ids = [], [], []
+    for quiz in quizzes:
+        questions = quiz.get("questions", [])
+        quiz_rows.append((sid(quiz.get("quiz_title")), sid(quiz_department(quiz)),
+                          sid(quiz_subcategory(quiz) or None),
+                          extras(quiz, ("quiz_title", "questions")),
+                          len(question_rows), len(questions)))
+        for q in questions:
+            opts = list(q.get("options", []))
+            correct = q.get("correct")
+            correct_index = opts.index(correct) if correct in opts else -1
+            typed = any(not isinstance(v, str) for v in opts + [correct] if v is not None)
+            if typed:
+                opts = [json.dumps(o, ensure_ascii=False) for o in opts]
+                correct = None if correct is None else json.dumps(correct, ensure_ascii=False)
+            question_rows.append((
+                sid(q.get("question")), sid(q.get("explanation")), sid(correct),
+                extras(q, CORE_QUESTION_KEYS), len(option_ids), len(opts),
+                correct_index, TYPED if typed else 0,
+            ))
+            option_ids.extend(sid(o) for o in opts)
+
+    encoded = [s.encode("utf-8") for s in strings]
+    str_offsets = np.zeros(len(encoded) + 1, dtype="<u8")
+    np.cumsum([len(b) for b in encoded], out=str_offsets[1:])
+
+    sections = [
+        np.array(quiz_rows, dtype=QUIZ_DTYPE).tobytes(),
+        np.array(question_rows, dtype=QUESTION_DTYPE).tobytes(),
+        np.array(option_ids, dtype="<u4").tobytes(),
+        str_offsets.tobytes(),
+        b"".join(encoded),
+    ]
+    offsets, pos = [], HEADER.size
+    for blob in sections:
+        pos = _align(pos)
+        offsets.append(pos)
+        pos += len(blob)
+
+    path = Path(path)
+    with atomic_open(path) as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(quiz_rows), len(question_rows),
+                            len(option_ids), len(strings), *offsets))
+        for off, blob in zip(offsets, sections):
+            f.write(b"\0" * (off - f.tell()))
+            f.write(blob)
+    return path
+
+
+def _align(pos, n=8):
+    return (pos + n - 1) // n * n
+
+
+# ───────────────────────────────────────────────
+# Reading
+# ───────────────────────────────────────────────
+class QuizBank:
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mm) < HEADER.size:
+            raise BankFormatError(f"{self.path.name}: file too short")
+        (magic, version, _, n_quizzes, n_questions, n_options, n_strings,
+         quiz_off, question_off, option_off, str_off, data_off) = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            raise BankFormatError(f"{self.path.name}: not a version {VERSION} quiz bank")
+        self.quiz_records = np.frombuffer(self._mm, QUIZ_DTYPE, n_quizzes, quiz_off)
+        self.question_records = np.frombuffer(self._mm, QUESTION_DTYPE, n_questions, question_off)
+        self.option_ids = np.frombuffer(self._mm, "<u4", n_options, option_off)
+        self._str_offsets = np.frombuffer(self._mm, "<u8", n_strings + 1, str_off)
+        self._data_off = data_off
+
+    def __len__(self):
+        return len(self.quiz_records)
+
+    def string(self, sid):
+        if sid == NONE:
+            return None
+        start, end = self._str_offsets[sid], self._str_offsets[sid + 1]
+        return str(self._mm[self._data_off + start:self._data_off + end], "utf-8")
+
+    def quiz(self, i):
+        return LazyQuiz(self, i)
+
+    def __iter__(self):
+        return (LazyQuiz(self, i) for i in range(len(self)))
+
+    def correct_indices(self, i):
+        """Correct option index per question of quiz ``i`` (-1 = invalid), no decoding."""
+        rec = self.quiz_records[i]
+        first = int(rec["first_question"])
+        return self.question_records["correct_index"][first:first + int(rec["n_questions"])]
+
+
+class LazyQuiz(Mapping):
+    """Read-only quiz dict view; keys are decoded on first access."""
+
+    def __init__(self, bank, i):
+        self._bank = bank
+        self._rec = bank.quiz_records[i]
+        self._cache = {}
+
+    @property
+    def title(self):
+        return self._bank.string(int(self._rec["title"]))
+
+    @property
+    def department(self):
+        """Department as ``quiz_department`` derives it, read without the meta."""
+        return self._bank.string(int(self._rec["department"]))
+
+    @property
+    def subcategory(self):
+        return self._bank.string(int(self._rec["subcategory"])) or ""
+
+    def _fields(self):
+        if "_meta" not in self._cache:
+            meta = self._bank.string(int(self._rec["meta"]))
+            self._cache["_meta"] = json.loads(meta) if meta else {}
+        return self._cache["_meta"]
+
+    def __getitem__(self, key):
+        if key == "quiz_title":
+            return self.title
+        if key == "questions":
+            if "questions" not in self._cache:
+                first = int(self._rec["first_question"])
+                self._cache["questions"] = LazyQuestions(self._bank, first, int(self._rec["n_questions"]))
+            return self._cache["questions"]
+        return self._fields()[key]
+
+    def __iter__(self):
+        yield "quiz_title"
+        yield from self._fields()
+        yield "questions"
+
+    def __len__(self):
+        return len(self._fields()) + 2
+
+    def to_dict(self):
+        data = {k: self[k] for k in self}
+        data["questions"] = [q.to_dict() for q in data["questions"]]
+        return data
+
+
+class LazyQuestions(Sequence):
+    def __init__(self, bank, first, n):
+        self._bank, self._first, self._n = bank, first, n
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._n))]
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError(i)
+        return LazyQuestion(self._bank, self._first + i)
+
+
+class LazyQuestion(Mapping):
+    def __init__(self, bank, i):
+        self._bank = bank
+        self._rec = bank.question_records[i]
+        self._cache = {}
+
+    def _load(self, key):
+        bank, rec = self._bank, self._rec
+        if key == "question":
+            return bank.string(int(rec["text"]))
+        if key == "explanation":
+            return bank.string(int(rec["explanation"]))
+        typed = int(rec["flags"]) & TYPED
+        if key == "correct":
+            value = bank.string(int(rec["correct"]))
+            return json.loads(value) if typed and value is not None else value
+        if key == "options":
+            first = int(rec["first_option"])
+            opts = [bank.string(int(s)) for s in bank.option_ids[first:first + int(rec["n_options"])]]
+            return [json.loads(o) for o in opts] if typed else opts
+        extra = bank.string(int(rec["extra"]))
+        return json.loads(extra) if extra else {}
+
+    def _get(self, key):
+        if key not in self._cache:
+            self._cache[key] = self._load(key)
+        return self._cache[key]
+
+    def __getitem__(self, key):
+        if key in CORE_QUESTION_KEYS:
+            value = self._get(key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        return self._get("_extra")[key]
+
+    def __iter__(self):
+        rec = self._rec
+        for key, field in (("question", "text"), ("options", None),
+                           ("correct", "correct"), ("explanation", "explanation")):
+            if field is None or int(rec[field]) != NONE:
+                yield key
+        yield from self._get("_extra")
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def to_dict(self):
+        return {k: self[k] for k in self}
+
+
+def plain_quiz(quiz):
+    """A mutable, JSON-serialisable copy of a JSON or packed quiz."""
+    if isinstance(quiz, LazyQuiz):
+        return quiz.to_dict()
+    return dict(quiz)
+
+
+# ───────────────────────────────────────────────
+# CLI
+# ───────────────────────────────────────────────
+def iter_json_quizzes(sources):
+    for src in map(Path, sources):
+        files = sorted(src.glob("*.json")) if src.is_dir() else [src]
+        for file in files:
+            with open(file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            data.setdefault("quiz_title", file.stem)
+            yield data
+
+
+def main(argv=None):
+    from catalog import atomic_write_json, unique_filename
+
+    parser = argparse.ArgumentParser(description="Convert quizzes to and from the packed bank format.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("pack", help="JSON files/directories -> .qbank")
+    p.add_argument("sources", nargs="+")
+    p.add_argument("-o", "--output", required=True)
+    u = sub.add_parser("unpack", help=".qbank -> one JSON file per quiz")
+    u.add_argument("bank")
+    u.add_argument("-o", "--output", required=True)
+    i = sub.add_parser("info", help="Summarise a .qbank file")
+    i.add_argument("bank")
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        quizzes = list(iter_json_quizzes(args.sources))
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        pack(quizzes, args.output)
+        print(f"Packed {len(quizzes)} quizzes into {args.output} "
+              f"({Path(args.output).stat().st_size / 2**20:.1f} MB)")
+    elif args.command == "unpack":
+        out = Path(args.output)
+        out.mkdir(parents=True, exist_ok=True)
+        bank = QuizBank(args.bank)
+        taken = {p.name for p in out.iterdir()}
+        for quiz in bank:
+            name = unique_filename(quiz.title, taken)
+            taken.add(name)
+            atomic_write_json(out / name, quiz.to_dict())
+        print(f"Wrote {len(bank)} quizzes to {out}/")
+    else:
+        bank = QuizBank(args.bank)
+        print(f"{args.bank}: {len(bank)} quizzes, {len(bank.question_records)} questions, "
+              f"{len(bank._str_offsets) - 1} distinct strings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Vectorized scoring of quiz attempts.
+
+An attempt is the per-session state produced by ``paper.build_paper`` plus
+the answers::
+
+    {"question_order": [...], "option_shuffles": {orig_q: [...]},
+     "user_answers": {orig_q: shuffled_option_idx}}
+
+``score_attempts`` compiles the quiz into a correct-index array, stacks the
+attempts into permutation matrices and scores all of them in one pass, so
+re-grading a batch of historical attempts after a key fix costs about the
+same as grading a handful.  Keys may be ints or strings (JSON round-trips).
+
+Historical attempts may refer to questions or options that have since been
+removed from the quiz.  Such questions count as not asked (and are reported
+in ``dropped``); answers pointing past the end of a question's options count
+as wrong.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+Scores = namedtuple("Scores", ["per_question", "correct", "total", "dropped"])
+# per_question: (attempts, questions) bool, indexed by original question
+# correct / total: (attempts,) int - questions answered correctly / asked
+# dropped: (attempts,) int - questions asked that no longer exist in the quiz
+
+
+def compile_quiz(quiz):
+    """Correct option index per question (-1 if invalid) and option width."""
+    questions = quiz.get("questions", [])
+    correct = np.full(len(questions), -1, dtype=np.int16)
+    width = 0
+    for i, q in enumerate(questions):
+        opts = q.get("options", [])
+        width = max(width, len(opts))
+        if q.get("correct") in opts:
+            correct[i] = opts.index(q["correct"])
+    return correct, width
+
+
+def compile_attempts(n_questions, width, attempts):
+    n = len(attempts)
+    perms = np.full((n, n_questions, max(width, 1)), -1, dtype=np.int16)
+    choices = np.full((n, n_questions), -1, dtype=np.int16)
+    asked = np.zeros((n, n_questions), dtype=bool)
+    dropped = np.zeros(n, dtype=np.intp)
+    for a, attempt in enumerate(attempts):
+        for orig_q, opt_idx in attempt.get("option_shuffles", {}).items():
+            if 0 <= int(orig_q) < n_questions:
+                opt_idx = list(opt_idx)[:perms.shape[2]]
+                perms[a, int(orig_q), :len(opt_idx)] = opt_idx
+        order = attempt.get("question_order") or range(n_questions)
+        order = np.asarray(order, dtype=np.intp)
+        exists = (order >= 0) & (order < n_questions)
+        asked[a, order[exists]] = True
+        dropped[a] = len(order) - exists.sum()
+        answers = attempt.get("user_answers", {})
+        if answers:
+            q = np.fromiter((int(k) for k in answers), dtype=np.intp, count=len(answers))
+            val = np.fromiter(answers.values(), dtype=np.int16, count=len(answers))
+            exists = (q >= 0) & (q < n_questions)
+            choices[a, q[exists]] = val[exists]
+    return perms, choices, asked, dropped
+
+
+def score_attempts(quiz, attempts):
+    correct_idx, width = compile_quiz(quiz)
+    perms, choices, asked, dropped = compile_attempts(len(correct_idx), width, attempts)
+
+    answered = (choices >= 0) & (choices < perms.shape[2])
+    idx = np.where(answered, choices, 0).clip(0, perms.shape[2] - 1)
+    picked = np.take_along_axis(perms, idx[..., None], axis=2)[..., 0]
+    per_question = answered & asked & (picked == correct_idx[None, :]) & (correct_idx >= 0)
+    return Scores(per_question, per_question.sum(axis=1), asked.sum(axis=1), dropped)
+
+
+def score_attempt(quiz, attempt):
+    """Single-attempt convenience wrapper returning ``(correct, total)``."""
+    scores = score_attempts(quiz, [attempt])
+    return int(scores.correct[0]), int(scores.total[0])
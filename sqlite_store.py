@@ -0,0 +1,423 @@
+"""SQLite quiz storage backend.
+
+Quizzes are stored in normalized tables - one row per quiz, per question and
+per option - instead of one JSON document per quiz:
+
+* ``quizzes``: title (unique), department and subcategory as indexed columns,
+  every other top-level key (time limit, pool, adaptive...) as JSON.  The
+  indexed columns are derived values (``department`` falls back to the legacy
+  ``category`` key, ``subcategory`` to ``topic``); the keys themselves are
+  kept in the JSON as uploaded, so a quiz reads back with the same keys;
+* ``questions``: text, correct answer and explanation per position; a
+  question that does not fit those columns (malformed or non-scalar options)
+  is kept verbatim as JSON so validation still sees it as it was uploaded;
+* ``options``: one row per answer option.
+
+Listing, filtering and search are indexed queries, so nothing is held per
+quiz in memory except a bounded LRU of recently decoded quizzes.  Titles and
+question/explanation text are mirrored into an FTS5 table for search (a LIKE
+scan is used if the SQLite build lacks FTS5).
+
+Connections are pooled and reused by every session of the server process;
+writes take ``BEGIN IMMEDIATE`` so several processes can share one database
+file.  Changes committed by another process are noticed through
+``PRAGMA data_version`` (see ``start_watching()``).  Every save gives the quiz
+a new row id, which doubles as the validation cache key.
+"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+from catalog import TOKEN_RE, TITLE_WEIGHT, check_indexable, quiz_department, quiz_subcategory
+from storage import QuizStore
+from validation import ValidationCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quizzes (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    title       TEXT    NOT NULL UNIQUE,
+    department  TEXT    NOT NULL,
+    subcategory TEXT    NOT NULL,
+    settings    TEXT    NOT NULL,
+    updated_at  REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_quizzes_dept_sub ON quizzes (department, subcategory, title);
+CREATE INDEX IF NOT EXISTS idx_quizzes_sub ON quizzes (subcategory);
+
+CREATE TABLE IF NOT EXISTS questions (
+    quiz_id     INTEGER NOT NULL REFERENCES quizzes (id) ON DELETE CASCADE,
+    position    INTEGER NOT NULL,
+    question    TEXT,
+    correct,
+    explanation TEXT,
+    extra       TEXT,
+    raw         TEXT,
+    PRIMARY KEY (quiz_id, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS options (
+    quiz_id     INTEGER NOT NULL,
+    question    INTEGER NOT NULL,
+    position    INTEGER NOT NULL,
+    value,
+    PRIMARY KEY (quiz_id, question, position),
+    FOREIGN KEY (quiz_id, question) REFERENCES questions (quiz_id, position) ON DELETE CASCADE
+) WITHOUT ROWID;
+"""
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS quiz_text USING fts5 (title, body, tokenize = 'unicode61');
+"""
+
+QUIZ_COLUMNS = ("quiz_title", "questions")
+QUESTION_COLUMNS = ("question", "options", "correct", "explanation")
+POOL_SIZE = 8
+CACHE_SIZE = 2048
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
+
+def _scalar(value):
+    # Values SQLite hands back unchanged (bools would come back as ints).
+    return isinstance(value, (str, int, float)) and not isinstance(value, bool)
+
+
+def _question_row(q):
+    """``(question, correct, explanation, extra, raw), options`` for one question."""
+    if isinstance(q, dict):
+        options = q.get("options")
+        fits = (isinstance(options, list) and all(_scalar(o) for o in options)
+                and _scalar(q.get("correct", ""))
+                and isinstance(q.get("question", ""), str)
+                and isinstance(q.get("explanation", ""), str))
+        if fits:
+            extra = {k: v for k, v in q.items() if k not in QUESTION_COLUMNS}
+            row = (q.get("question"), q.get("correct"), q.get("explanation"),
+                   json.dumps(extra, ensure_ascii=False) if extra else None, None)
+            return row, options
+    return (None, None, None, None, json.dumps(q, ensure_ascii=False)), []
+
+
+def _search_body(questions):
+    parts = []
+    for q in questions if isinstance(questions, list) else ():
+        if isinstance(q, dict):
+            parts += [str(q.get("question", "")), str(q.get("explanation", ""))]
+    return "\n".join(parts)
+
+
+class SQLiteStore(QuizStore):
+    def __init__(self, path, poll_interval=0.5):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        self.quizzes = _QuizView(self)
+        self._pool = queue.LifoQueue(maxsize=POOL_SIZE)
+        self._cache = OrderedDict()    # title -> (row id, quiz), most recent last
+        self._cache_lock = threading.Lock()
+        self._generation = 0           # bumped on every invalidation
+        self._validated = ValidationCache()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            try:
+                conn.executescript(FTS_SCHEMA)
+                self.full_text = True
+            except sqlite3.OperationalError:  # SQLite built without FTS5
+                self.full_text = False
+
+    # ───────────────────────────────────────────────
+    # Connections / caching
+    # ───────────────────────────────────────────────
+    @contextmanager
+    def _connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = connect(self.path)
+        try:
+            yield conn
+        finally:
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _invalidate(self, titles=None):
+        with self._cache_lock:
+            self._generation += 1
+            if titles is None:
+                self._cache.clear()
+            else:
+                for title in titles:
+                    self._cache.pop(title, None)
+
+    def _entry(self, title):
+        """``(row id, quiz)`` for ``title``, or None; decoded quizzes are cached."""
+        with self._cache_lock:
+            entry = self._cache.get(title)
+            if entry is not None:
+                self._cache.move_to_end(title)
+                return entry
+            generation = self._generation
+        with self._connection() as conn:
+            conn.execute("BEGIN")   # one snapshot for the quiz, question and option reads
+            try:
+                entry = self._decode(conn, title)
+            finally:
+                conn.execute("COMMIT")
+        if entry is not None:
+            with self._cache_lock:
+                # Skip caching if a write or external change raced this read.
+                if generation == self._generation:
+                    self._cache[title] = entry
+                    if len(self._cache) > CACHE_SIZE:
+                        self._cache.popitem(last=False)
+        return entry
+
+    # ───────────────────────────────────────────────
+    # Refresh / watching
+    # ───────────────────────────────────────────────
+    def refresh(self):
+        self._invalidate()
+        return self.quizzes
+
+    def start_watching(self, poll=False, metrics=None):
+        """Drop cached quizzes whenever another connection commits."""
+        conn = connect(self.path)
+        last = conn.execute("PRAGMA data_version").fetchone()[0]
+
+        def run():
+            nonlocal last
+            while True:
+                time.sleep(self.poll_interval)
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+                if version != last:
+                    last = version
+                    with nullcontext() if metrics is None else metrics.span("catalog_update"):
+                        self._invalidate()
+        threading.Thread(target=run, name="quiz-store-watcher", daemon=True).start()
+
+    # ───────────────────────────────────────────────
+    # Writes
+    # ───────────────────────────────────────────────
+    def save(self, title, data, old_title=None):
+        """Replace ``title`` (and ``old_title`` on a rename) in one transaction."""
+        with self._transaction() as conn:
+            if old_title is not None and old_title != title:
+                self._delete(conn, old_title)
+            self._delete(conn, title)
+            self._insert(conn, title, data)
+        self._invalidate([title, old_title])
+
+    def save_many(self, entries, overwrite=False, reports=None):
+        saved, skipped, failed, known = [], [], [], []
+        with self._transaction() as conn:
+            for title, data in entries:
+                if not overwrite and conn.execute("SELECT 1 FROM quizzes WHERE title = ?",
+                                                  (title,)).fetchone():
+                    skipped.append(title)
+                    continue
+                # A savepoint per quiz, so one bad quiz does not sink the batch.
+                conn.execute("SAVEPOINT entry")
+                try:
+                    check_indexable(title, data)
+                    self._delete(conn, title)
+                    quiz_id = self._insert(conn, title, data)
+                except (TypeError, ValueError, sqlite3.IntegrityError) as e:
+                    conn.execute("ROLLBACK TO entry")
+                    conn.execute("RELEASE entry")
+                    failed.append((title, str(e)))
+                    continue
+                conn.execute("RELEASE entry")
+                if reports and reports.get(title) is not None:
+                    known.append((quiz_id, reports[title]))
+                saved.append(title)
+        for quiz_id, report in known:   # only once the rows are committed
+            self._validated.put(quiz_id, report)
+        self._invalidate(saved)
+        return saved, skipped, failed
+
+    def delete(self, title):
+        with self._transaction() as conn:
+            deleted = self._delete(conn, title)
+        self._invalidate([title])
+        return deleted
+
+    def validation(self, title):
+        entry = self._entry(title)
+        return None if entry is None else self._validated.get(entry[0], entry[1])
+
+    # ───────────────────────────────────────────────
+    # Index queries
+    # ───────────────────────────────────────────────
+    def departments(self):
+        with self._connection() as conn:
+            return [d for d, in conn.execute("SELECT DISTINCT department FROM quizzes ORDER BY 1")]
+
+    def subcategories(self, departments):
+        if not departments:
+            return []
+        sql = (f"SELECT DISTINCT subcategory FROM quizzes WHERE department IN ({_marks(departments)}) "
+               "AND subcategory != '' ORDER BY 1")
+        with self._connection() as conn:
+            return [s for s, in conn.execute(sql, list(departments))]
+
+    def filter(self, departments, subcategories=()):
+        if not departments:
+            return []
+        sql, params = self._where(departments, subcategories)
+        with self._connection() as conn:
+            return conn.execute(f"SELECT title, department, subcategory FROM quizzes WHERE 1{sql} "
+                                "ORDER BY department, subcategory, title", params).fetchall()
+
+    def search(self, query, departments=(), subcategories=(), limit=50):
+        tokens = TOKEN_RE.findall(query.lower())
+        if not tokens:
+            return []
+        where, params = self._where(departments, subcategories)
+        if self.full_text:
+            *full, last = tokens
+            match = " ".join([f'"{t}"' for t in full] + [f'"{last}"*'])
+            sql = ("SELECT q.title, q.department, q.subcategory FROM quiz_text "
+                   "JOIN quizzes q ON q.id = quiz_text.rowid "
+                   f"WHERE quiz_text MATCH ?{where} "
+                   f"ORDER BY bm25(quiz_text, {TITLE_WEIGHT}.0, 1.0), q.title LIMIT ?")
+            params = [match, *params, limit]
+        else:
+            like = " AND ".join("(title LIKE ? OR id IN (SELECT quiz_id FROM questions "
+                                "WHERE question LIKE ? OR explanation LIKE ?))" for _ in tokens)
+            sql = (f"SELECT title, department, subcategory FROM quizzes WHERE {like}{where} "
+                   "ORDER BY title LIMIT ?")
+            params = [p for t in tokens for p in (f"%{t}%",) * 3] + params + [limit]
+        with self._connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    # ───────────────────────────────────────────────
+    # Internals
+    # ───────────────────────────────────────────────
+    @staticmethod
+    def _where(departments, subcategories):
+        """SQL conditions and parameters for the sidebar selection."""
+        clauses, params = [], []
+        if departments:
+            clauses.append(f"department IN ({_marks(departments)})")
+            params += list(departments)
+        if subcategories:
+            clauses.append(f"subcategory IN ({_marks(subcategories)})")
+            params += list(subcategories)
+        return "".join(f" AND {c}" for c in clauses), params
+
+    def _delete(self, conn, title):
+        row = conn.execute("SELECT id FROM quizzes WHERE title = ?", (title,)).fetchone()
+        if row is None:
+            return False
+        conn.execute("DELETE FROM quizzes WHERE id = ?", row)
+        if self.full_text:
+            conn.execute("DELETE FROM quiz_text WHERE rowid = ?", row)
+        return True
+
+    def _insert(self, conn, title, data):
+        settings = {k: v for k, v in data.items() if k not in QUIZ_COLUMNS}
+        questions = data.get("questions", [])
+        if not isinstance(questions, list):
+            settings["questions"] = questions
+        cursor = conn.execute(
+            "INSERT INTO quizzes (title, department, subcategory, settings, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (title, quiz_department(data), quiz_subcategory(data),
+             json.dumps(settings, ensure_ascii=False), time.time()))
+        quiz_id = cursor.lastrowid
+        question_rows, option_rows = [], []
+        for i, q in enumerate(questions if isinstance(questions, list) else ()):
+            row, options = _question_row(q)
+            question_rows.append((quiz_id, i, *row))
+            option_rows += [(quiz_id, i, j, o) for j, o in enumerate(options)]
+        conn.executemany("INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?, ?)", question_rows)
+        conn.executemany("INSERT INTO options VALUES (?, ?, ?, ?)", option_rows)
+        if self.full_text:
+            conn.execute("INSERT INTO quiz_text (rowid, title, body) VALUES (?, ?, ?)",
+                         (quiz_id, title, _search_body(questions)))
+        return quiz_id
+
+    def _decode(self, conn, title):
+        row = conn.execute("SELECT id, settings FROM quizzes WHERE title = ?", (title,)).fetchone()
+        if row is None:
+            return None
+        quiz_id, settings = row
+        quiz = {"quiz_title": title, **json.loads(settings)}
+        options = {}
+        for question, value in conn.execute(
+                "SELECT question, value FROM options WHERE quiz_id = ? ORDER BY question, position",
+                (quiz_id,)):
+            options.setdefault(question, []).append(value)
+        questions = []
+        for position, text, correct, explanation, extra, raw in conn.execute(
+                "SELECT position, question, correct, explanation, extra, raw FROM questions "
+                "WHERE quiz_id = ? ORDER BY position", (quiz_id,)):
+            if raw is not None:
+                questions.append(json.loads(raw))
+                continue
+            q = {}
+            if text is not None:
+                q["question"] = text
+            q["options"] = options.get(position, [])
+            if correct is not None:
+                q["correct"] = correct
+            if explanation is not None:
+                q["explanation"] = explanation
+            if extra is not None:
+                q.update(json.loads(extra))
+            questions.append(q)
+        quiz.setdefault("questions", questions)
+        return quiz_id, quiz
+
+
+class _QuizView(Mapping):
+    """Read-only ``title -> quiz`` mapping backed by the database."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, title):
+        entry = self._store._entry(title)
+        if entry is None:
+            raise KeyError(title)
+        return entry[1]
+
+    def __contains__(self, title):
+        return self._store._entry(title) is not None
+
+    def __iter__(self):
+        with self._store._connection() as conn:
+            titles = [t for t, in conn.execute("SELECT title FROM quizzes ORDER BY title")]
+        return iter(titles)
+
+    def __len__(self):
+        with self._store._connection() as conn:
+            return conn.execute("SELECT count(*) FROM quizzes").fetchone()[0]
+
+
+def _marks(values):
+    return ", ".join("?" * len(values))
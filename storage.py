@@ -0,0 +1,140 @@
+"""Quiz storage backends.
+
+Everything the app needs from quiz storage goes through the ``QuizStore``
+interface below.  Two backends implement it:
+
+* ``catalog.QuizCatalog`` - one JSON file per quiz (plus read-only packed
+  ``.qbank`` banks) in a directory, parsed into memory and kept current by a
+  file watcher;
+* ``sqlite_store.SQLiteStore`` - quizzes, questions and options in normalized
+  SQLite tables; listing, filtering and search are indexed queries and quizzes
+  are decoded on demand.
+
+``open_store()`` picks one from a URL, e.g. the ``QUIZ_STORAGE`` setting::
+
+    QUIZ_STORAGE=sqlite:data/quizzes.sqlite3     # SQLite file
+    QUIZ_STORAGE=dir:quizzes                     # directory (the default)
+
+Copy a directory into a database (or back) with::
+
+    python storage.py copy dir:quizzes sqlite:data/quizzes.sqlite3
+"""
+import argparse
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+
+class QuizStore(ABC):
+    """Interface shared by the storage backends.
+
+    Every backend sets ``quizzes``, a read-only ``title -> quiz`` mapping;
+    quiz objects are shared by every session and must not be mutated (use
+    ``quizbank.plain_quiz`` for an editable copy).
+    """
+
+    @abstractmethod
+    def refresh(self):
+        """Pick up changes made outside this process; returns ``quizzes``."""
+
+    @abstractmethod
+    def start_watching(self, poll=False, metrics=None):
+        """Keep ``quizzes`` current in the background from now on.
+
+        With ``metrics`` each background update is timed as ``catalog_update``.
+        """
+
+    # Writes
+    @abstractmethod
+    def save(self, title, data, old_title=None):
+        """Store one quiz; with ``old_title`` the old entry is replaced (a rename)."""
+
+    @abstractmethod
+    def save_many(self, entries, overwrite=False, reports=None):
+        """Store ``[(title, data)]`` in one batch; returns ``(saved, skipped, failed)``.
+
+        ``saved`` and ``skipped`` (already present, without ``overwrite``) are
+        titles; ``failed`` lists ``(title, message)`` for quizzes that could not
+        be stored, which leave nothing behind.
+
+        ``reports`` may map titles to ``ValidationReport``s already computed
+        for their data (bulk_import validates in its worker processes).
+        """
+
+    @abstractmethod
+    def delete(self, title):
+        """Remove ``title``; returns False if nothing could be deleted."""
+
+    # Status
+    def load_errors(self):
+        """``{source: message}`` for stored quizzes that could not be read."""
+        return {}
+
+    def is_packed(self, title):
+        """True if ``title`` lives in a read-only packed bank."""
+        return False
+
+    @abstractmethod
+    def validation(self, title):
+        """``validation.ValidationReport`` of the stored version of ``title``."""
+
+    # Index queries
+    @abstractmethod
+    def departments(self):
+        """Sorted department names."""
+
+    @abstractmethod
+    def subcategories(self, departments):
+        """Sorted non-empty subcategories of ``departments``."""
+
+    @abstractmethod
+    def filter(self, departments, subcategories=()):
+        """``[(title, department, subcategory)]`` for the sidebar selection."""
+
+    @abstractmethod
+    def search(self, query, departments=(), subcategories=(), limit=50):
+        """Like ``filter()``, for titles/questions matching ``query`` (last token as prefix)."""
+
+
+def open_store(url=None, default_dir="quizzes", snapshot=None):
+    """``dir:<path>`` or ``sqlite:<path>``; a bare path ending in .sqlite/.sqlite3/.db is SQLite.
+
+    ``snapshot`` is where the directory backend keeps its start-up snapshot
+    (see catalog.py); the SQLite backend has nothing to snapshot.
+    """
+    url = url or f"dir:{default_dir}"
+    scheme, _, location = url.partition(":")
+    if not location:
+        scheme, location = ("sqlite" if url.endswith((".sqlite", ".sqlite3", ".db")) else "dir"), url
+    if scheme == "sqlite":
+        from sqlite_store import SQLiteStore
+        return SQLiteStore(location)
+    if scheme == "dir":
+        from catalog import QuizCatalog
+        Path(location).mkdir(parents=True, exist_ok=True)
+        return QuizCatalog(location, snapshot=snapshot)
+    raise ValueError(f"Unknown quiz storage {url!r} (expected dir:<path> or sqlite:<path>)")
+
+
+def main(argv=None):
+    from quizbank import plain_quiz
+
+    parser = argparse.ArgumentParser(description="Copy quizzes between storage backends.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    c = sub.add_parser("copy", help="copy every quiz from SOURCE to DEST")
+    c.add_argument("source")
+    c.add_argument("dest")
+    c.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args(argv)
+
+    source, dest = open_store(args.source), open_store(args.dest)
+    quizzes = source.refresh()
+    dest.refresh()
+    saved, skipped, failed = dest.save_many(((t, plain_quiz(quizzes[t])) for t in sorted(quizzes)),
+                                            overwrite=args.overwrite)
+    print(f"Copied {len(saved)} quizzes, skipped {len(skipped)} existing")
+    for title, message in failed:
+        print(f"  not copied: {title}: {message}")
+
+
+if __name__ == "__main__":
+    main()
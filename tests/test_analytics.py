@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+import adaptive
+import analytics
+from attempts import AttemptLog
+from scoring import score_attempts
+
+QUIZ = {"questions": [{"question": f"Q{i}", "options": ["a", "b", "c"], "correct": "a"} for i in range(4)]}
+
+
+def attempt(n):
+    # Attempt n answers question q with shuffled option (n + q) % 3; option 0 is correct.
+    order = list(range(4))
+    return {"question_order": order, "option_shuffles": {q: [0, 1, 2] for q in order},
+            "user_answers": {q: (n + q) % 3 for q in order}, "answer_times": {q: 5.0 * (q + 1) for q in order}}
+
+
+def record(log, n, adaptive_attempt=False):
+    a = attempt(n)
+    scores = score_attempts(QUIZ, [a])
+    log.record("Quiz", a["question_order"], a["option_shuffles"], a["user_answers"],
+               int(scores.correct[0]), int(scores.total[0]), started_at=1.0, submitted_at=2.0 + n,
+               answer_times=a["answer_times"],
+               responses=analytics.item_responses(a, scores.per_question[0]), adaptive=adaptive_attempt)
+
+
+@pytest.fixture
+def log(tmp_path):
+    log = AttemptLog(tmp_path / "attempts.sqlite3", flush_interval=0.01)
+    analytics.install(log)
+    adaptive.install(log)
+    yield log
+    log.close()
+
+
+def tables(log):
+    conn = log.connect()
+    try:
+        return ([tuple(r) for r in conn.execute("SELECT * FROM quiz_stats ORDER BY 1")],
+                [tuple(r) for r in conn.execute("SELECT * FROM question_stats ORDER BY 1, 2")],
+                [tuple(r) for r in conn.execute("SELECT * FROM fixed_responses ORDER BY 1, 2")])
+    finally:
+        conn.close()
+
+
+def test_rebuild_matches_incremental_aggregates(log):
+    for n in range(30):
+        record(log, n, adaptive_attempt=n % 5 == 0)
+    log.flush()
+    incremental = tables(log)
+    assert analytics.rebuild(log, "Quiz", QUIZ, chunk_size=7) == 0
+    adaptive.rebuild(log, "Quiz", QUIZ, chunk_size=7)
+    assert tables(log) == incremental
+    assert incremental[0][0][1] == 30 and incremental[2][0][2] == 24   # adaptive attempts not counted
+
+
+def test_rebuild_does_not_block_the_writer(log, monkeypatch):
+    # Attempts written while the rebuild is scanning are counted exactly once.
+    for n in range(10):
+        record(log, n)
+    log.flush()
+    real = analytics.score_attempts
+    calls = []
+
+    def score_and_record(quiz, chunk):
+        if not calls:
+            done = threading.Event()
+            threading.Thread(target=lambda: (record(log, 99), log.flush(), done.set())).start()
+            assert done.wait(5), "attempt-log writer blocked by the rebuild scan"
+        calls.append(len(chunk))
+        return real(quiz, chunk)
+    monkeypatch.setattr(analytics, "score_attempts", score_and_record)
+    analytics.rebuild(log, "Quiz", QUIZ, chunk_size=4)
+    quiz_stats, question_stats, _ = tables(log)
+    assert quiz_stats[0][1] == 11
+    assert all(row[2] == 11 for row in question_stats)
+
+
+def test_rebuild_after_key_change_and_removed_questions(log):
+    for n in range(6):
+        record(log, n)
+    log.flush()
+    fixed = {"questions": [dict(q, correct="b") for q in QUIZ["questions"][:3]]}
+    assert analytics.rebuild(log, "Quiz", fixed) == 6
+    conn = log.connect()
+    report = analytics.question_report(conn, "Quiz")
+    conn.close()
+    assert sorted(report) == [0, 1, 2]
+    # Question 0 was answered with option n % 3, so "b" (index 1) is right for n = 1 and 4.
+    assert report[0]["responses"] == 6 and report[0]["p_value"] == pytest.approx(2 / 6)
@@ -0,0 +1,93 @@
+import sqlite3
+import threading
+import time
+
+import attempts
+from attempts import AttemptLog
+
+
+class FastLog(AttemptLog):
+    # A short busy timeout so a held lock fails fast instead of after 30 s.
+    def connect(self):
+        conn = super().connect()
+        conn.execute("PRAGMA busy_timeout = 20")
+        return conn
+
+
+def record(log, title, correct=1):
+    return log.record(title, [0, 1], {0: [1, 0], 1: [0, 1]}, {0: "a", 1: None}, correct, 2,
+                      started_at=100.0, submitted_at=160.0, answer_times={0: 12.345}, seed=7)
+
+
+def test_record_and_read_back(tmp_path):
+    log = AttemptLog(tmp_path / "attempts.sqlite3", flush_interval=0.01)
+    record(log, "A", correct=2)
+    record(log, "B")
+    log.flush()
+    rows = log.query(quiz_title="A")
+    assert len(rows) == 1
+    row = rows[0]
+    # JSON columns come back with string keys.
+    assert row["duration_sec"] == 60.0
+    assert row["option_shuffles"] == {"0": [1, 0], "1": [0, 1]}
+    assert row["user_answers"] == {"0": "a", "1": None}
+    assert row["answer_times"] == {"0": 12.3} and row["seed"] == 7 and not row["adaptive"]
+    assert [r["quiz_title"] for chunk in log.iter_chunks(chunk_size=1) for r in chunk] == ["A", "B"]
+    assert {r["quiz_title"]: r["attempts"] for r in log.summary()} == {"A": 1, "B": 1}
+    log.close()
+
+
+def test_locked_database_is_retried(tmp_path, monkeypatch):
+    monkeypatch.setattr(attempts, "RETRY_DELAYS", (0.02,))
+    path = tmp_path / "attempts.sqlite3"
+    log = FastLog(path, flush_interval=0.01)
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")   # holds the write lock
+    record(log, "A")
+    time.sleep(0.3)                      # several failed attempts
+    blocker.execute("COMMIT")
+    log.flush()
+    assert [r["quiz_title"] for r in log.query()] == ["A"]
+    log.close()
+
+
+def test_batch_is_dropped_after_retry_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(attempts, "RETRY_DELAYS", (0.02,))
+    monkeypatch.setattr(attempts, "RETRY_FOR", 0.1)
+    path = tmp_path / "attempts.sqlite3"
+    log = FastLog(path, flush_interval=0.01)
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    record(log, "Lost")
+    flushed = threading.Thread(target=log.flush)
+    flushed.start()
+    flushed.join(5)
+    assert not flushed.is_alive()
+    blocker.execute("COMMIT")
+    record(log, "Kept")
+    log.flush()
+    assert [r["quiz_title"] for r in log.query()] == ["Kept"]
+    log.close()
+
+
+def test_unencodable_attempt_does_not_sink_the_batch(tmp_path):
+    log = AttemptLog(tmp_path / "attempts.sqlite3", flush_interval=0.01)
+    log.record("Bad", [0], {0: [0]}, {0: object()}, 0, 1)
+    record(log, "Good")
+    log.flush()
+    assert [r["quiz_title"] for r in log.query()] == ["Good"]
+    log.close()
+
+
+def test_failing_hook_keeps_the_attempts(tmp_path):
+    log = AttemptLog(tmp_path / "attempts.sqlite3", flush_interval=0.01)
+    seen = []
+
+    def hook(conn, rows):
+        seen.extend(r["quiz_title"] for r in rows)
+        raise RuntimeError("hook failed")
+    log.add_hook(hook)
+    record(log, "A")
+    log.flush()
+    assert seen == ["A"] and len(log.query()) == 1
+    log.close()
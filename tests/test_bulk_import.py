@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from bulk_import import iter_items, parse_all, parse_item, prepare
+from catalog import QuizCatalog
+from sqlite_store import SQLiteStore
+
+
+def item(label, data):
+    return label, json.dumps(data).encode()
+
+
+def good(title):
+    return {"quiz_title": title, "questions": [{"question": "Q?", "options": ["a", "b"], "correct": "a"}]}
+
+
+def test_parse_item():
+    assert parse_item(("x.json", b"{nope")).error.startswith("invalid JSON")
+    assert parse_item(item("x.json", [1])).error == "top-level value must be an object"
+    assert parse_item(item("x.json", {"questions": "text"})).error == "missing 'questions' list"
+    assert parse_item(item("x.jsonl:3", {"questions": []})).error == "missing 'quiz_title'"
+    result = parse_item(item("dir/Fallback.json", {"questions": ["oops"]}))
+    assert result.title == "Fallback" and not result.report.ok
+
+
+def test_iter_items_directory_and_jsonl(tmp_path):
+    (tmp_path / "a.json").write_text(json.dumps(good("A")))
+    (tmp_path / "b.jsonl").write_text(json.dumps(good("B")) + "\n\n" + json.dumps(good("C")) + "\n")
+    assert [label for label, _ in iter_items(tmp_path)] == ["a.json"]
+    assert [label for label, _ in iter_items(tmp_path / "b.jsonl")] == ["b.jsonl:1", "b.jsonl:3"]
+
+
+def test_prepare_fills_missing_department():
+    title, data = prepare(parse_item(item("a.json", good("A"))), department="Maths")
+    assert (title, data["department"]) == ("A", "Maths")
+    _, data = prepare(parse_item(item("b.json", {**good("B"), "category": "Art"})), department="Maths")
+    assert "department" not in data
+
+
+@pytest.fixture(params=["directory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "directory":
+        (tmp_path / "quizzes").mkdir()
+        store = QuizCatalog(tmp_path / "quizzes")
+    else:
+        store = SQLiteStore(tmp_path / "quizzes.sqlite3")
+    store.refresh()
+    return store
+
+
+def test_save_many_imports_malformed_quizzes(store):
+    results = list(parse_all([item(f"{i}.json", good(f"Quiz {i}")) for i in range(80)]
+                             + [item("bad.json", {"quiz_title": "Bad", "questions": ["str"]})], workers=0))
+    reports = {r.title: r.report for r in results}
+    saved, skipped, failed = store.save_many([prepare(r) for r in results], reports=reports)
+    assert len(saved) == 81 and not skipped and not failed
+    assert not store.validation("Bad").ok
+    assert store.refresh().keys() >= {"Bad", "Quiz 0"}
+
+
+def test_save_many_reports_failures_and_leaves_nothing_behind(store):
+    entries = [("Good", good("Good")), ("Unserialisable", {**good("x"), "tags": {"a"}}),
+               ("", good("untitled")), ("Also good", good("Also good"))]
+    saved, skipped, failed = store.save_many(entries)
+    assert saved == ["Good", "Also good"]
+    assert [title for title, _ in failed] == ["Unserialisable", ""]
+    assert sorted(store.refresh()) == ["Also good", "Good"]
+    assert store.save_many([("Good", good("Good"))]) == ([], ["Good"], [])
+
+
+def test_save_many_drops_files_it_cannot_index(tmp_path, monkeypatch):
+    catalog = QuizCatalog(tmp_path)
+    catalog.refresh()
+
+    def boom(key, quiz):
+        raise RuntimeError("validator crashed")
+    monkeypatch.setattr(catalog._validated, "get", boom)
+    saved, _, failed = catalog.save_many([("Doomed", good("Doomed"))])
+    assert not saved and failed[0][0] == "Doomed"
+    assert list(tmp_path.iterdir()) == []
+    assert not catalog.load_errors() and "Doomed" not in catalog.quizzes
@@ -0,0 +1,170 @@
+import json
+
+import pytest
+
+import catalog as catalog_module
+from catalog import QuizCatalog, QuizIndex
+from quizbank import pack, plain_quiz
+
+
+def quiz(title, department="General", subcategory=None, questions=()):
+    data = {"quiz_title": title, "department": department,
+            "questions": [{"question": q, "options": ["a", "b"], "correct": "a"} for q in questions]}
+    if subcategory:
+        data["subcategory"] = subcategory
+    return data
+
+
+def write(directory, name, data):
+    (directory / name).write_text(json.dumps(data), encoding="utf-8")
+
+
+# ───────────────────────────────────────────────
+# QuizIndex
+# ───────────────────────────────────────────────
+@pytest.fixture
+def index():
+    index = QuizIndex()
+    index.add("Intro to C", quiz("Intro to C", "Computing", "Languages", ["What does malloc return?"]))
+    index.add("R for Statistics", quiz("R for Statistics", "Maths", "Statistics", ["What is a data frame?"]))
+    index.add("Python Basics", quiz("Python Basics", "Computing", "Languages", ["What is a list?"]))
+    return index
+
+
+def test_index_tree(index):
+    assert index.departments() == ["Computing", "Maths"]
+    assert index.subcategories(["Computing"]) == ["Languages"]
+    assert sorted(t for t, _, _ in index.filter(["Computing"])) == ["Intro to C", "Python Basics"]
+
+
+def test_search_ranks_title_hits_first(index):
+    assert index.search("what is") == ["Python Basics", "R for Statistics"]
+    assert index.search("python") == ["Python Basics"]
+    assert index.search("mall") == ["Intro to C"]
+
+
+def test_search_one_character_words(index):
+    assert index.search("c") == ["Intro to C"]
+    assert index.search("r frame") == ["R for Statistics"]   # "r" is not just a prefix of "return"
+    assert index.search("r")[0] == "R for Statistics"
+    assert index.search("intro to c") == ["Intro to C"]
+
+
+def test_remove_and_copy(index):
+    copy = index.copy()
+    index.remove("Intro to C")
+    assert index.search("malloc") == []
+    assert "Computing" in index.departments()
+    assert copy.search("malloc") == ["Intro to C"]
+
+
+def test_index_accepts_malformed_quizzes():
+    index = QuizIndex()
+    index.add("Strings", {"department": "Odd", "questions": ["oops", {"question": "Kept?"}]})
+    index.add("Text", {"department": ["not", "a", "name"], "questions": "text"})
+    index.add("Nulls", {"topic": 5, "questions": [{"question": None, "explanation": 3}]})
+    assert index.departments() == ["Odd", "Uncategorized"]
+    assert index.search("kept") == ["Strings"]
+    assert index.meta["Nulls"] == ("Uncategorized", "")
+
+
+# ───────────────────────────────────────────────
+# QuizCatalog
+# ───────────────────────────────────────────────
+@pytest.fixture
+def directory(tmp_path):
+    directory = tmp_path / "quizzes"
+    directory.mkdir()
+    write(directory, "c.json", quiz("Intro to C", "Computing", "Languages", ["What does malloc return?"]))
+    write(directory, "r.json", quiz("R for Statistics", "Maths", questions=["What is a data frame?"]))
+    pack([quiz("Packed Physics", "Science", questions=["What is a newton?"]),
+          quiz("Intro to C", "Packed", questions=["Shadowed by the JSON file"])],
+         directory / "bank.qbank")
+    return directory
+
+
+def test_catalog_loads_json_and_banks(directory):
+    catalog = QuizCatalog(directory)
+    catalog.refresh()
+    assert sorted(catalog.quizzes) == ["Intro to C", "Packed Physics", "R for Statistics"]
+    assert catalog.quizzes["Intro to C"]["department"] == "Computing"
+    assert catalog.is_packed("Packed Physics")
+    assert catalog.departments() == ["Computing", "Maths", "Science"]
+    assert "_meta" not in catalog.quizzes["Packed Physics"]._cache   # indexed without decoding
+
+
+def test_catalog_picks_up_file_changes(directory):
+    catalog = QuizCatalog(directory)
+    catalog.refresh()
+    write(directory, "r.json", quiz("R for Statistics", "Statistics"))
+    (directory / "c.json").unlink()
+    catalog.apply(["r.json", "c.json"])
+    assert catalog.quizzes["R for Statistics"]["department"] == "Statistics"
+    assert catalog.quizzes["Intro to C"]["department"] == "Packed"
+
+
+def test_catalog_save_rename_delete(directory):
+    catalog = QuizCatalog(directory)
+    catalog.refresh()
+    catalog.save("Stats in R", quiz("R for Statistics", "Maths"), old_title="R for Statistics")
+    assert "R for Statistics" not in catalog.quizzes
+    assert catalog.quizzes["Stats in R"]["quiz_title"] == "Stats in R"
+    assert sorted(p.name for p in directory.glob("*.json")) == ["Stats in R.json", "c.json"]
+
+    assert catalog.delete("Intro to C")
+    assert catalog.quizzes["Intro to C"]["department"] == "Packed"   # the bank's copy shows again
+    assert not catalog.delete("Packed Physics")
+
+
+def test_catalog_snapshot_round_trip(directory, tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_module, "SNAPSHOT_BATCH", 1)
+    snapshot = tmp_path / "catalog.pickle"
+    catalog = QuizCatalog(directory, snapshot=snapshot)
+    catalog.refresh()
+    catalog.write_snapshot()
+
+    restored = QuizCatalog(directory, snapshot=snapshot)
+    assert sorted(restored.quizzes) == ["Intro to C", "R for Statistics"]   # banks are reopened
+    assert restored.quizzes["Intro to C"] == catalog.quizzes["Intro to C"]
+    assert restored.departments() == catalog.departments()
+    restored.refresh()
+    assert {t: plain_quiz(q) for t, q in restored.quizzes.items()} == \
+        {t: plain_quiz(q) for t, q in catalog.quizzes.items()}
+
+    monkeypatch.setattr(catalog_module, "SNAPSHOT_VERSION", catalog_module.SNAPSHOT_VERSION + 1)
+    assert QuizCatalog(directory, snapshot=snapshot).quizzes == {}
+
+
+def test_catalog_survives_malformed_files(directory):
+    write(directory, "strings.json", {"quiz_title": "Strings", "questions": ["oops"]})
+    write(directory, "text.json", {"quiz_title": "Text", "questions": "text"})
+    write(directory, "list.json", ["not", "a", "quiz"])
+    write(directory, "title.json", {"quiz_title": ["x"], "questions": []})
+    catalog = QuizCatalog(directory)
+    catalog.refresh()
+    assert {"Strings", "Text", "Intro to C"} <= set(catalog.quizzes)
+    assert sorted(catalog.load_errors()) == ["list.json", "title.json"]
+    assert not catalog.validation("Strings").ok
+    catalog.refresh()
+    assert sorted(catalog.load_errors()) == ["list.json", "title.json"]
+
+
+def test_index_failure_leaves_no_partial_state(directory, monkeypatch):
+    catalog = QuizCatalog(directory)
+    catalog.refresh()
+    before = dict(catalog.quizzes), catalog.departments()
+
+    def boom(key, quiz):
+        raise RuntimeError("validator crashed")
+    monkeypatch.setattr(catalog._validated, "get", boom)
+    write(directory, "new.json", quiz("Brand New", "Fresh", questions=["Anything?"]))
+    catalog.apply(["new.json"])
+    assert "new.json" in catalog.load_errors()
+    assert (dict(catalog.quizzes), catalog.departments()) == before
+    assert catalog.search("brand") == []
+
+    monkeypatch.undo()
+    (directory / "new.json").touch()
+    write(directory, "new.json", quiz("Brand New", "Fresh", questions=["Anything? Yes."]))
+    catalog.apply(["new.json"])
+    assert "Brand New" in catalog.quizzes and not catalog.load_errors()
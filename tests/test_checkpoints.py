@@ -0,0 +1,122 @@
+import copy
+import sqlite3
+import time
+
+from checkpoints import CheckpointStore, quiz_fingerprint
+
+STATE = {"seed": 42, "answers": {"0": 1}, "page": 0, "fingerprint": "f"}
+
+
+def stored(store):
+    conn = sqlite3.connect(store.path)
+    try:
+        return {token: (title, state) for token, title, state in
+                conn.execute("SELECT token, quiz_title, state FROM checkpoints")}
+    finally:
+        conn.close()
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def counting(store):
+    writes = []
+    write = store._write
+
+    def _write(conn, pending):
+        if pending:
+            writes.append(dict(pending))
+        write(conn, pending)
+    store._write = _write
+    return writes
+
+
+def test_saves_are_debounced_into_one_write(tmp_path):
+    store = CheckpointStore(tmp_path / "checkpoints.sqlite3", interval=0.3)
+    writes = counting(store)
+    for page in range(5):
+        store.save("t1", "Quiz", {**STATE, "page": page})
+        store.save("t2", "Other", STATE)
+    assert stored(store) == {}
+    wait_for(lambda: writes)
+    time.sleep(0.1)
+    assert len(writes) == 1 and set(writes[0]) == {"t1", "t2"}
+    assert store.load("t1") == ("Quiz", {**STATE, "page": 4})
+    assert set(stored(store)) == {"t1", "t2"}
+    store.close()
+
+
+def test_load_reads_the_pending_state(tmp_path):
+    store = CheckpointStore(tmp_path / "checkpoints.sqlite3", interval=60)
+    store.save("t1", "Quiz", STATE)
+    store.flush()
+    store.save("t1", "Quiz", {**STATE, "page": 3})
+    assert store.load("t1") == ("Quiz", {**STATE, "page": 3})
+    assert store.load("missing") is None
+    store.close()
+    reopened = CheckpointStore(tmp_path / "checkpoints.sqlite3")
+    assert reopened.load("t1") == ("Quiz", {**STATE, "page": 3})
+    reopened.close()
+
+
+def test_discard_beats_a_pending_save(tmp_path):
+    store = CheckpointStore(tmp_path / "checkpoints.sqlite3", interval=60)
+    store.save("t1", "Quiz", STATE)
+    store.save("t2", "Quiz", STATE)
+    store.flush()
+    store.save("t1", "Quiz", {**STATE, "page": 1})
+    store.discard("t1")
+    store.save("t3", "Quiz", STATE)
+    store.discard("t3")
+    assert store.load("t1") is None and store.load("t3") is None
+    store.flush()
+    assert set(stored(store)) == {"t2"}
+    assert store.load("t1") is None
+    store.close()
+
+
+def test_expired_checkpoints_are_dropped(tmp_path):
+    store = CheckpointStore(tmp_path / "checkpoints.sqlite3")
+    store.save("t1", "Quiz", STATE)
+    store.close()
+    reopened = CheckpointStore(tmp_path / "checkpoints.sqlite3", max_age=-1)
+    assert reopened.load("t1") is None
+    reopened.close()
+
+
+QUIZ = {
+    "quiz_title": "Quiz",
+    "department": "Science",
+    "questions": [{"question": "Q1", "options": ["a", "b"], "correct": "a"},
+                  {"question": "Q2", "options": ["c", "d"], "correct": "d"}],
+    "pool": {"size": 1},
+}
+
+
+def test_fingerprint_tracks_questions_and_pool():
+    fingerprint = quiz_fingerprint(QUIZ)
+    assert quiz_fingerprint(copy.deepcopy(QUIZ)) == fingerprint
+
+    edited = copy.deepcopy(QUIZ)
+    edited["questions"][1]["options"][0] = "e"
+    assert quiz_fingerprint(edited) != fingerprint
+
+    reordered = copy.deepcopy(QUIZ)
+    reordered["questions"].reverse()
+    assert quiz_fingerprint(reordered) != fingerprint
+
+    for pool in ({"size": 2}, {"size": 1, "quotas": {"Loops": 1}}, None):
+        repooled = copy.deepcopy(QUIZ)
+        if pool is None:
+            del repooled["pool"]
+        else:
+            repooled["pool"] = pool
+        assert quiz_fingerprint(repooled) != fingerprint
+
+    # Settings that do not shape the paper leave it alone.
+    renamed = {**copy.deepcopy(QUIZ), "department": "Maths", "description": "new"}
+    assert quiz_fingerprint(renamed) == fingerprint
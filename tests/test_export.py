@@ -0,0 +1,44 @@
+import csv
+import io
+
+from attempts import AttemptLog
+from export import attempt_count, export_attempts, export_questions, question_count, write_file
+
+QUIZZES = {
+    "A": {"questions": [{"question": "Q1", "options": [1, 2], "correct": 2}, "oops"]},
+    "B": {"questions": [{"question": "Q2", "options": ["x", "y"], "correct": "x", "topic": "T"}]},
+    "C": {"questions": "text"},
+}
+META = {"A": ("Maths", ""), "B": ("Art", "Drawing"), "C": ("Art", "")}
+
+
+def rows(chunks):
+    return list(csv.DictReader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+
+
+def test_questions_csv():
+    out = rows(export_questions(QUIZZES, META))
+    assert [(r["quiz_title"], r["number"], r["options"], r["correct"]) for r in out] == \
+        [("A", "1", '["1", "2"]', "2"), ("B", "1", '["x", "y"]', "x")]
+    assert out[1]["question_subcategory"] == "T"
+    assert question_count(QUIZZES, META) == 3   # counts the malformed "oops" too
+    assert question_count(QUIZZES, {"A": META["A"], "Gone": ("", "")}) == 2
+
+
+def test_attempts_csv_and_count(tmp_path):
+    log = AttemptLog(tmp_path / "attempts.sqlite3")
+    for i, title in enumerate(["A", "A", "B", "Deleted"]):
+        log.record(title, [0], {0: [1, 0]}, {0: "x"}, i % 2, 1, started_at=100.0, submitted_at=110.0 + i)
+    log.flush()
+    meta = {"A": META["A"]}
+    assert attempt_count(log, meta) == 2
+    assert attempt_count(log, meta, everything=True) == 4
+    out = rows(export_attempts(log, meta))
+    assert [(r["quiz_title"], r["department"], r["score"]) for r in out] == [("A", "Maths", "0.0"), ("A", "Maths", "1.0")]
+    assert len(rows(export_attempts(log, meta, everything=True))) == 4
+    log.close()
+
+
+def test_write_file(tmp_path):
+    path = write_file(export_questions(QUIZZES, META), tmp_path / "out" / "questions.csv")
+    assert len(rows([path.read_bytes()])) == 2
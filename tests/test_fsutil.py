@@ -0,0 +1,23 @@
+import pytest
+
+from fsutil import atomic_open
+
+
+def test_atomic_open_replaces_on_success(tmp_path):
+    path = tmp_path / "out.txt"
+    path.write_text("old")
+    with atomic_open(path, "w", encoding="utf-8") as f:
+        f.write("new")
+    assert path.read_text() == "new"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.txt"]
+
+
+def test_atomic_open_keeps_old_file_on_error(tmp_path):
+    path = tmp_path / "out.bin"
+    path.write_bytes(b"old")
+    with pytest.raises(RuntimeError):
+        with atomic_open(path, fsync=True) as f:
+            f.write(b"partial")
+            raise RuntimeError("boom")
+    assert path.read_bytes() == b"old"
+    assert [p.name for p in tmp_path.iterdir()] == ["out.bin"]
@@ -0,0 +1,93 @@
+import random
+from collections import Counter
+
+import pytest
+
+from paper import build_paper, draw, paper_for_seed, pool_spec
+
+
+def question(i, sub=None, correct="a"):
+    q = {"question": f"Q{i}", "options": ["a", "b", "c", "d"], "correct": correct}
+    if sub:
+        q["subcategory"] = sub
+    return q
+
+
+QUESTIONS = ([question(i, "Loops") for i in range(6)] + [question(i, "Types") for i in range(6, 10)]
+             + [question(i) for i in range(10, 20)])
+
+
+def test_same_seed_same_paper():
+    quiz = {"questions": QUESTIONS, "pool": {"size": 8, "quotas": {"Loops": 3, "Types": 2}}}
+    first = paper_for_seed(quiz, 12345)
+    assert paper_for_seed(quiz, 12345) == first
+    assert paper_for_seed(dict(quiz), 12345, skip=frozenset()) == first
+    assert len({tuple(paper_for_seed(quiz, seed)[0]) for seed in range(20)}) > 1
+
+
+def test_paper_is_consistent():
+    order, shuffles, correct_positions = paper_for_seed({"questions": QUESTIONS}, 7)
+    assert sorted(order) == list(range(20))
+    assert set(shuffles) == set(order)
+    for q, perm in shuffles.items():
+        assert sorted(perm) == [0, 1, 2, 3]
+        assert QUESTIONS[q]["options"][perm[correct_positions[q]]] == QUESTIONS[q]["correct"]
+
+
+def test_quotas_are_filled_first():
+    for seed in range(30):
+        order = draw(QUESTIONS, size=8, quotas={"Loops": 3, "Types": 2}, rng=random.Random(seed))
+        subs = Counter(QUESTIONS[i].get("subcategory") for i in order)
+        assert len(order) == len(set(order)) == 8
+        assert subs["Loops"] >= 3 and subs["Types"] >= 2
+
+
+def test_quota_larger_than_its_group_or_the_paper():
+    order = draw(QUESTIONS, size=12, quotas={"Types": 10}, rng=random.Random(1))
+    assert len(order) == 12
+    assert sum(QUESTIONS[i].get("subcategory") == "Types" for i in order) == 4
+    order = draw(QUESTIONS, size=3, quotas={"Loops": 5}, rng=random.Random(1))
+    assert len(order) == 3 and all(QUESTIONS[i]["subcategory"] == "Loops" for i in order)
+
+
+def test_skipped_questions_are_never_drawn():
+    skip = frozenset(range(0, 20, 2))
+    for seed in range(20):
+        order = draw(QUESTIONS, size=10, rng=random.Random(seed), skip=skip)
+        assert sorted(order) == list(range(1, 20, 2))
+    assert len(draw(QUESTIONS, size=15, rng=random.Random(0), skip=skip)) == 10
+
+
+def test_without_a_pool_invalid_questions_stay_on_the_paper():
+    questions = [question(0), "oops", {"question": "no options"}, {"options": 5}, question(4)]
+    order, shuffles, correct_positions = build_paper(questions, random.Random(3), skip={1, 2, 3})
+    assert sorted(order) == [0, 1, 2, 3, 4]
+    assert set(shuffles) == set(correct_positions) == {0, 4}
+
+
+@pytest.mark.parametrize("pool, expected", [
+    (None, (None, {})),
+    ({}, (None, {})),
+    ({"size": 5}, (5, {})),
+    ({"size": "5"}, (5, {})),
+    ({"size": 0}, (1, {})),
+    ({"quotas": {"Loops": 2, "Types": 1}}, (3, {"Loops": 2, "Types": 1})),
+    ({"size": 4, "quotas": {"Loops": 2, "Empty": 0}}, (4, {"Loops": 2})),
+    ("text", (None, {})),
+    (5, (None, {})),
+    ([1, 2], (None, {})),
+    ({"size": "many"}, (None, {})),
+    ({"size": [3]}, (None, {})),
+    ({"quotas": ["Loops"]}, (None, {})),
+    ({"quotas": {"Loops": "two"}}, (None, {})),
+])
+def test_pool_spec(pool, expected):
+    quiz = {"questions": QUESTIONS}
+    if pool is not None:
+        quiz["pool"] = pool
+    assert pool_spec(quiz) == expected
+
+
+def test_malformed_pool_uses_every_question():
+    order, _, _ = paper_for_seed({"questions": QUESTIONS, "pool": {"size": "many"}}, 1)
+    assert sorted(order) == list(range(20))
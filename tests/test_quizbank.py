@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from quizbank import BankFormatError, QuizBank, pack, plain_quiz, quiz_department, quiz_subcategory
+
+QUIZZES = [
+    {
+        "quiz_title": "Python Basics",
+        "department": "Computing",
+        "subcategory": "Python",
+        "time_limit": 10,
+        "questions": [
+            {"question": "Which keyword defines a function?", "options": ["def", "fun", "lambda"],
+             "correct": "def", "explanation": "``def`` starts a function definition."},
+            {"question": "What is 1 + 1?", "options": [1, 2, 3], "correct": 2, "points": 2},
+            {"question": "Is 0.5 a float?", "options": [True, False], "correct": True},
+        ],
+    },
+    {
+        "quiz_title": "Legacy Keys",
+        "category": "Science",
+        "topic": "Physics",
+        "questions": [
+            {"question": "Unit of force?", "options": ["newton", "joule"], "correct": "newton"},
+            {"question": "No answer given", "options": ["a", "b"]},
+        ],
+    },
+]
+
+
+@pytest.fixture
+def bank(tmp_path):
+    return QuizBank(pack(QUIZZES, tmp_path / "bank.qbank"))
+
+
+def test_pack_unpack_round_trip(bank):
+    assert [plain_quiz(q) for q in bank] == QUIZZES
+
+
+def test_scalar_types_survive(bank):
+    question = bank.quiz(0)["questions"][1]
+    assert question["options"] == [1, 2, 3]
+    assert question["correct"] == 2 and isinstance(question["correct"], int)
+    assert bank.quiz(0)["questions"][2]["correct"] is True
+
+
+def test_correct_indices(bank):
+    assert list(bank.correct_indices(0)) == [0, 1, 0]
+    assert list(bank.correct_indices(1)) == [0, -1]
+
+
+def test_missing_keys_stay_missing(bank):
+    question = bank.quiz(1)["questions"][1]
+    assert "correct" not in question and "explanation" not in question
+    with pytest.raises(KeyError):
+        question["correct"]
+
+
+def test_lazy_quiz_is_json_serialisable(bank):
+    quiz = bank.quiz(1)
+    assert quiz.title == "Legacy Keys"
+    assert json.loads(json.dumps(quiz.to_dict())) == QUIZZES[1]
+
+
+def test_department_comes_from_the_record(tmp_path):
+    quizzes = QUIZZES + [{"quiz_title": "Bare", "department": 5, "questions": []}]
+    bank = QuizBank(pack(quizzes, tmp_path / "bank.qbank"))
+    for quiz, source in zip(bank, quizzes):
+        assert (quiz.department, quiz.subcategory) == (quiz_department(source), quiz_subcategory(source))
+        assert (quiz_department(quiz), quiz_subcategory(quiz)) == (quiz.department, quiz.subcategory)
+        assert "_meta" not in quiz._cache
+    assert [(q.department, q.subcategory) for q in bank] == [
+        ("Computing", "Python"), ("Science", "Physics"), ("Uncategorized", "")]
+    assert plain_quiz(bank.quiz(2)) == quizzes[2]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "junk.qbank"
+    path.write_bytes(b"not a bank" * 20)
+    with pytest.raises(BankFormatError):
+        QuizBank(path)
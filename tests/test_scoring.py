@@ -0,0 +1,87 @@
+import numpy as np
+
+from scoring import compile_quiz, score_attempt, score_attempts
+
+QUIZ = {"questions": [
+    {"question": "Q0", "options": ["a", "b", "c"], "correct": "a"},
+    {"question": "Q1", "options": ["x", "y"], "correct": "y"},
+    {"question": "Q2", "options": ["p", "q", "r", "s"], "correct": "nope"},   # invalid: not an option
+]}
+IDENTITY = {0: [0, 1, 2], 1: [0, 1], 2: [0, 1, 2, 3]}
+
+
+def attempt(answers, order=(0, 1, 2), shuffles=IDENTITY):
+    return {"question_order": list(order), "option_shuffles": shuffles, "user_answers": answers}
+
+
+def test_compile_quiz():
+    correct, width = compile_quiz(QUIZ)
+    assert list(correct) == [0, 1, -1] and width == 4
+
+
+def test_shuffled_answers():
+    # Shown order for Q0 is c, a, b: the correct "a" is at shuffled index 1.
+    shuffles = {0: [2, 0, 1], 1: [1, 0], 2: [0, 1, 2, 3]}
+    scores = score_attempts(QUIZ, [attempt({0: 1, 1: 0}, shuffles=shuffles),
+                                   attempt({0: 0, 1: 1}, shuffles=shuffles)])
+    assert scores.per_question.tolist() == [[True, True, False], [False, False, False]]
+    assert scores.correct.tolist() == [2, 0]
+
+
+def test_string_and_int_keys_score_the_same():
+    ints = attempt({0: 0, 1: 1})
+    strings = {"question_order": [0, 1, 2],
+               "option_shuffles": {str(k): v for k, v in IDENTITY.items()},
+               "user_answers": {"0": 0, "1": 1}}
+    a, b = score_attempts(QUIZ, [ints, strings]).per_question
+    assert a.tolist() == b.tolist() == [True, True, False]
+
+
+def test_skipped_answers_are_wrong_but_counted():
+    scores = score_attempts(QUIZ, [attempt({}), attempt({1: 1})])
+    assert scores.correct.tolist() == [0, 1]
+    assert scores.total.tolist() == [3, 3]
+
+
+def test_invalid_questions_count_in_total():
+    # Q2 has no valid answer key: never correct, still asked.
+    correct, total = score_attempt(QUIZ, attempt({0: 0, 1: 1, 2: 0}))
+    assert (correct, total) == (2, 3)
+
+
+def test_total_counts_only_asked_questions():
+    scores = score_attempts(QUIZ, [attempt({0: 0}, order=[0]), attempt({1: 1}, order=[1, 2])])
+    assert scores.total.tolist() == [1, 2]
+    assert scores.correct.tolist() == [1, 1]
+
+
+def test_removed_questions_are_dropped():
+    old = attempt({0: 0, 1: 1, 3: 0, 7: 1}, order=[0, 1, 3, 7],
+                  shuffles={**IDENTITY, 3: [0, 1], 7: [1, 0]})
+    scores = score_attempts(QUIZ, [old, attempt({0: 0})])
+    assert scores.dropped.tolist() == [2, 0]
+    assert scores.total.tolist() == [2, 3]
+    assert scores.correct.tolist() == [2, 1]
+    assert scores.per_question.shape == (2, 3)
+
+
+def test_answers_past_the_options_are_wrong():
+    scores = score_attempts(QUIZ, [attempt({0: 3, 1: 9}), attempt({0: -1, 1: 1})])
+    assert scores.per_question.tolist() == [[False, False, False], [False, True, False]]
+    assert scores.total.tolist() == [3, 3]
+
+
+def test_options_removed_since_the_attempt():
+    # The shuffle was taken when Q1 had four options; the answer points at a gone one.
+    shuffles = {0: [0, 1, 2], 1: [3, 2, 1, 0], 2: [0, 1, 2, 3]}
+    correct_now = score_attempt(QUIZ, attempt({0: 0, 1: 2}, shuffles=shuffles))
+    gone = score_attempt(QUIZ, attempt({0: 0, 1: 0}, shuffles=shuffles))
+    assert correct_now == (2, 3) and gone == (1, 3)
+
+
+def test_empty_inputs():
+    scores = score_attempts(QUIZ, [])
+    assert scores.per_question.shape == (0, 3)
+    scores = score_attempts({"questions": []}, [attempt({0: 0}, order=[0])])
+    assert (scores.correct.tolist(), scores.total.tolist(), scores.dropped.tolist()) == ([0], [0], [1])
+    assert np.asarray(scores.per_question).shape == (1, 0)
@@ -0,0 +1,84 @@
+import json
+import time
+
+import pytest
+
+import storage
+from sqlite_store import SQLiteStore
+
+QUIZZES = [
+    {"quiz_title": "Legacy", "category": "Science", "topic": "Physics", "time_limit": 10,
+     "questions": [{"question": "Unit of force?", "options": ["newton", "joule"], "correct": "newton",
+                    "explanation": "F = ma", "points": 2}]},
+    {"quiz_title": "No department",
+     "questions": [{"question": "1 + 1?", "options": [1, 2, 2.5], "correct": 2}]},
+    {"quiz_title": "Both keys", "department": "Maths", "category": "Old", "subcategory": "Algebra",
+     "pool": {"size": 1}, "adaptive": {"max_items": 5},
+     "questions": [{"question": "x?", "options": ["a", "b"]},
+                   "malformed",
+                   {"question": "Flags?", "options": [True, False], "correct": True},
+                   {"question": "Nested?", "options": [["a"], ["b"]], "correct": ["a"]}]},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteStore(tmp_path / "quizzes.sqlite3")
+    store.refresh()
+    assert store.save_many([(q["quiz_title"], q) for q in QUIZZES]) == ([q["quiz_title"] for q in QUIZZES], [], [])
+    return store
+
+
+def test_quizzes_read_back_unchanged(store):
+    assert {t: store.quizzes[t] for t in store.quizzes} == {q["quiz_title"]: q for q in QUIZZES}
+    assert "department" not in store.quizzes["No department"]
+
+
+def test_directory_round_trip(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    for i, quiz in enumerate(QUIZZES):
+        (source / f"{i}.json").write_text(json.dumps(quiz), encoding="utf-8")
+    db, copy = tmp_path / "quizzes.sqlite3", tmp_path / "copy"
+    storage.main(["copy", f"dir:{source}", f"sqlite:{db}"])
+    storage.main(["copy", f"sqlite:{db}", f"dir:{copy}"])
+    back = sorted((json.loads(p.read_text(encoding="utf-8")) for p in copy.glob("*.json")),
+                  key=lambda q: q["quiz_title"])
+    assert back == sorted(QUIZZES, key=lambda q: q["quiz_title"])
+
+
+def test_index_queries(store):
+    assert store.departments() == ["Maths", "Science", "Uncategorized"]
+    assert store.subcategories(["Science", "Maths"]) == ["Algebra", "Physics"]
+    assert [tuple(r) for r in store.filter(["Science"])] == [("Legacy", "Science", "Physics")]
+    assert [r[0] for r in store.search("force")] == ["Legacy"]
+    assert [r[0] for r in store.search("fla", departments=["Maths"])] == ["Both keys"]
+    assert store.search("fla", departments=["Science"]) == []
+
+
+def test_save_rename_delete(store):
+    quiz = dict(store.quizzes["Legacy"], time_limit=20)
+    store.save("Renamed", quiz, old_title="Legacy")
+    assert "Legacy" not in store.quizzes
+    assert store.quizzes["Renamed"]["time_limit"] == 20
+    assert store.quizzes["Renamed"]["quiz_title"] == "Renamed"
+    assert store.delete("Renamed") and not store.delete("Renamed")
+    assert "Renamed" not in store.quizzes
+
+
+def test_validation_follows_saves(store):
+    assert not store.validation("Both keys").ok
+    assert store.validation("Legacy").ok
+    store.save("Legacy", {"questions": []})
+    assert not store.validation("Legacy").ok
+
+
+def test_other_connections_see_changes(store):
+    other = SQLiteStore(store.path, poll_interval=0.02)
+    other.start_watching()
+    assert other.quizzes["Legacy"]["time_limit"] == 10
+    store.save("Legacy", dict(QUIZZES[0], time_limit=30))
+    deadline = time.monotonic() + 5
+    while other.quizzes["Legacy"]["time_limit"] != 30 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert other.quizzes["Legacy"]["time_limit"] == 30
@@ -0,0 +1,158 @@
+"""Quiz validation, run once per quiz version instead of on every rerun.
+
+``validate_quiz`` checks the whole quiz in one pass and returns a
+``ValidationReport``:
+
+* errors make a question unusable (no text, no options, correct answer not
+  among the options) and land in ``invalid_questions``, which the render
+  loop simply skips;
+* warnings (duplicate options, duplicate questions, pool settings that
+  cannot be met, malformed pagination or adaptive settings) are shown to admins but do
+  not block anything.
+
+``ValidationCache`` memoises reports by content hash, so the same file
+content is never validated twice in a process.
+"""
+import hashlib
+from collections import OrderedDict, namedtuple
+from collections.abc import Sequence
+
+from adaptive import settings_problems
+from paper import PAGINATION_MODES, pagination_spec, pool_spec, question_subcategory
+
+ERROR, WARNING = "error", "warning"
+
+Problem = namedtuple("Problem", ["level", "question", "message"])   # question: original index or None
+
+
+class ValidationReport(namedtuple("ValidationReport", ["problems", "invalid_questions"])):
+    __slots__ = ()
+
+    @property
+    def errors(self):
+        return [p for p in self.problems if p.level == ERROR]
+
+    @property
+    def warnings(self):
+        return [p for p in self.problems if p.level == WARNING]
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def lines(self):
+        return [f"{'Quiz' if p.question is None else f'Q{p.question + 1}'}: {p.message}"
+                for p in self.problems]
+
+
+def validate_quiz(quiz):
+    problems, invalid = [], set()
+
+    def problem(level, i, message):
+        problems.append(Problem(level, i, message))
+        if level == ERROR and i is not None:
+            invalid.add(i)
+
+    if not hasattr(quiz, "get"):
+        return ValidationReport([Problem(ERROR, None, "quiz must be a JSON object")], frozenset())
+    questions = quiz.get("questions")
+    if not isinstance(questions, Sequence) or isinstance(questions, str):
+        return ValidationReport([Problem(ERROR, None, "missing 'questions' list")], frozenset())
+    if not questions:
+        problem(ERROR, None, "quiz has no questions")
+
+    seen_text = {}
+    for i, q in enumerate(questions):
+        if not hasattr(q, "get"):
+            problem(ERROR, i, "question must be an object")
+            continue
+        text = q.get("question")
+        if not isinstance(text, str) or not text.strip():
+            problem(ERROR, i, "missing question text")
+        else:
+            key = " ".join(text.lower().split())
+            if key in seen_text:
+                problem(WARNING, i, f"duplicate of Q{seen_text[key] + 1}")
+            else:
+                seen_text[key] = i
+
+        opts = q.get("options")
+        if not opts or not isinstance(opts, (list, tuple)):
+            problem(ERROR, i, "no options")
+            continue
+        if len(opts) < 2:
+            problem(WARNING, i, "only one option")
+        dupes = sorted({str(o) for o in opts if opts.count(o) > 1})
+        if dupes:
+            problem(WARNING, i, f"duplicate option(s): {', '.join(dupes)}")
+
+        correct = q.get("correct")
+        if correct is None:
+            problem(ERROR, i, "missing 'correct' answer")
+        elif correct not in opts:
+            problem(ERROR, i, f"correct answer {correct!r} is not one of the options")
+
+    if quiz.get("pool"):
+        size, quotas = pool_spec(quiz)
+        if size is None:
+            problem(WARNING, None, "'pool' is ignored; expected {\"size\": N, \"quotas\": {subcategory: n}}")
+        else:
+            usable = len(questions) - len(invalid)
+            if size > usable:
+                problem(WARNING, None, f"pool size {size} exceeds the {usable} usable questions")
+            subs = {question_subcategory(q) for q in questions if hasattr(q, "get")}
+            for sub in sorted(set(quotas) - subs):
+                problem(WARNING, None, f"pool quota for unknown subcategory {sub!r}")
+    opts = quiz.get("pagination")
+    if opts is not None:
+        mode, per_page = pagination_spec(quiz)
+        if not isinstance(opts, dict):
+            problem(WARNING, None, "'pagination' is ignored; expected {\"mode\": \"all\" | \"paged\" | "
+                                   "\"single\", \"per_page\": N}")
+        else:
+            if opts.get("mode") is not None and mode is None:
+                problem(WARNING, None, f"pagination mode {opts['mode']!r} is not one of "
+                                       f"{', '.join(PAGINATION_MODES)}")
+            if opts.get("per_page") is not None and per_page is None:
+                problem(WARNING, None, f"pagination per_page {opts['per_page']!r} is not a positive number")
+    for message in settings_problems(quiz):
+        problem(WARNING, None, message)
+    return ValidationReport(problems, frozenset(invalid))
+
+
+def content_hash(raw):
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class ValidationCache:
+    """Bounded ``key -> ValidationReport`` map (LRU); keys are content hashes."""
+
+    def __init__(self, maxsize=50_000):
+        self.maxsize = maxsize
+        self._reports = OrderedDict()
+
+    def copy(self):
+        new = ValidationCache(self.maxsize)
+        new._reports = self._reports.copy()
+        return new
+
+    def put(self, key, report):
+        """Remember a report computed elsewhere (e.g. in a worker process)."""
+        self._reports[key] = report
+        self._reports.move_to_end(key)
+        if len(self._reports) > self.maxsize:
+            self._reports.popitem(last=False)
+
+    def get(self, key, quiz):
+        if key is None:
+            return validate_quiz(quiz)
+        report = self._reports.get(key)
+        if report is None:
+            report = self._reports[key] = validate_quiz(quiz)
+            if len(self._reports) > self.maxsize:
+                self._reports.popitem(last=False)
+        else:
+            self._reports.move_to_end(key)
+        return report
@@ -0,0 +1,134 @@
+"""Background watcher that feeds quiz directory changes into a QuizCatalog.
+
+With watchdog installed (inotify on Linux, FSEvents/kqueue elsewhere) only
+the files named in create/modify/delete/move events are re-checked.
+Without it - or on network file systems, where another replica's writes do
+not raise local events - a polling thread runs ``catalog.refresh()`` every
+half second instead.  Either way the work happens on one thread per server
+process, not on every rerun.
+
+Bursts of events (editors writing temp files, a bulk import, ``git pull``)
+are debounced: names collect until the directory has been quiet for
+``debounce`` seconds, but never longer than ``max_delay``, and are then
+applied in one catalog update.  With a ``metrics.Metrics`` every update is
+timed as the ``catalog_update`` span.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional dependency
+    Observer = None
+
+log = logging.getLogger(__name__)
+
+FULL_RESCAN = None   # pending marker: something happened we cannot attribute to a file
+
+
+class CatalogWatcher:
+    def __init__(self, catalog, debounce=0.2, max_delay=0.8, poll_interval=0.5, use_events=True,
+                 metrics=None):
+        self.catalog = catalog
+        self.metrics = metrics
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.mode = "events" if use_events and Observer is not None else "polling"
+        self._pending = set()
+        self._first = self._last = 0.0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._observer = None
+
+    def start(self):
+        if self.mode == "events":
+            self._observer = Observer()
+            self._observer.schedule(_Handler(self), str(self.catalog.directory.resolve()), recursive=False)
+            self._observer.daemon = True
+            self._observer.start()
+            target = self._drain
+        else:
+            target = self._poll
+        threading.Thread(target=target, name=f"quiz-watcher-{self.mode}", daemon=True).start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._observer is not None:
+            self._observer.stop()
+
+    def notify(self, name):
+        """Queue one file name (or FULL_RESCAN) for the next debounced update."""
+        with self._cond:
+            now = time.monotonic()
+            if not self._pending:
+                self._first = now
+            self._last = now
+            self._pending.add(name)
+            self._cond.notify()
+
+    # ───────────────────────────────────────────────
+    # Worker threads
+    # ───────────────────────────────────────────────
+    def _drain(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                while True:
+                    wait = min(self._last + self.debounce, self._first + self.max_delay) - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                names, self._pending = self._pending, set()
+            try:
+                with self._span():
+                    if FULL_RESCAN in names:
+                        self.catalog.refresh()
+                    else:
+                        self.catalog.apply(names)
+            except Exception:
+                log.exception("Applying quiz directory changes failed")
+
+    def _poll(self):
+        while True:
+            with self._cond:
+                self._cond.wait(self.poll_interval)
+                if self._stopped:
+                    return
+            try:
+                with self._span():
+                    self.catalog.refresh()
+            except Exception:
+                log.exception("Polling the quiz directory failed")
+
+    def _span(self):
+        return nullcontext() if self.metrics is None else self.metrics.span("catalog_update")
+
+
+if Observer is not None:
+    class _Handler(FileSystemEventHandler):
+        def __init__(self, watcher):
+            self.watcher = watcher
+            self.directory = str(watcher.catalog.directory.resolve())
+
+        def on_any_event(self, event):
+            if event.event_type in ("opened", "closed_no_write"):
+                return
+            if event.is_directory:
+                # The watched directory itself moved or was replaced.
+                if os.fsdecode(event.src_path).rstrip(os.sep) == self.directory:
+                    self.watcher.notify(FULL_RESCAN)
+                return
+            for path in (event.src_path, getattr(event, "dest_path", "")):
+                if path:
+                    self.watcher.notify(os.path.basename(os.fsdecode(path)))